@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.dependencies import get_current_user_id, get_db
 from app.services.account_service import create_account, get_user_accounts
 from app.services.backfill_service import backfill_account_prices, backfill_portfolio_prices
+from app.services.series_changes import record_series_changes
 from app.schemas.account import AccountCreate, AccountResponse, AccountUpdate
 from sqlalchemy import text
 
@@ -18,8 +19,8 @@ async def create_new_account(account_data: AccountCreate, user_id: int = Depends
     """
     try:
         account = await create_account(db, account_data, user_id)
-        from app.core.cache import clear_user_cache
-        clear_user_cache(user_id)
+        from app.core.cache import invalidate_tags, accounts_tag
+        await invalidate_tags([accounts_tag(user_id)])
         return account
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -58,8 +59,8 @@ async def update_account(account_id: int, update: AccountUpdate, user_id: int =
 
     await db.execute(text(f"UPDATE accounts SET {', '.join(sets)} WHERE account_id = :aid"), params)
     await db.commit()
-    from app.core.cache import clear_user_cache
-    clear_user_cache(user_id)
+    from app.core.cache import invalidate_tags, account_tag
+    await invalidate_tags([account_tag(account_id)], user_id=user_id)
 
     result = await db.execute(text("SELECT * FROM accounts WHERE account_id = :aid"), {"aid": account_id})
     row = result.mappings().fetchone()
@@ -76,13 +77,16 @@ async def delete_account(account_id: int, user_id: int = Depends(get_current_use
         if not check.fetchone():
             raise HTTPException(status_code=404, detail="Account not found or not yours")
 
+        # La serie del usuario cambia entera (delta de /history_chart/growth)
+        await record_series_changes(db, {account_id: None})
+
         # Cascade deletes
         await db.execute(text("DELETE FROM transactions WHERE account_id = :aid"), {"aid": account_id})
         await db.execute(text("DELETE FROM operations WHERE account_id = :aid"), {"aid": account_id})
         await db.execute(text("DELETE FROM accounts WHERE account_id = :aid"), {"aid": account_id})
         await db.commit()
-        from app.core.cache import clear_user_cache
-        clear_user_cache(user_id)
+        from app.core.cache import invalidate_tags, account_tag, accounts_tag
+        await invalidate_tags([account_tag(account_id), accounts_tag(user_id)])
         return {"detail": "Account deleted successfully"}
     except Exception as e:
         await db.rollback()
@@ -4,6 +4,10 @@ from sqlalchemy import text
 from app.core.dependencies import get_current_user_id, get_db
 from app.services.assets_service import create_asset, get_user_assets, get_all_assets_with_prices
 from app.schemas.asset import AssetCreate, AssetResponse, AssetUpdate
+from app.services.snapshot_service import mark_snapshots_dirty, recompute_dirty_snapshots
+from app.services.ledger_service import mark_ledger_dirty, recompute_dirty_ledgers
+from app.core.cache import invalidate_tags, bump_user_version, account_tag, asset_tag
+from app.core.etag import etag_guard
 
 router = APIRouter()
 
@@ -17,12 +21,14 @@ async def create_new_asset(asset_data: AssetCreate, user_id: int = Depends(get_c
     """
     try:
         asset = await create_asset(db, asset_data, user_id)
+        # El activo pasa a ser visible para el usuario (/assets/with-prices)
+        await bump_user_version(user_id)
         return asset
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/with-prices", summary="Get all assets with latest price from worker")
+@router.get("/with-prices", summary="Get all assets with latest price from worker", dependencies=[Depends(etag_guard)])
 async def get_assets_with_prices(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     """Returns assets visible to the current user, with their latest price."""
     try:
@@ -67,6 +73,8 @@ async def update_asset(asset_id: int, update: AssetUpdate, user_id: int = Depend
 
     await db.execute(text(f"UPDATE assets SET {', '.join(sets)} WHERE asset_id = :aid"), params)
     await db.commit()
+    # Tipo/temática cambian las agrupaciones de todos los usuarios que tienen el activo
+    await invalidate_tags([asset_tag(asset_id)])
 
     result = await db.execute(text("SELECT * FROM assets WHERE asset_id = :aid"), {"aid": asset_id})
     row = result.mappings().fetchone()
@@ -92,6 +100,21 @@ async def remove_asset_from_user(asset_id: int, user_id: int = Depends(get_curre
         if not account_ids:
             raise ValueError("No accounts found")
 
+        # The daily series of each affected account changes from its first operation on this asset
+        first_ops = await db.execute(
+            text("""
+                SELECT account_id, MIN(date) AS first_date FROM operations
+                WHERE asset_id = :asset_id AND account_id = ANY(:aids)
+                GROUP BY account_id
+            """),
+            {"aids": account_ids, "asset_id": asset_id}
+        )
+        touched_accounts = []
+        for row in first_ops.all():
+            mark_snapshots_dirty(db, row.account_id, row.first_date)
+            mark_ledger_dirty(db, row.account_id, row.first_date)
+            touched_accounts.append(row.account_id)
+
         # Delete transactions linked to operations of this asset (category='Inversión')
         await db.execute(
             text("""
@@ -116,6 +139,10 @@ async def remove_asset_from_user(asset_id: int, user_id: int = Depends(get_curre
             text("DELETE FROM operations WHERE asset_id = :asset_id AND account_id = ANY(:aids)"),
             {"aids": account_ids, "asset_id": asset_id}
         )
+        await db.execute(
+            text("DELETE FROM positions WHERE asset_id = :asset_id AND account_id = ANY(:aids)"),
+            {"aids": account_ids, "asset_id": asset_id}
+        )
 
         # Remove visibility
         await db.execute(
@@ -123,7 +150,11 @@ async def remove_asset_from_user(asset_id: int, user_id: int = Depends(get_curre
             {"uid": user_id, "asset_id": asset_id}
         )
 
+        await recompute_dirty_ledgers(db)
+        await recompute_dirty_snapshots(db)
+
         await db.commit()
+        await invalidate_tags([account_tag(account_id) for account_id in touched_accounts], user_id=user_id)
         return {"detail": "Asset removed successfully"}
     except ValueError as e:
         await db.rollback()
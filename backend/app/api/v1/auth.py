@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, Body
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, text
 import httpx as httpx_client
 
 from app.core.dependencies import get_db, verify_csrf
@@ -68,6 +68,15 @@ def _clear_auth_cookies(response: Response):
         )
 
 
+async def _touch_last_active(db: AsyncSession, user_id):
+    """Marca al usuario como activo (el precalentado de caché diario solo cubre a los activos)."""
+    await db.execute(
+        text("UPDATE users SET last_active_at = NOW() WHERE user_id = :user_id"),
+        {"user_id": int(user_id)}
+    )
+    await db.commit()
+
+
 @router.post("/register")
 async def register(user_data: UserCreate, response: Response, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == user_data.email))
@@ -108,12 +117,13 @@ async def login(response: Response, db: AsyncSession = Depends(get_db), email: s
     csrf = generate_csrf_token()
     
     _set_auth_cookies(response, access, refresh, csrf, remember_me)
+    await _touch_last_active(db, user.user_id)
 
     return {"message": "ok", "email": user.email, "email_verified": user.email_verified, "csrf_token": csrf}
 
 
 @router.post("/refresh")
-async def refresh_token_endpoint(request: Request, response: Response):
+async def refresh_token_endpoint(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     token = request.cookies.get("refresh_token")
     if not token:
         raise HTTPException(status_code=401, detail="No refresh token")
@@ -147,6 +157,7 @@ async def refresh_token_endpoint(request: Request, response: Response):
         max_age=REMEMBER_ME_EXPIRE_DAYS * 86400,
         path="/",
     )
+    await _touch_last_active(db, user_id)
 
     return {"message": "ok", "csrf_token": csrf}
 
@@ -278,5 +289,6 @@ async def google_login(response: Response, credential: str = Body(..., embed=Tru
     csrf = generate_csrf_token()
 
     _set_auth_cookies(response, access, refresh, csrf, remember_me=True)
+    await _touch_last_active(db, user.user_id)
 
     return {"message": "ok", "email": user.email, "email_verified": user.email_verified, "csrf_token": csrf}
\ No newline at end of file
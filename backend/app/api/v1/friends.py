@@ -1,16 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import get_current_user_id, get_db, verify_csrf
+from app.core.dependencies import get_current_user_id, get_db, get_parallel_db, verify_csrf, ParallelSessions
+from app.core.responses import encoded_response
 from app.services.friend_service import (
     send_friend_request, accept_friend_request,
     reject_or_remove_friend, get_friends_list, is_friend,
 )
-from app.services.account_service import get_accounts_with_balance
-from app.services.assets_service import get_all_assets, get_global_asset_allocation
-from app.services.performance_service import get_performance_metrics
-from app.services.history_chart_service import get_portfolio_growth
+from app.services.view_cache import accounts_view, all_assets_view, allocation_view, performance_view, growth_view, dashboard_view
+from app.services.dashboard_service import parse_sections
+from app.schemas.dashboard import DashboardResponse
 from app.schemas.friendship import FriendRequest, FriendshipOut
+from app.schemas.history_chart import GrowthResolution
 
 router = APIRouter()
 
@@ -46,38 +47,54 @@ async def remove_friend(friendship_id: int, user_id: int = Depends(get_current_u
 
 
 # --- Friend's dashboard (read-only) ---
+# Se sirven las mismas vistas cacheadas que ve el propio amigo (claves de su user_id)
 
-@router.get("/{friend_id}/portfolio/accounts")
-async def friend_accounts(friend_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
-    if not await is_friend(db, user_id, friend_id):
+async def require_friend(friend_id: int, user_id: int = Depends(get_current_user_id)) -> int:
+    if not await is_friend(user_id, friend_id):
         raise HTTPException(status_code=403, detail="No sois amigos")
-    return await get_accounts_with_balance(db, friend_id)
+    return friend_id
+
+
+@router.get("/{friend_id}/portfolio/accounts")
+async def friend_accounts(request: Request, friend_id: int = Depends(require_friend)):
+    return encoded_response(await accounts_view(friend_id), request)
 
 
 @router.get("/{friend_id}/portfolio/assets/all")
-async def friend_all_assets(friend_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
-    if not await is_friend(db, user_id, friend_id):
-        raise HTTPException(status_code=403, detail="No sois amigos")
-    return await get_all_assets(db, friend_id)
+async def friend_all_assets(request: Request, friend_id: int = Depends(require_friend)):
+    return encoded_response(await all_assets_view(friend_id), request)
 
 
 @router.get("/{friend_id}/portfolio/assets/{group_by}")
-async def friend_assets_grouped(friend_id: int, group_by: str, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
-    if not await is_friend(db, user_id, friend_id):
-        raise HTTPException(status_code=403, detail="No sois amigos")
-    return await get_global_asset_allocation(db, friend_id, group_by)
+async def friend_assets_grouped(group_by: str, request: Request, friend_id: int = Depends(require_friend)):
+    return encoded_response(await allocation_view(friend_id, group_by), request)
 
 
 @router.get("/{friend_id}/portfolio/performance")
-async def friend_performance(friend_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
-    if not await is_friend(db, user_id, friend_id):
-        raise HTTPException(status_code=403, detail="No sois amigos")
-    return await get_performance_metrics(db, friend_id)
+async def friend_performance(request: Request, friend_id: int = Depends(require_friend)):
+    return encoded_response(await performance_view(friend_id), request)
 
 
 @router.get("/{friend_id}/portfolio/history")
-async def friend_history(friend_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
-    if not await is_friend(db, user_id, friend_id):
-        raise HTTPException(status_code=403, detail="No sois amigos")
-    history = await get_portfolio_growth(db, friend_id)
-    return {"history": history}
+async def friend_history(
+    resolution: GrowthResolution = "day",
+    max_points: int | None = Query(None, ge=3, le=5000),
+    friend_id: int = Depends(require_friend)
+):
+    return await growth_view(friend_id, resolution, max_points)
+
+
+# Todas las vistas del amigo en una petición (mismas secciones que /portfolio/dashboard)
+@router.get("/{friend_id}/portfolio/dashboard", response_model=DashboardResponse, response_model_exclude_unset=True)
+async def friend_dashboard(
+    request: Request,
+    sections: str | None = None,
+    group_by: str = "type",
+    friend_id: int = Depends(require_friend),
+    parallel: ParallelSessions = Depends(get_parallel_db)
+):
+    try:
+        section_list = parse_sections(sections)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return encoded_response(await dashboard_view(parallel, friend_id, section_list, group_by), request)
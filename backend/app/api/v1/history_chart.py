@@ -1,36 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+from typing import Optional
 from app.core.dependencies import get_current_user_id, get_db
-from app.services.history_chart_service import get_account_growth, get_portfolio_growth 
-from app.schemas.history_chart import PortfolioGrowthResponse
-from app.core.cache import get_cached_value, set_cached_value
+from app.core.etag import etag_guard
+from app.services.view_cache import growth_view, account_growth_view
+from app.services.history_chart_service import get_growth_delta
+from app.schemas.history_chart import GrowthResolution, PortfolioGrowthResponse
 
-router = APIRouter()
+# ETag / 304 como en /portfolio (core/etag.py)
+router = APIRouter(dependencies=[Depends(etag_guard)])
 
+# resolution: un punto por día, semana o mes; max_points reduce la serie conservando su forma (LTTB)
+# since + version (los de la respuesta anterior): solo los puntos cambiados, o reset=True con la
+# serie completa. Es lo que usa PortfolioHistoryChart (historyService.getGrowthSeries), que guarda
+# la última serie y la empalma desde from_date. Con max_points se manda siempre completa (el
+# muestreo depende de toda la serie)
 @router.get("/growth", response_model=PortfolioGrowthResponse)
-async def get_growth(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
-    cache_key = "growth_all"
-    cached = get_cached_value(user_id, cache_key)
-    if cached is not None:
-        return cached
-
+async def get_growth(
+    resolution: GrowthResolution = "day",
+    max_points: Optional[int] = Query(None, ge=3, le=5000),
+    since: Optional[date] = None,
+    version: Optional[int] = Query(None, ge=0),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+):
     try:
-        history = await get_portfolio_growth(db, user_id)
-        result = {"history": history}
-        set_cached_value(user_id, cache_key, result)
-        return result
+        view = await growth_view(user_id, resolution, max_points)
+        if since is None or max_points:
+            return view
+        return await get_growth_delta(db, user_id, view, since, version, resolution)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
 @router.get("/growth/account/{account_id}", response_model=PortfolioGrowthResponse)
-async def get_account_growth_endpoint(account_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
-    cache_key = f"growth_account_{account_id}"
-    cached = get_cached_value(user_id, cache_key)
-    if cached is not None:
-        return cached
-
+async def get_account_growth_endpoint(
+    account_id: int,
+    resolution: GrowthResolution = "day",
+    max_points: Optional[int] = Query(None, ge=3, le=5000),
+    since: Optional[date] = None,
+    version: Optional[int] = Query(None, ge=0),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+):
     try:
         # Verificación de propiedad de la cuenta
         acc_query = await db.execute(
@@ -40,10 +54,10 @@ async def get_account_growth_endpoint(account_id: int, user_id: int = Depends(ge
         if not acc_query.scalar():
             raise HTTPException(status_code=404, detail="Cuenta no encontrada o no autorizada")
 
-        history = await get_account_growth(db, account_id)
-        result = {"history": history}
-        set_cached_value(user_id, cache_key, result)
-        return result
+        view = await account_growth_view(user_id, account_id, resolution, max_points)
+        if since is None or max_points:
+            return view
+        return await get_growth_delta(db, user_id, view, since, version, resolution, account_id)
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -1,92 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.dependencies import get_current_user_id
-from app.core.dependencies import get_db
+from app.core.dependencies import get_db, get_parallel_db, ParallelSessions
+from app.core.etag import etag_guard
+from app.core.responses import encoded_response
 
-from app.services.account_service import get_accounts_with_balance, get_selected_account_with_balance
-from app.services.assets_service import get_all_assets, get_asset_allocation, get_global_asset_allocation
-from app.services.performance_service import get_performance_metrics
+from app.services.view_cache import accounts_view, account_view, all_assets_view, allocation_view, performance_view, dashboard_view
+from app.services.dashboard_service import parse_sections
 
 from app.schemas.allocation import AssetAllocation, AccountWithBalance, AssetTableRow
 from app.schemas.performance import PerformanceResponse
-from app.core.cache import get_cached_value, set_cached_value
+from app.schemas.dashboard import DashboardResponse
 
-router = APIRouter()
+# Todas las vistas responden 304 si el cliente ya tiene la versión actual (core/etag.py).
+# La caché guarda el JSON ya validado y comprimido: response_model solo documenta el esquema
+router = APIRouter(dependencies=[Depends(etag_guard)])
 
 # 1 Saca una lista de mis cuentas y su balance (total, invertido, cash)
 @router.get("/accounts", summary="Get accounts with balance for a user", response_model=list[AccountWithBalance])
-async def accounts_with_balance(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):    
-    cache_key = "accounts_all"
-    cached = get_cached_value(user_id, cache_key)
-    if cached is not None:
-        return cached
-    res = await get_accounts_with_balance(db, user_id)
-    set_cached_value(user_id, cache_key, res)
-    return res
+async def accounts_with_balance(request: Request, response: Response, user_id: int = Depends(get_current_user_id)):
+    return encoded_response(await accounts_view(user_id), request, response)
 
 
 # 2 Saca el balance de una cuenta concreta (total, invertido, cash)
 @router.get("/accounts/{account_id}", summary="Get the balance of one account for a user", response_model=list[AccountWithBalance])
-async def get_one_account_with_balance(account_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
-    cache_key = f"account_{account_id}"
-    cached = get_cached_value(user_id, cache_key)
-    if cached is not None:
-        return cached
-    res = await get_selected_account_with_balance(db, user_id, account_id)
-    set_cached_value(user_id, cache_key, res)
-    return res
+async def get_one_account_with_balance(account_id: int, request: Request, response: Response, user_id: int = Depends(get_current_user_id)):
+    return encoded_response(await account_view(user_id, account_id), request, response)
 
 
 # 5 Obtiene todos los assets de todas las cuentas del usuario con detalles completos
 @router.get("/assets/all", summary="Get all assets from all accounts", response_model=list[AssetTableRow])
-async def get_all_user_assets(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db) ):
-    cache_key = "assets_all"
-    cached = get_cached_value(user_id, cache_key)
-    if cached is not None:
-        return cached
-    res = await get_all_assets(db, user_id)
-    set_cached_value(user_id, cache_key, res)
-    return res
+async def get_all_user_assets(request: Request, response: Response, user_id: int = Depends(get_current_user_id) ):
+    return encoded_response(await all_assets_view(user_id), request, response)
 
 
 # 3 Saca la asignacion de activos de una de mis cuentas agrupadas por tipo, temática o sin agrupar
 @router.get("/assets/{group_by}/{account_id}", response_model=list[AssetAllocation])
-async def get_detailed_assets(group_by: str, account_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+async def get_detailed_assets(group_by: str, account_id: int, request: Request, response: Response, user_id: int = Depends(get_current_user_id)):
     # GROUP_BY ::= asset | theme | type
-    cache_key = f"assets_alloc_{group_by}_{account_id}"
-    cached = get_cached_value(user_id, cache_key)
-    if cached is not None:
-        return cached
-    res = await get_asset_allocation(db, account_id, user_id, group_by)
-    set_cached_value(user_id, cache_key, res)
-    return res
+    return encoded_response(await allocation_view(user_id, group_by, account_id), request, response)
 
 
 # 4 Saca la asignacion global de activos de todas mis cuentas agrupadas por tipo, temática o sin agrupar
 @router.get("/assets/{group_by}", response_model=list[AssetAllocation])
-async def get_assets_by_type(group_by: str, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+async def get_assets_by_type(group_by: str, request: Request, response: Response, user_id: int = Depends(get_current_user_id)):
     # GROUP_BY ::= asset | theme | type
-    cache_key = f"assets_alloc_{group_by}_global"
-    cached = get_cached_value(user_id, cache_key)
-    if cached is not None:
-        return cached
-    res = await get_global_asset_allocation(db, user_id, group_by)
-    set_cached_value(user_id, cache_key, res)
-    return res
+    return encoded_response(await allocation_view(user_id, group_by), request, response)
 
 
 @router.get("/performance", response_model=PerformanceResponse)
-async def get_performance(account_id: int | None = None, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
-    cache_key = f"performance_{account_id or 'all'}"
-    cached = get_cached_value(user_id, cache_key)
-    if cached is not None:
-        return cached
+async def get_performance(request: Request, response: Response, account_id: int | None = None, periods: str | None = None, user_id: int = Depends(get_current_user_id)):
+    # periods: ventanas extra separadas por comas (1W, 6M, 1Y, 5Y, AAAA-MM-DD..AAAA-MM-DD)
+    period_list = [p for p in periods.split(",") if p.strip()] if periods else []
     try:
-        # Nota: Aquí llamamos a una versión interna de tu query de crecimiento 
-        # que devuelve el estado actual y los estados en fechas clave.
-        metrics = await get_performance_metrics(db, user_id, account_id)
-        set_cached_value(user_id, cache_key, metrics)
-        return metrics
+        # Una sola pasada sobre la serie diaria materializada para todas las ventanas
+        body = await performance_view(user_id, account_id, period_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return encoded_response(body, request, response)
+
+
+# 6 Todas las vistas del dashboard en una sola petición (posiciones y precios se leen una vez)
+@router.get("/dashboard", summary="Get several portfolio views in one request", response_model=DashboardResponse, response_model_exclude_unset=True)
+async def get_dashboard(
+    request: Request,
+    response: Response,
+    sections: str | None = None,
+    group_by: str = "type",
+    account_id: int | None = None,
+    periods: str | None = None,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+    parallel: ParallelSessions = Depends(get_parallel_db)
+):
+    # sections: accounts,assets,allocation,performance,growth (por defecto todas)
+    # account_id limita allocation, performance y growth a esa cuenta
+    try:
+        section_list = parse_sections(sections)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    period_list = [p for p in periods.split(",") if p.strip()] if periods else []
+
+    if account_id is not None:
+        owned = await db.execute(
+            text("SELECT 1 FROM accounts WHERE account_id = :aid AND user_id = :uid"),
+            {"aid": account_id, "uid": user_id}
+        )
+        if not owned.scalar():
+            raise HTTPException(status_code=404, detail="Cuenta no encontrada o no autorizada")
+
+    try:
+        body = await dashboard_view(parallel, user_id, section_list, group_by, account_id, period_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return encoded_response(body, request, response)
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.dependencies import get_current_user_id, get_db
 from app.services.trade_service import get_trade_history, create_operation, update_operation, delete_operation
 from app.services.transaction_service import create_transaction_from_operation
+from app.services.snapshot_service import recompute_dirty_snapshots
+from app.services.ledger_service import recompute_dirty_ledgers
+from app.core.cache import invalidate_tags, account_tag, asset_tag
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.etag import etag_guard
 
 from app.models.asset import Asset
 from app.schemas.trade import TradeHistoryResponse
@@ -12,18 +19,43 @@ from typing import Optional
 
 router = APIRouter()
 
-@router.get("/history", summary="Get complete trade history for a user", response_model=list[TradeHistoryResponse])
-async def get_user_trade_history(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+@router.get(
+    "/history", summary="Get trade history for a user (paginated)", response_model=list[TradeHistoryResponse],
+    dependencies=[Depends(etag_guard)]
+)
+async def get_user_trade_history(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    account_id: Optional[int] = None,
+    asset_id: Optional[int] = None,
+    operation_type: Optional[Literal["buy", "sell"]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+):
     """
-    Retrieve all trade operations (buys/sells) for the authenticated user.
+    Retrieve trade operations (buys/sells) for the authenticated user, one page at a time.
     
     Returns:
     - Ticker, ISIN, asset name and currency
     - Operation date, quantity, price and type (buy/sell)
     - Fees and account name
     - Ordered by date (newest first)
+
+    Optional filters: account_id, asset_id, operation_type, date_from / date_to (inclusive days).
+    If there are more trades, the X-Next-Cursor header holds the cursor for the next page
+    (pass it back as ?cursor=... with the same filters).
     """
-    trades = await get_trade_history(db, user_id)
+    try:
+        trades, next_cursor = await get_trade_history(
+            db, user_id, limit, cursor, account_id, asset_id, operation_type, date_from, date_to
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return trades
 
 
@@ -36,14 +68,18 @@ async def create_new_operation(operation_data: OperationCreate, user_id: int = D
         # 2. Crear la transacción de efectivo
         await create_transaction_from_operation(db, operation, asset.name)
         
-        # 3. Commit ÚNICO para todo (operación + price_history + transacción)
+        # 3. Recalcular saldos de efectivo y serie diaria desde la fecha de la operación
+        await recompute_dirty_ledgers(db)
+        await recompute_dirty_snapshots(db)
+
+        # 4. Commit ÚNICO para todo (operación + price_history + transacción + saldos + serie)
         await db.commit()
         
-        # 4. Refresh después del commit
+        # 5. Refresh después del commit
         await db.refresh(operation)
 
-        from app.core.cache import clear_user_cache
-        clear_user_cache(user_id)
+        # Solo las vistas que dependen de esta cuenta (y del activo, por el precio que puede haber añadido)
+        await invalidate_tags([account_tag(operation.account_id), asset_tag(operation.asset_id)], user_id=user_id)
         
         return operation
 
@@ -64,10 +100,11 @@ async def update_existing_operation(
 ):
     try:
         operation = await update_operation(db, operation_id, update_data, user_id)
+        await recompute_dirty_ledgers(db)
+        await recompute_dirty_snapshots(db)
         await db.commit()
         await db.refresh(operation)
-        from app.core.cache import clear_user_cache
-        clear_user_cache(user_id)
+        await invalidate_tags([account_tag(operation.account_id), asset_tag(operation.asset_id)], user_id=user_id)
         return operation
     except ValueError as e:
         await db.rollback()
@@ -84,10 +121,11 @@ async def delete_existing_operation(
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        await delete_operation(db, operation_id, user_id)
+        account_id = await delete_operation(db, operation_id, user_id)
+        await recompute_dirty_ledgers(db)
+        await recompute_dirty_snapshots(db)
         await db.commit()
-        from app.core.cache import clear_user_cache
-        clear_user_cache(user_id)
+        await invalidate_tags([account_tag(account_id)], user_id=user_id)
     except ValueError as e:
         await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from datetime import date
+from typing import List, Literal, Optional
+from app.core.database import AsyncSessionLocal
 from app.core.dependencies import get_current_user_id, get_db
+from app.core.pagination import NEXT_CURSOR_HEADER
 from app.schemas.transaction import TransactionCreate, TransactionResponse
 from app.services import transaction_service
 
@@ -14,13 +18,54 @@ async def create_new_transaction(
     current_user_id: int = Depends(get_current_user_id)
 ):
     res = await transaction_service.create_transaction(db, transaction_in, current_user_id)
-    from app.core.cache import clear_user_cache
-    clear_user_cache(current_user_id)
+    from app.core.cache import invalidate_tags, account_tag
+    await invalidate_tags([account_tag(transaction_in.account_id)], user_id=current_user_id)
     return res
 
 @router.get("/me", response_model=List[TransactionResponse])
 async def list_transactions(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    account_id: Optional[int] = None,
+    category: Optional[str] = None,
+    type: Optional[Literal["income", "expense"]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    format: Literal["json", "ndjson"] = "json",
     current_user_id: int = Depends(get_current_user_id)
 ):
-    return await transaction_service.get_user_transactions(db, current_user_id)
\ No newline at end of file
+    """
+    Active transactions of the authenticated user, newest first, one page at a time.
+
+    Optional filters: account_id, category, type, date_from / date_to (inclusive days).
+    If there are more transactions, the X-Next-Cursor header holds the cursor for the next
+    page (pass it back as ?cursor=... with the same filters).
+
+    With format=ndjson the whole filtered list is streamed instead, one JSON object per line
+    (limit is ignored; cursor still sets the starting point).
+    """
+    filters = (account_id, category, type, date_from, date_to)
+    try:
+        if format == "ndjson":
+            # El stream abre su propia sesión: sin get_db no se reserva otra conexión para nada
+            chunks = await transaction_service.stream_user_transactions(current_user_id, cursor, *filters)
+        else:
+            async with AsyncSessionLocal() as db:
+                transactions, next_cursor = await transaction_service.get_user_transactions(
+                    db, current_user_id, limit, cursor, *filters
+                )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "ndjson":
+        async def lines():
+            async for chunk in chunks:
+                yield "".join(
+                    TransactionResponse.model_validate(row).model_dump_json() + "\n" for row in chunk
+                )
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return transactions
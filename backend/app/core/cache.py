@@ -1,37 +1,670 @@
+"""
+Caché de vistas por usuario con backend intercambiable.
+
+- MemoryCacheBackend: LRU con TTL en el propio proceso (por defecto). Con varios
+  workers de uvicorn cada proceso tiene la suya, así que la invalidación es local.
+- RedisCacheBackend: caché compartida por todos los workers (CACHE_URL=redis://...).
+  Los valores se guardan como JSON y la invalidación se ve en todos los procesos.
+
+La API pública (get_cached_value, set_cached_value, invalidate_tags...) no depende
+del backend elegido.
+
+Cada vista se guarda con etiquetas de las entidades de las que depende
+(account:{id}, asset:{id}, accounts:{user_id}, friends:{user_id}); una mutación invalida solo las
+vistas con esas etiquetas en lugar de toda la caché del usuario.
+
+get_or_compute() añade sobre el backend:
+- single-flight: las peticiones concurrentes que fallan en la misma clave esperan a un único
+  cálculo en vez de lanzar cada una el suyo (por proceso).
+- stale-while-revalidate: durante CACHE_STALE_TTL segundos tras caducar, el valor se sigue
+  sirviendo al momento mientras un único cálculo en segundo plano lo refresca.
+- warming(ttl): dentro del bloque siempre se recalcula y se guarda con ese ttl, como mucho
+  hasta la siguiente medianoche UTC (precalentado de services/cache_warmup.py).
+
+Versiones de datos (ETags de core/etag.py): cada usuario tiene un token que cambia con sus
+escrituras (invalidate_tags(..., user_id=...) o etiquetas accounts:{user_id} y friends:{user_id})
+y hay un token global de precios que cambia con cualquier etiqueta asset:{id} (precios nuevos,
+backfill, edición de activos). Son tokens aleatorios, no contadores: si se pierden (reinicio,
+expulsión LRU) se crea uno nuevo y ningún ETag anterior vuelve a coincidir.
+
+get_or_compute usa las mismas versiones para no guardar resultados viejos: las lee antes de
+calcular y solo guarda si siguen igual al terminar. Con Redis esto cubre también las escrituras
+hechas en otros procesos.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import secrets
+import sys
 import time
-from typing import Dict, Any, Tuple
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
 
-# Structure: { user_id: { cache_key: (value, expire_time_timestamp) } }
-_cache: Dict[int, Dict[str, Tuple[Any, float]]] = {}
+from app.core.config import CACHE_URL, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_SWEEP_INTERVAL, CACHE_STALE_TTL
+from app.core.responses import EncodedBody
+
+logger = logging.getLogger("app.cache")
 
 DEFAULT_TTL = 3600  # 1 hour by default
 
-def get_cached_value(user_id: int, key: str) -> Any:
-    user_data = _cache.get(user_id)
-    if not user_data:
-        print(f"🔍 [Cache] MISS - No hay datos para el usuario {user_id} (clave: {key})")
-        return None
-    entry = user_data.get(key)
-    if not entry:
-        print(f"🔍 [Cache] MISS - Clave no encontrada para el usuario {user_id} (clave: {key})")
-        return None
-    value, expires_at = entry
-    if time.time() > expires_at:
-        # Expired, clean up
-        del user_data[key]
-        print(f"⏳ [Cache] EXPIRED - Clave expirada para el usuario {user_id} (clave: {key})")
-        return None
-    print(f"⚡ [Cache] HIT - Retornando datos en caché para el usuario {user_id} (clave: {key})")
+
+def account_tag(account_id: int) -> str:
+    return f"account:{account_id}"
+
+
+def asset_tag(asset_id: int) -> str:
+    return f"asset:{asset_id}"
+
+
+def accounts_tag(user_id: int) -> str:
+    """Vistas que dependen del conjunto de cuentas del usuario (altas y bajas)."""
+    return f"accounts:{user_id}"
+
+
+def friends_tag(user_id: int) -> str:
+    return f"friends:{user_id}"
+
+
+# Versión global de precios y datos de activos (compartidos por todos los usuarios)
+PRICES_VERSION = "prices"
+
+
+def user_version(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def _new_token() -> str:
+    return secrets.token_hex(6)
+
+
+def _new_stats() -> dict:
+    return {
+        "hits": 0,
+        "misses": 0,
+        "stale": 0,
+        "coalesced": 0,
+        "refreshes": 0,
+        "expired": 0,
+        "evictions": 0,
+        "sets": 0,
+        "invalidations": 0,
+        "errors": 0,
+    }
+
+
+class CacheBackend:
+    """Interfaz común de los backends de caché."""
+
+    name = "base"
+    # True si todos los procesos del backend ven las mismas entradas
+    shared = False
+
+    def __init__(self):
+        self._stats = _new_stats()
+
+    async def get_entry(self, user_id: int, key: str) -> Tuple[Any, bool] | None:
+        """(valor, está_fresco) o None si no hay entrada (o ya pasó también el margen stale)."""
+        raise NotImplementedError
+
+    async def get(self, user_id: int, key: str) -> Any:
+        """Solo valores frescos."""
+        entry = await self.get_entry(user_id, key)
+        if entry is None or not entry[1]:
+            return None
+        return entry[0]
+
+    async def set(self, user_id: int, key: str, value: Any, ttl: int = DEFAULT_TTL, tags: Iterable[str] = (), stale_ttl: int = 0) -> None:
+        """Guarda el valor fresco durante ttl y servible como stale stale_ttl segundos más."""
+        raise NotImplementedError
+
+    def record(self, stat: str, amount: int = 1) -> None:
+        self._stats[stat] += amount
+
+    async def clear_user(self, user_id: int) -> None:
+        raise NotImplementedError
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Borra todas las vistas (de cualquier usuario) con alguna de las etiquetas. Devuelve cuántas."""
+        raise NotImplementedError
+
+    async def sweep_expired(self) -> int:
+        """Barrido proactivo de entradas caducadas (los backends con TTL nativo no lo necesitan)."""
+        return 0
+
+    async def get_versions(self, names: list[str]) -> list[str] | None:
+        """Token actual de cada versión (se crea si no existe). None si el backend no responde."""
+        raise NotImplementedError
+
+    async def bump_versions(self, names: Iterable[str]) -> None:
+        """Cambia el token de cada versión."""
+        raise NotImplementedError
+
+    async def stats(self) -> dict:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "backend": self.name,
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+    async def close(self) -> None:
+        pass
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float  # fin del margen stale: a partir de aquí se borra
+    size: int
+    tags: Tuple[str, ...] = ()
+    fresh_until: float = 0.0
+
+
+def _estimate_size(value: Any, _depth: int = 0) -> int:
+    """Aproximación barata del tamaño en memoria (listas de filas, dicts, escalares)."""
+    size = sys.getsizeof(value, 64)
+    if _depth > 4:
+        return size
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, Mapping):
+        return size + sum(_estimate_size(k, _depth + 1) + _estimate_size(v, _depth + 1) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)) or hasattr(value, "_mapping"):
+        return size + sum(_estimate_size(v, _depth + 1) for v in value)
+    return size
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU global con TTL, acotada por número de entradas y bytes aproximados."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # { (user_id, cache_key): _Entry }, el más reciente al final
+        self._entries: "OrderedDict[Tuple[int, str], _Entry]" = OrderedDict()
+        # Índice por usuario para vaciar su caché sin recorrer todo
+        self._user_keys: Dict[int, Set[str]] = {}
+        # Índice inverso etiqueta -> vistas
+        self._tag_index: Dict[str, Set[Tuple[int, str]]] = {}
+        self._total_bytes = 0
+        # Tokens de versión (uno por usuario que ha leído o escrito, fuera del LRU: son unos bytes)
+        self._versions: Dict[str, str] = {}
+
+    def _remove(self, cache_key: Tuple[int, str]) -> None:
+        entry = self._entries.pop(cache_key, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry.size
+        user_id, key = cache_key
+        keys = self._user_keys.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[user_id]
+        for tag in entry.tags:
+            members = self._tag_index.get(tag)
+            if members is not None:
+                members.discard(cache_key)
+                if not members:
+                    del self._tag_index[tag]
+
+    def _evict_overflow(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+            cache_key = next(iter(self._entries))
+            self._remove(cache_key)
+            self._stats["evictions"] += 1
+            logger.debug("cache.evict user_id=%s key=%s", cache_key[0], cache_key[1])
+
+    async def get_entry(self, user_id: int, key: str) -> Tuple[Any, bool] | None:
+        cache_key = (user_id, key)
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            self._stats["misses"] += 1
+            logger.debug("cache.miss user_id=%s key=%s", user_id, key)
+            return None
+        now = time.time()
+        if now > entry.expires_at:
+            self._remove(cache_key)
+            self._stats["expired"] += 1
+            self._stats["misses"] += 1
+            logger.debug("cache.expired user_id=%s key=%s", user_id, key)
+            return None
+        self._entries.move_to_end(cache_key)
+        if now > entry.fresh_until:
+            self._stats["stale"] += 1
+            logger.debug("cache.stale user_id=%s key=%s", user_id, key)
+            return entry.value, False
+        self._stats["hits"] += 1
+        logger.debug("cache.hit user_id=%s key=%s", user_id, key)
+        return entry.value, True
+
+    async def set(self, user_id: int, key: str, value: Any, ttl: int = DEFAULT_TTL, tags: Iterable[str] = (), stale_ttl: int = 0) -> None:
+        cache_key = (user_id, key)
+        self._remove(cache_key)
+        now = time.time()
+        entry = _Entry(value=value, expires_at=now + ttl + stale_ttl, size=_estimate_size(value),
+                       tags=tuple(set(tags)), fresh_until=now + ttl)
+        if entry.size > self.max_bytes:
+            logger.warning("cache.skip_oversized user_id=%s key=%s bytes=%s", user_id, key, entry.size)
+            return
+        self._entries[cache_key] = entry
+        self._user_keys.setdefault(user_id, set()).add(key)
+        for tag in entry.tags:
+            self._tag_index.setdefault(tag, set()).add(cache_key)
+        self._total_bytes += entry.size
+        self._stats["sets"] += 1
+        logger.debug("cache.set user_id=%s key=%s bytes=%s", user_id, key, entry.size)
+        self._evict_overflow()
+
+    async def clear_user(self, user_id: int) -> None:
+        keys = self._user_keys.get(user_id)
+        if not keys:
+            return
+        count = len(keys)
+        for key in list(keys):
+            self._remove((user_id, key))
+        self._stats["invalidations"] += count
+        logger.info("cache.clear_user user_id=%s entries=%s", user_id, count)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        tags = list(tags)
+        victims = set()
+        for tag in tags:
+            victims |= self._tag_index.get(tag, set())
+        for cache_key in victims:
+            self._remove(cache_key)
+        self._stats["invalidations"] += len(victims)
+        logger.info("cache.invalidate tags=%s entries=%s", ",".join(tags), len(victims))
+        return len(victims)
+
+    async def get_versions(self, names: list[str]) -> list[str] | None:
+        return [self._versions.setdefault(name, _new_token()) for name in names]
+
+    async def bump_versions(self, names: Iterable[str]) -> None:
+        for name in names:
+            self._versions[name] = _new_token()
+
+    async def sweep_expired(self) -> int:
+        now = time.time()
+        expired = [cache_key for cache_key, entry in self._entries.items() if entry.expires_at < now]
+        for cache_key in expired:
+            self._remove(cache_key)
+        self._stats["expired"] += len(expired)
+        if expired:
+            logger.debug("cache.sweep removed=%s", len(expired))
+        return len(expired)
+
+    async def stats(self) -> dict:
+        return {
+            **(await super().stats()),
+            "entries": len(self._entries),
+            "users": len(self._user_keys),
+            "tags": len(self._tag_index),
+            "bytes": self._total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Caché compartida sobre el protocolo Redis (redis.asyncio o un cliente compatible como fakeredis).
+
+    Cada vista es una clave con TTL nativo (ttl + margen stale) que guarda {"f": fresco_hasta, "v": valor}:
+    {prefix}:{user_id}:{key}. Los EncodedBody (respuestas ya codificadas) se guardan en binario,
+    sin pasar por JSON: la cabecera {"f": ..., "b": [longitudes]}, un salto de línea y los bytes. Un set por usuario
+    ({prefix}:{user_id}:__keys__) permite borrar todas sus vistas de una vez y un set por
+    etiqueta ({prefix}:tag:{tag}) las vistas que dependen de ella. El límite de
+    memoria y la expulsión LRU los aplica el servidor (maxmemory + allkeys-lru).
+    Si el servidor no responde se degrada a "miss" sin tumbar la petición.
+    """
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, client, prefix: str = "sprout:cache"):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, user_id: int, key: str) -> str:
+        return f"{self.prefix}:{user_id}:{key}"
+
+    def _index(self, user_id: int) -> str:
+        return f"{self.prefix}:{user_id}:__keys__"
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    def _version(self, name: str) -> str:
+        return f"{self.prefix}:version:{name}"
+
+    @staticmethod
+    def _extend_ttl(pipe, name: str, ttl: int) -> None:
+        # Los sets índice viven al menos tanto como la vista más duradera que contienen
+        pipe.expire(name, ttl, nx=True)
+        pipe.expire(name, ttl, gt=True)
+
+    async def get_entry(self, user_id: int, key: str) -> Tuple[Any, bool] | None:
+        try:
+            raw = await self.client.get(self._key(user_id, key))
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning("cache.redis_error op=get user_id=%s key=%s error=%s", user_id, key, e)
+            return None
+        if raw is None:
+            self._stats["misses"] += 1
+            logger.debug("cache.miss user_id=%s key=%s", user_id, key)
+            return None
+        envelope, value = self._decode(raw)
+        if time.time() > envelope["f"]:
+            self._stats["stale"] += 1
+            logger.debug("cache.stale user_id=%s key=%s", user_id, key)
+            return value, False
+        self._stats["hits"] += 1
+        logger.debug("cache.hit user_id=%s key=%s", user_id, key)
+        return value, True
+
+    @staticmethod
+    def _encode(fresh_until: float, value: Any) -> bytes:
+        if isinstance(value, EncodedBody):
+            parts = [value.identity, value.gzip, value.br]
+            header = {"f": fresh_until, "b": [len(p) if p is not None else None for p in parts]}
+            return json.dumps(header, separators=(",", ":")).encode() + b"\n" + b"".join(p for p in parts if p)
+        envelope = {"f": fresh_until, "v": jsonable_encoder(value)}
+        return json.dumps(envelope, separators=(",", ":")).encode()
+
+    @staticmethod
+    def _decode(raw: bytes) -> Tuple[dict, Any]:
+        if isinstance(raw, str):
+            raw = raw.encode()
+        # json.dumps no emite saltos de línea: solo los EncodedBody tienen cabecera separada
+        split = raw.find(b"\n")
+        if split < 0:
+            envelope = json.loads(raw)
+            return envelope, envelope["v"]
+        header = json.loads(raw[:split])
+        parts, offset = [], split + 1
+        for length in header["b"]:
+            if length is None:
+                parts.append(None)
+                continue
+            parts.append(raw[offset:offset + length])
+            offset += length
+        return header, EncodedBody(*parts)
+
+    async def set(self, user_id: int, key: str, value: Any, ttl: int = DEFAULT_TTL, tags: Iterable[str] = (), stale_ttl: int = 0) -> None:
+        payload = self._encode(time.time() + ttl, value)
+        index = self._index(user_id)
+        lifetime = ttl + stale_ttl
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.set(self._key(user_id, key), payload, ex=lifetime)
+                pipe.sadd(index, key)
+                self._extend_ttl(pipe, index, lifetime)
+                for tag in set(tags):
+                    pipe.sadd(self._tag(tag), self._key(user_id, key))
+                    self._extend_ttl(pipe, self._tag(tag), lifetime)
+                await pipe.execute()
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning("cache.redis_error op=set user_id=%s key=%s error=%s", user_id, key, e)
+            return
+        self._stats["sets"] += 1
+        logger.debug("cache.set user_id=%s key=%s bytes=%s", user_id, key, len(payload))
+
+    async def clear_user(self, user_id: int) -> None:
+        index = self._index(user_id)
+        try:
+            keys = await self.client.smembers(index)
+            names = [self._key(user_id, k.decode() if isinstance(k, bytes) else k) for k in keys]
+            await self.client.delete(index, *names)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning("cache.redis_error op=clear_user user_id=%s error=%s", user_id, e)
+            return
+        self._stats["invalidations"] += len(names)
+        logger.info("cache.clear_user user_id=%s entries=%s", user_id, len(names))
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        tag_keys = [self._tag(tag) for tag in tags]
+        if not tag_keys:
+            return 0
+        try:
+            members = await self.client.sunion(tag_keys)
+            names = [m.decode() if isinstance(m, bytes) else m for m in members]
+            await self.client.delete(*tag_keys, *names)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning("cache.redis_error op=invalidate_tags tags=%s error=%s", ",".join(tag_keys), e)
+            return 0
+        self._stats["invalidations"] += len(names)
+        logger.info("cache.invalidate tags=%s entries=%s", ",".join(tag_keys), len(names))
+        return len(names)
+
+    async def get_versions(self, names: list[str]) -> list[str] | None:
+        keys = [self._version(name) for name in names]
+        try:
+            values = await self.client.mget(keys)
+            missing = [key for key, value in zip(keys, values) if value is None]
+            if missing:
+                # NX: si otro proceso lo crea a la vez, todos se quedan con el mismo
+                async with self.client.pipeline(transaction=False) as pipe:
+                    for key in missing:
+                        pipe.set(key, _new_token(), nx=True)
+                    await pipe.execute()
+                values = await self.client.mget(keys)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning("cache.redis_error op=get_versions error=%s", e)
+            return None
+        return [v.decode() if isinstance(v, bytes) else v for v in values]
+
+    async def bump_versions(self, names: Iterable[str]) -> None:
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for name in names:
+                    pipe.set(self._version(name), _new_token())
+                await pipe.execute()
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning("cache.redis_error op=bump_versions error=%s", e)
+
+    async def close(self) -> None:
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close:
+            await close()
+
+
+def _build_backend() -> CacheBackend:
+    if not CACHE_URL:
+        return MemoryCacheBackend()
+    try:
+        import redis.asyncio as redis_asyncio
+    except ImportError:
+        logger.warning("cache.redis_unavailable reason=redis package not installed, using memory backend")
+        return MemoryCacheBackend()
+    return RedisCacheBackend(redis_asyncio.from_url(CACHE_URL))
+
+
+_backend: CacheBackend = _build_backend()
+
+
+def get_cache_backend() -> CacheBackend:
+    return _backend
+
+
+def configure_cache(backend: CacheBackend) -> CacheBackend:
+    """Sustituye el backend activo (p.ej. un RedisCacheBackend sobre fakeredis en local)."""
+    global _backend
+    _backend = backend
+    return backend
+
+
+async def get_cached_value(user_id: int, key: str) -> Any:
+    return await _backend.get(user_id, key)
+
+
+async def set_cached_value(user_id: int, key: str, value: Any, ttl: int = DEFAULT_TTL, tags: Iterable[str] = ()):
+    await _backend.set(user_id, key, value, ttl, tags)
+
+
+# Cálculos en curso: {(user_id, key, versiones): Task}. Las versiones (get_view_versions)
+# cambian con cada escritura del usuario o de precios en cualquier proceso, así que una petición
+# posterior a una escritura nunca se engancha a un cálculo que empezó antes de ella, y una
+# invalidación de otro usuario no afecta a los cálculos de este.
+_inflight: Dict[Tuple[int, str, str | None], asyncio.Task] = {}
+
+# TTL con el que se guarda lo calculado dentro de warming() (None fuera del bloque)
+_warming_ttl: contextvars.ContextVar[int | None] = contextvars.ContextVar("cache_warming_ttl", default=None)
+
+
+@contextmanager
+def warming(ttl: int):
+    """
+    Dentro del bloque get_or_compute no sirve lo que haya en caché: recalcula (o se une al
+    cálculo en curso) y guarda el resultado con ttl, recortado a la siguiente medianoche UTC.
+    Se hereda en las tareas creadas dentro.
+    """
+    token = _warming_ttl.set(ttl)
+    try:
+        yield
+    finally:
+        _warming_ttl.reset(token)
+
+
+def _seconds_to_utc_midnight() -> int:
+    return max(1, int(86400 - time.time() % 86400))
+
+
+async def _compute_and_store(user_id: int, key: str, compute, ttl: int, stale_ttl: int, versions: str | None):
+    value, tags = await compute()
+    if _warming_ttl.get() is not None and ttl > _seconds_to_utc_midnight():
+        # Las claves no llevan el día: una vista precalentada (serie, rentabilidades) no puede
+        # pasar de la medianoche UTC, ni como stale
+        ttl, stale_ttl = _seconds_to_utc_midnight(), 0
+    if versions is not None and await get_view_versions(user_id) == versions:
+        await _backend.set(user_id, key, value, ttl, tags, stale_ttl)
+    else:
+        # Hubo una escritura (en este u otro proceso) mientras se calculaba, o no se pudieron
+        # leer las versiones: el resultado puede ser anterior a ella
+        logger.debug("cache.discard user_id=%s key=%s reason=invalidated while computing", user_id, key)
     return value
 
-def set_cached_value(user_id: int, key: str, value: Any, ttl: int = DEFAULT_TTL):
-    if user_id not in _cache:
-        _cache[user_id] = {}
-    expires_at = time.time() + ttl
-    _cache[user_id][key] = (value, expires_at)
-    print(f"💾 [Cache] SET - Guardado valor en caché para el usuario {user_id} (clave: {key})")
-
-def clear_user_cache(user_id: int):
-    if user_id in _cache:
-        _cache[user_id].clear()
-        print(f"🧹 Caché del usuario {user_id} vaciada.")
+
+def _log_refresh_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("cache.refresh_failed error=%s", task.exception())
+
+
+async def _flight(user_id: int, key: str, compute, ttl: int, stale_ttl: int) -> Tuple[asyncio.Task, bool]:
+    """Devuelve (tarea que calcula la clave, si se ha creado ahora)."""
+    # Versiones leídas antes de calcular: se comparan de nuevo antes de guardar
+    versions = await get_view_versions(user_id)
+    flight_key = (user_id, key, versions)
+    task = _inflight.get(flight_key)
+    if task is not None:
+        return task, False
+    task = asyncio.create_task(_compute_and_store(user_id, key, compute, ttl, stale_ttl, versions))
+    _inflight[flight_key] = task
+    task.add_done_callback(lambda _: _inflight.pop(flight_key, None))
+    return task, True
+
+
+async def get_or_compute(user_id: int, key: str, compute, ttl: int = DEFAULT_TTL, stale_ttl: int = CACHE_STALE_TTL) -> Any:
+    """
+    Devuelve la vista de caché o la calcula con compute() -> (valor, etiquetas).
+
+    compute corre en su propia tarea (y debe abrir su propia sesión de BD): la comparten
+    todas las peticiones que esperan la misma clave y no depende de que siga viva la
+    petición que la lanzó. Con una entrada stale se devuelve esta y se refresca en segundo plano.
+    """
+    warm_ttl = _warming_ttl.get()
+    if warm_ttl is not None:
+        task, _ = await _flight(user_id, key, compute, warm_ttl, stale_ttl)
+        return await asyncio.shield(task)
+
+    entry = await _backend.get_entry(user_id, key)
+    if entry is not None:
+        value, fresh = entry
+        if not fresh:
+            task, created = await _flight(user_id, key, compute, ttl, stale_ttl)
+            if created:
+                _backend.record("refreshes")
+                task.add_done_callback(_log_refresh_error)
+        return value
+
+    task, created = await _flight(user_id, key, compute, ttl, stale_ttl)
+    if not created:
+        _backend.record("coalesced")
+        logger.debug("cache.coalesced user_id=%s key=%s", user_id, key)
+    # shield: si esta petición se cancela, el cálculo sigue para las demás
+    return await asyncio.shield(task)
+
+
+async def clear_user_cache(user_id: int):
+    await _backend.bump_versions([user_version(user_id)])
+    await _backend.clear_user(user_id)
+
+
+async def invalidate_tags(tags: Iterable[str], user_id: int | None = None) -> int:
+    """
+    Borra las vistas con esas etiquetas y cambia las versiones de datos afectadas: la de
+    user_id (quien escribe), la de cada accounts:{user_id} o friends:{user_id} y la de precios si
+    hay asset:{id}. Las versiones cambian antes de borrar: get_or_compute descarta así cualquier
+    cálculo en curso que leyera datos anteriores (las etiquetas account:{id} deben ir con user_id).
+    """
+    tags = list(tags)
+    versions = {user_version(user_id)} if user_id is not None else set()
+    for tag in tags:
+        kind, _, ident = tag.partition(":")
+        if kind == "asset":
+            versions.add(PRICES_VERSION)
+        elif kind in ("accounts", "friends"):
+            versions.add(user_version(int(ident)))
+    if versions:
+        await _backend.bump_versions(versions)
+    if not tags:
+        return 0
+    return await _backend.invalidate_tags(tags)
+
+
+async def bump_user_version(user_id: int):
+    """Cambia la versión de datos del usuario sin invalidar vistas (escrituras que no cachea ninguna vista)."""
+    await _backend.bump_versions([user_version(user_id)])
+
+
+async def get_view_versions(user_id: int) -> str | None:
+    """Token combinado (usuario + precios) para el ETag de las vistas del usuario. None si no hay backend."""
+    tokens = await _backend.get_versions([user_version(user_id), PRICES_VERSION])
+    return ".".join(tokens) if tokens else None
+
+
+async def run_cache_sweeper():
+    """Tarea de fondo: barrido periódico de entradas caducadas."""
+    while True:
+        await asyncio.sleep(CACHE_SWEEP_INTERVAL)
+        try:
+            await _backend.sweep_expired()
+        except Exception:
+            logger.exception("cache.sweep_failed")
+
+
+async def get_cache_stats() -> dict:
+    return await _backend.stats()
+
+
+async def close_cache():
+    for task in list(_inflight.values()):
+        task.cancel()
+    await _backend.close()
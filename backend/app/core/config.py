@@ -43,4 +43,33 @@ SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 SMTP_FROM = os.getenv("SMTP_FROM", "noreply@sprout.app")
 
 # Google OAuth
-GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "")
\ No newline at end of file
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "")
+
+# Motor de la serie diaria: "snapshot" (tabla portfolio_daily_snapshot) o "numpy" (cálculo vectorizado en el backend)
+VALUATION_ENGINE = os.getenv("VALUATION_ENGINE", "snapshot").lower()
+if VALUATION_ENGINE not in ("snapshot", "numpy"):
+    raise ValueError("VALUATION_ENGINE must be 'snapshot' or 'numpy'")
+
+# Consultas de lectura que un mismo endpoint compuesto puede lanzar a la vez (cada una ocupa una conexión del pool)
+PARALLEL_QUERY_LIMIT = int(os.getenv("PARALLEL_QUERY_LIMIT", "4"))
+
+# Caché compartida entre workers (redis://...). Vacío = caché en memoria por proceso
+CACHE_URL = os.getenv("CACHE_URL", "")
+
+# Caché en memoria (LRU con TTL): presupuesto global y periodo del barrido de caducados
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "5000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_SWEEP_INTERVAL = int(os.getenv("CACHE_SWEEP_INTERVAL", "60"))
+# Segundos tras caducar en los que una vista se sigue sirviendo mientras se recalcula en segundo plano (0 = desactivado)
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", "300"))
+# Precalentado tras la actualización diaria de precios: usuarios con login/refresco en los últimos N días
+# (0 = desactivado), cuántos a la vez y cuánto duran las vistas precalentadas (hasta la siguiente actualización,
+# pero nunca más allá de la medianoche UTC: la serie diaria cambia de día)
+CACHE_WARMUP_ACTIVE_DAYS = int(os.getenv("CACHE_WARMUP_ACTIVE_DAYS", "7"))
+CACHE_WARMUP_CONCURRENCY = int(os.getenv("CACHE_WARMUP_CONCURRENCY", "2"))
+CACHE_WARMUP_TTL = int(os.getenv("CACHE_WARMUP_TTL", str(24 * 3600)))
+# Token de operaciones para /metrics/cache (cabecera Authorization: Bearer <token>); vacío = ruta desactivada
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Nivel de logging de la aplicación (DEBUG muestra hits/misses de caché)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
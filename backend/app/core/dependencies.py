@@ -1,12 +1,46 @@
+import asyncio
+import secrets
 from fastapi import Depends, HTTPException, Request
 from jose import jwt, JWTError
 from app.core.database import AsyncSessionLocal
-from app.core.config import SECRET_KEY, ALGORITHM
+from app.core.config import SECRET_KEY, ALGORITHM, PARALLEL_QUERY_LIMIT, METRICS_TOKEN
 
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
 
+
+class ParallelSessions:
+    """
+    Lanza lecturas independientes a la vez, cada una en su propia sesión (y conexión) del pool.
+    Como mucho `limit` a la vez por petición. Si una falla se cancelan las demás y se
+    relanza esa misma excepción, así que el endpoint la trata igual que con una sola sesión.
+    """
+
+    def __init__(self, limit: int = PARALLEL_QUERY_LIMIT):
+        self._semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(self, query, *args, **kwargs):
+        """await query(session, *args, **kwargs) en una sesión propia."""
+        async with self._semaphore:
+            async with AsyncSessionLocal() as session:
+                return await query(session, *args, **kwargs)
+
+    async def gather(self, *queries):
+        """Ejecuta query(session) para cada query y devuelve los resultados en el mismo orden."""
+        tasks = [asyncio.ensure_future(self.run(query)) for query in queries]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+
+async def get_parallel_db() -> ParallelSessions:
+    return ParallelSessions()
+
 async def get_current_user_id(request: Request) -> int:
     """Extract user_id from access_token HttpOnly cookie."""
     token = request.cookies.get("access_token")
@@ -30,3 +64,12 @@ def verify_csrf(request: Request):
     csrf_header = request.headers.get("X-CSRF-Token")
     if not csrf_cookie or not csrf_header or csrf_cookie != csrf_header:
         raise HTTPException(status_code=403, detail="CSRF validation failed")
+
+def require_metrics_token(request: Request):
+    """Only ops can read the internal metrics: Authorization: Bearer <METRICS_TOKEN>.
+    Without METRICS_TOKEN configured the route does not exist (404)."""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.strip().encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Not authenticated")
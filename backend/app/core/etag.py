@@ -0,0 +1,49 @@
+"""
+GET condicional (ETag / If-None-Match) para las vistas de lectura del usuario.
+
+El ETag se deriva de la versión de datos del usuario y de la de precios (core/cache.py),
+del día UTC (la serie diaria crece cada día sin escrituras), de la URL con su query y de las
+codificaciones que acepta el cliente (cada variante comprimida es otra representación, de
+ahí Vary: Accept-Encoding). Se comprueba como dependencia antes del endpoint: si coincide
+con If-None-Match se responde 304 sin ejecutar servicios ni abrir conexión a la base de
+datos, con el coste de leer dos tokens de la caché.
+
+Cache-Control: private, no-cache hace que el navegador guarde la respuesta y la revalide
+siempre con If-None-Match, así que el frontend lo aprovecha sin cambios.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from fastapi import Depends, HTTPException, Request, Response
+from app.core.cache import get_view_versions
+from app.core.dependencies import get_current_user_id
+from app.core.responses import accepted_encodings
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: W/"x" coincide con "x"
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+async def etag_guard(request: Request, response: Response, user_id: int = Depends(get_current_user_id)):
+    """Dependencia de los GET cacheables: pone ETag o corta con 304 si el cliente ya tiene esa versión."""
+    if request.method not in ("GET", "HEAD"):
+        return
+    versions = await get_view_versions(user_id)
+    if versions is None:
+        return
+
+    today = datetime.now(timezone.utc).date().isoformat()
+    encodings = ",".join(accepted_encodings(request.headers.get("accept-encoding")))
+    raw = f"{user_id}|{versions}|{today}|{request.url.path}?{request.url.query}|{encodings}"
+    etag = '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
@@ -0,0 +1,28 @@
+"""
+Cursores opacos para paginación keyset.
+
+Un cursor codifica la clave de orden (fecha, id) de la última fila de una página; la
+siguiente página pide las filas estrictamente anteriores a esa clave, así que cuesta lo
+mismo sea la primera o la página mil. El endpoint devuelve el cursor de la siguiente
+página en la cabecera X-Next-Cursor (ausente en la última).
+"""
+
+import base64
+from datetime import datetime
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(date: datetime, row_id: int) -> str:
+    raw = f"{date.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverso de encode_cursor. ValueError si el cursor no es válido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
@@ -0,0 +1,93 @@
+"""
+Respuestas JSON ya codificadas para las vistas cacheadas.
+
+Las vistas de services/view_cache.py se guardan como EncodedBody: el JSON final (validado
+con el response_model del endpoint) y sus variantes gzip/brotli, calculados una vez al
+llenar la caché. Un hit solo elige la variante según Accept-Encoding y la escribe, sin
+volver a validar con Pydantic ni a serializar.
+
+brotli es opcional: sin el paquete solo se guardan identity y gzip (y se sirve gzip aunque
+el cliente prefiera br).
+"""
+
+import gzip
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Por debajo de este tamaño no compensa comprimir (cabeceras + marco gzip)
+MIN_COMPRESS_BYTES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 6
+
+
+@dataclass(frozen=True, slots=True)
+class EncodedBody:
+    """Cuerpo JSON y sus variantes comprimidas (None si no se ha generado)."""
+
+    identity: bytes
+    gzip: bytes | None = None
+    br: bytes | None = None
+
+    def variant(self, encoding: str) -> bytes | None:
+        return self.identity if encoding == "identity" else getattr(self, encoding)
+
+    def __sizeof__(self) -> int:
+        # Para el presupuesto de bytes de la caché en memoria
+        return 64 + sum(len(v) for v in (self.identity, self.gzip, self.br) if v is not None)
+
+
+def encode_json(value: Any, adapter: TypeAdapter, exclude_unset: bool = False) -> EncodedBody:
+    """Valida value con el esquema de respuesta, lo serializa y lo comprime."""
+    body = adapter.dump_json(adapter.validate_python(value), exclude_unset=exclude_unset)
+    if len(body) < MIN_COMPRESS_BYTES:
+        return EncodedBody(body)
+    return EncodedBody(
+        body,
+        gzip=gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+        br=brotli.compress(body, quality=BROTLI_QUALITY) if brotli is not None else None,
+    )
+
+
+def accepted_encodings(accept_encoding: str | None) -> list[str]:
+    """Codificaciones que acepta el cliente, de mejor a peor (br, gzip y siempre identity al final)."""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    encodings = [e for e in ("br", "gzip") if accepted.get(e, wildcard) > 0]
+    return encodings + ["identity"]
+
+
+class EncodedJSONResponse(Response):
+    media_type = "application/json"
+
+
+def encoded_response(body: EncodedBody, request: Request, response: Response | None = None) -> Response:
+    """
+    Respuesta con la variante de body que pide el cliente. response es el Response de las
+    dependencias (p.ej. el ETag de core/etag.py): FastAPI no lo copia si el endpoint
+    devuelve su propia respuesta.
+    """
+    encoding = next(e for e in accepted_encodings(request.headers.get("accept-encoding")) if body.variant(e) is not None)
+    headers = dict(response.headers) if response is not None else {}
+    headers.pop("content-length", None)
+    headers["vary"] = "Accept-Encoding"
+    if encoding != "identity":
+        headers["content-encoding"] = encoding
+    return EncodedJSONResponse(body.variant(encoding), headers=headers)
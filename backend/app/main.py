@@ -1,13 +1,41 @@
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+from fastapi import Depends, FastAPI, Request
 from fastapi.responses import JSONResponse
 from app.api.v1.router import api_router
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import ALLOWED_ORIGINS
+from app.core.config import ALLOWED_ORIGINS, LOG_LEVEL
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.dependencies import require_metrics_token
+from app.core.cache import run_cache_sweeper, get_cache_stats, close_cache
+from app.services.price_listener import listen_price_updates
+from app.services import cache_warmup
 import traceback
 
+logging.basicConfig(
+    level=LOG_LEVEL,
+    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    background = [
+        asyncio.create_task(run_cache_sweeper()),
+        # Precios nuevos del worker -> invalidación de las vistas que contienen esos activos
+        asyncio.create_task(listen_price_updates()),
+    ]
+    yield
+    for task in background:
+        task.cancel()
+    await close_cache()
+
+
 app = FastAPI(
     title="Sprout API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -16,6 +44,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # El frontend (otro origen) necesita leer el cursor de la siguiente página
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
@@ -37,4 +67,9 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+# Métricas internas (caché y precalentado): solo con el token de operaciones, fuera del esquema público
+@app.get("/metrics/cache", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def cache_metrics():
+    return {**await get_cache_stats(), "warmup": cache_warmup.last_report}
@@ -0,0 +1,102 @@
+"""
+Tareas de mantenimiento de la base de datos.
+
+Uso (desde backend/):
+    python -m app.maintenance rebuild-snapshots [--account-id ID]
+    python -m app.maintenance rebuild-latest-prices
+    python -m app.maintenance rebuild-positions [--account-id ID]
+    python -m app.maintenance rebuild-ledger [--account-id ID]
+"""
+
+import argparse
+import asyncio
+from sqlalchemy import text
+from app.core.database import AsyncSessionLocal
+from app.services.snapshot_service import refresh_account_snapshots
+from app.services.position_service import rebuild_positions as rebuild_position_rows
+from app.services.ledger_service import refresh_account_ledger
+
+
+async def rebuild_snapshots(account_id: int | None = None):
+    async with AsyncSessionLocal() as db:
+        if account_id:
+            account_ids = [account_id]
+        else:
+            result = await db.execute(text("SELECT account_id FROM accounts ORDER BY account_id"))
+            account_ids = [row[0] for row in result.fetchall()]
+
+        for aid in account_ids:
+            await refresh_account_snapshots(db, aid)
+            await db.commit()
+            print(f"  Serie diaria reconstruida para la cuenta {aid}")
+
+    print(f"✅ {len(account_ids)} cuenta(s) procesadas.")
+
+
+async def rebuild_latest_prices():
+    """Recalcula asset_latest_price desde price_history (p.ej. tras cargar precios a mano)."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("DELETE FROM asset_latest_price"))
+        result = await db.execute(text("""
+            INSERT INTO asset_latest_price (asset_id, date, price)
+            SELECT DISTINCT ON (asset_id) asset_id, date, price
+            FROM price_history
+            ORDER BY asset_id, trade_date DESC
+        """))
+        await db.commit()
+    print(f"✅ Último precio de {result.rowcount} activo(s) reconstruido.")
+
+
+async def rebuild_positions(account_id: int | None = None):
+    """Recalcula la tabla positions desde operations (repara posiciones desincronizadas)."""
+    async with AsyncSessionLocal() as db:
+        count = await rebuild_position_rows(db, account_id)
+        await db.commit()
+    print(f"✅ {count} posición(es) reconstruidas.")
+
+
+async def rebuild_ledger(account_id: int | None = None):
+    """Recalcula running_balance de las transacciones y accounts.cash_balance."""
+    async with AsyncSessionLocal() as db:
+        if account_id:
+            account_ids = [account_id]
+        else:
+            result = await db.execute(text("SELECT account_id FROM accounts ORDER BY account_id"))
+            account_ids = [row[0] for row in result.fetchall()]
+
+        for aid in account_ids:
+            await refresh_account_ledger(db, aid)
+            await db.commit()
+
+    print(f"✅ Libro de efectivo reconstruido para {len(account_ids)} cuenta(s).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tareas de mantenimiento de Sprout.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    snap = sub.add_parser("rebuild-snapshots", help="Reconstruye portfolio_daily_snapshot")
+    snap.add_argument("--account-id", type=int, help="Solo esta cuenta (por defecto todas)")
+
+    sub.add_parser("rebuild-latest-prices", help="Reconstruye asset_latest_price desde price_history")
+
+    pos = sub.add_parser("rebuild-positions", help="Reconstruye positions desde operations")
+    pos.add_argument("--account-id", type=int, help="Solo esta cuenta (por defecto todas)")
+
+    ledger = sub.add_parser("rebuild-ledger", help="Reconstruye los saldos de efectivo desde transactions")
+    ledger.add_argument("--account-id", type=int, help="Solo esta cuenta (por defecto todas)")
+
+    args = parser.parse_args()
+
+    if args.command == "rebuild-snapshots":
+        asyncio.run(rebuild_snapshots(args.account_id))
+    elif args.command == "rebuild-latest-prices":
+        asyncio.run(rebuild_latest_prices())
+    elif args.command == "rebuild-positions":
+        asyncio.run(rebuild_positions(args.account_id))
+    elif args.command == "rebuild-ledger":
+        asyncio.run(rebuild_ledger(args.account_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,10 @@ from .asset import Asset
 from .operation import Operation
 from .price_history import PriceHistory
 from .friendship import Friendship
+from .portfolio_snapshot import PortfolioDailySnapshot
+from .asset_latest_price import AssetLatestPrice
+from .position import Position
+from .series_change import SeriesChange
 
 __all__ = [
     "User",
@@ -13,5 +17,9 @@ __all__ = [
     "Asset",
     "Operation",
     "PriceHistory",
-    "Friendship"
+    "Friendship",
+    "PortfolioDailySnapshot",
+    "AssetLatestPrice",
+    "Position",
+    "SeriesChange"
 ]
\ No newline at end of file
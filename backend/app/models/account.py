@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, BigInteger, String, Boolean, DateTime, ForeignKey, Numeric
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -13,6 +13,7 @@ class Account(Base):
     currency = Column(String(3), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_active = Column(Boolean, default=True)
+    cash_balance = Column(Numeric(20, 6), nullable=False, server_default="0")  # lo mantiene ledger_service
     
     # Relationships
     user = relationship("User", back_populates="accounts")
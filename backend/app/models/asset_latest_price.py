@@ -0,0 +1,11 @@
+from sqlalchemy import Column, BigInteger, DateTime, ForeignKey, Numeric
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class AssetLatestPrice(Base):
+    __tablename__ = "asset_latest_price"
+    
+    asset_id = Column(BigInteger, ForeignKey("assets.asset_id", ondelete="CASCADE"), primary_key=True)
+    date = Column(DateTime(timezone=True), nullable=False)
+    price = Column(Numeric(15, 6), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
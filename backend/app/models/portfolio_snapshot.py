@@ -0,0 +1,15 @@
+from sqlalchemy import Column, BigInteger, Date, DateTime, ForeignKey, Numeric
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import JSONB
+from app.core.database import Base
+
+class PortfolioDailySnapshot(Base):
+    __tablename__ = "portfolio_daily_snapshot"
+    
+    account_id = Column(BigInteger, ForeignKey("accounts.account_id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    assets_value = Column(Numeric(15, 6), nullable=False, default=0)
+    cash_balance = Column(Numeric(15, 6), nullable=False, default=0)
+    invested_capital = Column(Numeric(15, 6), nullable=False, default=0)
+    positions = Column(JSONB, nullable=False, default=dict)  # {asset_id: cantidad} al cierre del día
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
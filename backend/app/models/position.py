@@ -0,0 +1,12 @@
+from sqlalchemy import Column, BigInteger, DateTime, ForeignKey, Numeric
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class Position(Base):
+    __tablename__ = "positions"
+    
+    account_id = Column(BigInteger, ForeignKey("accounts.account_id", ondelete="CASCADE"), primary_key=True)
+    asset_id = Column(BigInteger, ForeignKey("assets.asset_id", ondelete="CASCADE"), primary_key=True)
+    quantity = Column(Numeric(20, 6), nullable=False, default=0)
+    cost_basis = Column(Numeric, nullable=False, default=0)  # compras - ventas (cantidad * precio)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, DateTime, ForeignKey, Numeric, UniqueConstraint
+from sqlalchemy import Column, BigInteger, Computed, Date, DateTime, ForeignKey, Numeric, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -9,10 +9,12 @@ class PriceHistory(Base):
     asset_id = Column(BigInteger, ForeignKey("assets.asset_id"), nullable=False)
     date = Column(DateTime(timezone=True), nullable=False)
     price = Column(Numeric(15, 6), nullable=False)
+    # Día UTC del precio: clave de los upserts (un precio por activo y día) y de los joins por día
+    trade_date = Column(Date, Computed("(date AT TIME ZONE 'UTC')::date", persisted=True))
     
     # Relationships
     asset = relationship("Asset", back_populates="price_history")
     
     __table_args__ = (
-        UniqueConstraint('asset_id', 'date', name='uq_asset_date'),
+        UniqueConstraint('asset_id', 'trade_date', name='uq_price_asset_day'),
     )
\ No newline at end of file
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, BigInteger, Date, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class SeriesChange(Base):
+    __tablename__ = "series_changes"
+    
+    user_id = Column(BigInteger, ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    version = Column(BigInteger, primary_key=True)  # users.data_version tras el cambio
+    account_id = Column(BigInteger, primary_key=True)  # sin FK: la cuenta puede haberse borrado
+    from_day = Column(Date, nullable=True)  # NULL = cuenta borrada
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
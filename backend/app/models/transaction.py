@@ -16,6 +16,7 @@ class Transaction(Base):
     description = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_active = Column(Boolean, default=True)
+    running_balance = Column(Numeric(20, 6))  # saldo tras esta transacción (NULL si está inactiva)
     
     # Relationships
     account = relationship("Account", back_populates="transactions")
@@ -14,6 +14,8 @@ class User(Base):
     email_verified = Column(Boolean, default=False)
     google_id = Column(String(255), nullable=True, unique=True)
     auth_provider = Column(String(20), default='email')  # 'email', 'google', 'both'
+    last_active_at = Column(DateTime(timezone=True), nullable=True)  # Último login o refresco de sesión
+    data_version = Column(BigInteger, nullable=False, server_default="0")  # sube con cada fila de series_changes
     
     # Relationships
     accounts = relationship("Account", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
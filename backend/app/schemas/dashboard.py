@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Optional
+from app.schemas.allocation import AccountWithBalance, AssetAllocation, AssetTableRow
+from app.schemas.performance import PerformanceResponse
+from app.schemas.history_chart import PortfolioGrowthResponse
+
+class DashboardResponse(BaseModel):
+    # Solo vienen las secciones pedidas con ?sections=
+    accounts: Optional[list[AccountWithBalance]] = None
+    assets: Optional[list[AssetTableRow]] = None
+    allocation: Optional[list[AssetAllocation]] = None
+    performance: Optional[PerformanceResponse] = None
+    growth: Optional[PortfolioGrowthResponse] = None
@@ -1,6 +1,9 @@
 from pydantic import BaseModel
 from datetime import date
-from typing import List
+from typing import List, Literal, Optional
+
+# Un punto por día, semana o mes (el cierre de cada periodo)
+GrowthResolution = Literal["day", "week", "month"]
 
 class PortfolioPoint(BaseModel):
     date: date
@@ -8,4 +11,9 @@ class PortfolioPoint(BaseModel):
     total_value: float
 
 class PortfolioGrowthResponse(BaseModel):
-    history: List[PortfolioPoint]
\ No newline at end of file
+    history: List[PortfolioPoint]
+    # Versión de datos con la que se calculó la serie (pasarla como ?version= junto a ?since=)
+    version: Optional[int] = None
+    # True: history es la serie completa. False (delta): sustituir los puntos desde from_date por history
+    reset: bool = True
+    from_date: Optional[date] = None
\ No newline at end of file
@@ -9,4 +9,6 @@ class PerformanceResponse(BaseModel):
     month: PerformanceMetric
     three_months: PerformanceMetric
     ytd: PerformanceMetric
-    total: PerformanceMetric
\ No newline at end of file
+    total: PerformanceMetric
+    # Ventanas extra pedidas con ?periods=1W,6M,1Y,AAAA-MM-DD..AAAA-MM-DD
+    periods: Dict[str, PerformanceMetric] = {}
@@ -17,6 +17,7 @@ class TransactionResponse(TransactionBase):
     transaction_id: int
     created_at: datetime
     account_name: str
+    running_balance: Optional[float] = None
 
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -42,11 +42,7 @@ async def get_all_assets_with_prices(db: AsyncSession, user_id: int):
                COALESCE(lp.price, 0) AS current_price
         FROM assets a
         JOIN user_assets ua ON ua.asset_id = a.asset_id AND ua.user_id = :user_id
-        LEFT JOIN LATERAL (
-            SELECT price FROM price_history
-            WHERE asset_id = a.asset_id
-            ORDER BY date DESC LIMIT 1
-        ) lp ON true
+        LEFT JOIN asset_latest_price lp ON lp.asset_id = a.asset_id
         WHERE a.is_active = true
         ORDER BY a.name;
     """)
@@ -78,33 +74,13 @@ async def get_asset_allocation(db, account_id: int, user_id: int, group_by: str)
     if group_by != 'asset' and group_by != 'theme' and group_by != 'type':
         group_by = 'asset'
     query = text("""
-        WITH positions AS (
-            SELECT
-                o.asset_id,
-                SUM(
-                    CASE
-                        WHEN o.operation_type = 'buy' THEN o.quantity
-                        ELSE -o.quantity
-                    END
-                ) AS net_quantity
-            FROM operations o
-            JOIN accounts ac ON ac.account_id = o.account_id
-            WHERE o.account_id = :account_id
+        WITH held_positions AS (
+            SELECT p.asset_id, p.quantity AS net_quantity
+            FROM positions p
+            JOIN accounts ac ON ac.account_id = p.account_id
+            WHERE p.account_id = :account_id
                 AND ac.user_id = :user_id
-            GROUP BY o.asset_id
-            HAVING SUM(
-                CASE
-                    WHEN o.operation_type = 'buy' THEN o.quantity
-                    ELSE -o.quantity
-                END
-            ) > 0
-        ),
-        latest_prices AS (
-            SELECT DISTINCT ON (asset_id)
-                asset_id,
-                price
-            FROM price_history
-            ORDER BY asset_id, date DESC
+                AND p.quantity > 0
         ),
         valued_positions AS (
             SELECT
@@ -113,9 +89,9 @@ async def get_asset_allocation(db, account_id: int, user_id: int, group_by: str)
                 COALESCE(a.theme, 'Unclassified') AS theme,
                 a.type,
                 p.net_quantity * lp.price AS value
-            FROM positions p
+            FROM held_positions p
             JOIN assets a ON a.asset_id = p.asset_id
-            JOIN latest_prices lp ON lp.asset_id = p.asset_id
+            JOIN asset_latest_price lp ON lp.asset_id = p.asset_id
         )
         SELECT
             CASE
@@ -149,32 +125,13 @@ async def get_global_asset_allocation(db, user_id: int, group_by: str):
     if group_by != 'asset' and group_by != 'theme' and group_by != 'type':
         group_by = 'asset'
     query = text("""
-        WITH positions AS (
-            SELECT
-                o.asset_id,
-                SUM(
-                    CASE
-                        WHEN o.operation_type = 'buy' THEN o.quantity
-                        ELSE -o.quantity
-                    END
-                ) AS net_quantity
-            FROM operations o
-            JOIN accounts ac ON ac.account_id = o.account_id
+        WITH held_positions AS (
+            SELECT p.asset_id, SUM(p.quantity) AS net_quantity
+            FROM positions p
+            JOIN accounts ac ON ac.account_id = p.account_id
             WHERE ac.user_id = :user_id
-            GROUP BY o.asset_id
-            HAVING SUM(
-                CASE
-                    WHEN o.operation_type = 'buy' THEN o.quantity
-                    ELSE -o.quantity
-                END
-            ) > 0
-        ),
-        latest_prices AS (
-            SELECT DISTINCT ON (asset_id)
-                asset_id,
-                price
-            FROM price_history
-            ORDER BY asset_id, date DESC
+            GROUP BY p.asset_id
+            HAVING SUM(p.quantity) > 0
         ),
         valued_positions AS (
             SELECT
@@ -183,9 +140,9 @@ async def get_global_asset_allocation(db, user_id: int, group_by: str):
                 COALESCE(a.theme, 'Unclassified') AS theme,
                 a.type,
                 p.net_quantity * lp.price AS value
-            FROM positions p
+            FROM held_positions p
             JOIN assets a ON a.asset_id = p.asset_id
-            JOIN latest_prices lp ON lp.asset_id = p.asset_id
+            JOIN asset_latest_price lp ON lp.asset_id = p.asset_id
         )
         SELECT
             CASE
@@ -219,48 +176,16 @@ async def get_all_assets(db, user_id: int):
     Devuelve todos los activos del usuario con detalles completos
     """
     query = text("""
-        WITH positions AS (
-            SELECT
-                o.account_id,
-                o.asset_id,
-                SUM(
-                    CASE
-                        WHEN o.operation_type = 'buy' THEN o.quantity
-                        ELSE -o.quantity
-                    END
-                ) AS net_quantity
-            FROM operations o
-            JOIN accounts ac ON ac.account_id = o.account_id
-            WHERE ac.user_id = :user_id
-            GROUP BY o.account_id, o.asset_id
-            HAVING SUM(
-                CASE
-                    WHEN o.operation_type = 'buy' THEN o.quantity
-                    ELSE -o.quantity
-                END
-            ) > 0
-        ),
-        latest_prices AS (
-            SELECT DISTINCT ON (asset_id)
-                asset_id,
-                price
-            FROM price_history
-            ORDER BY asset_id, date DESC
-        ),
-        asset_performance AS (
+        WITH user_positions AS (
             SELECT
-                o.account_id,
-                o.asset_id,
-                SUM(
-                    CASE
-                        WHEN o.operation_type = 'buy' THEN o.quantity * o.price
-                        ELSE -o.quantity * o.price
-                    END
-                ) AS invested_value
-            FROM operations o
-            JOIN accounts ac ON ac.account_id = o.account_id
+                p.account_id,
+                p.asset_id,
+                p.quantity AS net_quantity,
+                p.cost_basis AS invested_value
+            FROM positions p
+            JOIN accounts ac ON ac.account_id = p.account_id
             WHERE ac.user_id = :user_id
-            GROUP BY o.account_id, o.asset_id  -- ¡Importante: agrupa por account y asset!
+                AND p.quantity > 0
         ),
         valued_positions AS (
             SELECT
@@ -275,17 +200,16 @@ async def get_all_assets(db, user_id: int):
                 p.net_quantity,
                 lp.price AS current_price,
                 p.net_quantity * lp.price AS total_value,
-                COALESCE(ap.invested_value, 0) AS invested_value,  -- Usa COALESCE para evitar NULL
+                p.invested_value,
                 CASE 
-                    WHEN COALESCE(ap.invested_value, 0) > 0 
-                    THEN ((p.net_quantity * lp.price - ap.invested_value) / ap.invested_value * 100)
+                    WHEN p.invested_value > 0 
+                    THEN ((p.net_quantity * lp.price - p.invested_value) / p.invested_value * 100)
                     ELSE 0 
                 END AS performance_pct
-            FROM positions p
+            FROM user_positions p
             JOIN accounts ac ON ac.account_id = p.account_id
             JOIN assets a ON a.asset_id = p.asset_id
-            JOIN latest_prices lp ON lp.asset_id = p.asset_id
-            LEFT JOIN asset_performance ap ON ap.account_id = p.account_id AND ap.asset_id = p.asset_id
+            JOIN asset_latest_price lp ON lp.asset_id = p.asset_id
             WHERE ac.user_id = :user_id
         )
         SELECT
@@ -1,13 +1,14 @@
 import asyncio
-import math
 import traceback
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 import yfinance as yf
-from sqlalchemy import select, func, text
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import AsyncSessionLocal
-from app.models import Operation, Asset, PriceHistory, Account
+from app.models import Operation, Asset, Account
+from app.services.price_ingest import frame_to_rows, ingest_prices
+from app.services.snapshot_service import mark_asset_snapshots_dirty, recompute_dirty_snapshots
+from app.core.cache import invalidate_tags, asset_tag
 
 def fetch_yf_history(identifier: str, start_str: str, end_str: str):
     try:
@@ -23,6 +24,7 @@ async def run_backfill_for_assets(db: AsyncSession, assets_data: list):
     """
     try:
         print(f"=== Starting DB backfill for {len(assets_data)} assets ===")
+        backfill_start = None
         
         for asset in assets_data:
             asset_id = asset["asset_id"]
@@ -37,6 +39,9 @@ async def run_backfill_for_assets(db: AsyncSession, assets_data: list):
                 # Fallback to 365 days ago
                 start_date = datetime.now() - timedelta(days=365)
                 
+            if backfill_start is None or start_date.date() < backfill_start:
+                backfill_start = start_date.date()
+
             start_str = start_date.strftime("%Y-%m-%d")
             end_str = datetime.now().strftime("%Y-%m-%d")
             
@@ -51,61 +56,28 @@ async def run_backfill_for_assets(db: AsyncSession, assets_data: list):
                 
             print(f"Received {len(data)} price records for {identifier}")
             
-            # Prepare batch insert values
-            inserted_count = 0
-            for date_index, row in data.iterrows():
-                price_val = float(row['Close'])
-                if math.isnan(price_val) or math.isinf(price_val) or price_val <= 0:
-                    continue
-                    
-                price_date = date_index.to_pydatetime()
-                if price_date.tzinfo is None:
-                    price_date = price_date.replace(tzinfo=timezone.utc)
-                else:
-                    price_date = price_date.astimezone(timezone.utc)
-                
-                # Upsert into price_history
-                stmt = insert(PriceHistory).values(
-                    asset_id=asset_id,
-                    date=price_date,
-                    price=price_val
-                ).on_conflict_do_update(
-                    index_elements=['asset_id', 'date'],
-                    set_={'price': price_val}
-                )
-                await db.execute(stmt)
-                inserted_count += 1
-                
+            # Vectorized NaN/inf/<=0 filtering, then one multi-row upsert
+            rows = frame_to_rows(asset_id, data)
+            inserted_count = await ingest_prices(db, rows)
             await db.commit()
             print(f"Saved {inserted_count} price records for {identifier}")
             
             # Sleep to be polite to Yahoo Finance
             await asyncio.sleep(1.5)
             
-        # Run history consolidation
-        await consolidate_history_db(db)
+        # Old prices changed: recompute the daily series of every account holding these assets
+        # from the earliest backfilled day onwards
+        if backfill_start:
+            await mark_asset_snapshots_dirty(db, [a["asset_id"] for a in assets_data], backfill_start)
+            await recompute_dirty_snapshots(db)
+            await db.commit()
+
+        # Invalidate every cached view (any user) that holds one of these assets
+        await invalidate_tags([asset_tag(a["asset_id"]) for a in assets_data])
     except Exception as e:
         print(f"Error general en run_backfill_for_assets: {e}")
         traceback.print_exc()
 
-async def consolidate_history_db(db: AsyncSession):
-    print("🧹 Consolidating database history...")
-    try:
-        await db.execute(text("""
-            DELETE FROM price_history
-            WHERE price_id NOT IN (
-                SELECT DISTINCT ON (asset_id, date::date) price_id
-                FROM price_history
-                ORDER BY asset_id, date::date, date DESC
-            )
-            AND date::date < CURRENT_DATE;
-        """))
-        await db.commit()
-        print("Consolidation done.")
-    except Exception as e:
-        print(f"Error during consolidation: {e}")
-        await db.rollback()
-
 async def backfill_account_prices(account_id: int):
     """
     Background task to backfill prices for all assets in a specific account.
@@ -137,14 +109,6 @@ async def backfill_account_prices(account_id: int):
                 
             if assets_data:
                 await run_backfill_for_assets(db, assets_data)
-
-            # Invalidate cache for the account owner
-            acc_stmt = select(Account.user_id).where(Account.account_id == account_id)
-            acc_res = await db.execute(acc_stmt)
-            user_id = acc_res.scalar_one_or_none()
-            if user_id:
-                from app.core.cache import clear_user_cache
-                clear_user_cache(user_id)
     except Exception as e:
         print(f"Error en backfill_account_prices para account_id={account_id}: {e}")
         traceback.print_exc()
@@ -181,9 +145,6 @@ async def backfill_portfolio_prices(user_id: int):
                 
             if assets_data:
                 await run_backfill_for_assets(db, assets_data)
-
-            from app.core.cache import clear_user_cache
-            clear_user_cache(user_id)
     except Exception as e:
         print(f"Error en backfill_portfolio_prices para user_id={user_id}: {e}")
         traceback.print_exc()
@@ -0,0 +1,26 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from app.core.cache import account_tag, asset_tag, accounts_tag
+
+
+async def get_view_tags(db: AsyncSession, user_id: int, account_id: int | None = None) -> list[str]:
+    """
+    Etiquetas de caché de una vista del usuario: sus cuentas (o solo account_id) y
+    los activos que se han operado en ellas. Una sola consulta indexada por cuenta.
+    """
+    scope = "a.account_id = :account_id AND a.user_id = :user_id" if account_id else "a.user_id = :user_id"
+    result = await db.execute(text(f"""
+        SELECT a.account_id, o.asset_id
+        FROM accounts a
+        LEFT JOIN LATERAL (
+            SELECT DISTINCT asset_id FROM operations WHERE account_id = a.account_id
+        ) o ON TRUE
+        WHERE {scope}
+    """), {"user_id": user_id, "account_id": account_id})
+
+    tags = {accounts_tag(user_id)}
+    for row in result.all():
+        tags.add(account_tag(row.account_id))
+        if row.asset_id is not None:
+            tags.add(asset_tag(row.asset_id))
+    return sorted(tags)
@@ -0,0 +1,124 @@
+"""
+Precalentado de la caché tras la actualización diaria de precios.
+
+El worker, al terminar fetch_closing_prices, envía NOTIFY cache_warmup.
+El backend recalcula entonces las vistas con las que arranca PortfolioPage para los usuarios
+que han hecho login o refrescado la sesión en los últimos CACHE_WARMUP_ACTIVE_DAYS días, como
+mucho CACHE_WARMUP_CONCURRENCY usuarios a la vez, y las guarda con CACHE_WARMUP_TTL para que
+la primera petición del día sea un hit.
+
+Con caché en memoria cada proceso precalienta la suya; con Redis solo lo hace el proceso que
+consigue el advisory lock. Al acabar se responde con NOTIFY cache_warmup_done {users, failed,
+seconds}, que el worker imprime en su resumen.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
+from app.core.cache import get_cache_backend, warming
+from app.core.config import CACHE_WARMUP_ACTIVE_DAYS, CACHE_WARMUP_CONCURRENCY, CACHE_WARMUP_TTL
+from app.core.database import AsyncSessionLocal
+from app.core.dependencies import ParallelSessions
+from app.services.dashboard_service import SECTIONS
+from app.services.view_cache import (
+    accounts_view, all_assets_view, allocation_view, performance_view, growth_view, dashboard_view
+)
+
+logger = logging.getLogger("app.cache_warmup")
+
+WARMUP_CHANNEL = "cache_warmup"
+WARMUP_DONE_CHANNEL = "cache_warmup_done"
+# Clave del advisory lock que reparte el precalentado entre procesos con caché compartida
+_LOCK_KEY = 0x5370726F  # "Spro"
+
+# Resultado del último precalentado de este proceso (se expone en /metrics/cache)
+last_report: dict | None = None
+
+
+async def get_active_user_ids(days: int = CACHE_WARMUP_ACTIVE_DAYS) -> list[int]:
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            text("""
+                SELECT user_id FROM users
+                WHERE is_active = TRUE AND last_active_at >= :since
+                ORDER BY last_active_at DESC
+            """),
+            {"since": since}
+        )
+        return [row[0] for row in result.all()]
+
+
+async def warm_user(user_id: int):
+    """Las vistas que pide PortfolioPage al cargar (agrupación por tipo, todas las cuentas)."""
+    await accounts_view(user_id)
+    await all_assets_view(user_id)
+    await allocation_view(user_id, "type")
+    await performance_view(user_id)
+    # El gráfico pide la serie diaria completa (y luego solo deltas, frontend/src/services/historyService.ts)
+    await growth_view(user_id)
+    # Una sola conexión: el precalentado no debe quitarle el pool a las peticiones
+    await dashboard_view(ParallelSessions(limit=1), user_id, list(SECTIONS), "type")
+
+
+async def _warm_all(user_ids: list[int], concurrency: int) -> int:
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    failed = 0
+
+    async def warm(user_id: int):
+        nonlocal failed
+        async with semaphore:
+            try:
+                await warm_user(user_id)
+            except Exception as e:
+                failed += 1
+                logger.warning("cache_warmup.user_failed user_id=%s error=%s", user_id, e)
+
+    with warming(CACHE_WARMUP_TTL):
+        await asyncio.gather(*(warm(user_id) for user_id in user_ids))
+    return failed
+
+
+async def warm_active_users(days: int = CACHE_WARMUP_ACTIVE_DAYS, concurrency: int = CACHE_WARMUP_CONCURRENCY) -> dict | None:
+    """
+    Precalienta las vistas de los usuarios activos. Devuelve {users, failed, seconds}
+    o None si no toca (desactivado u otro proceso ya lo está haciendo).
+    """
+    global last_report
+    if days <= 0:
+        return None
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as lock_db:
+        if get_cache_backend().shared:
+            result = await lock_db.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _LOCK_KEY})
+            if not result.scalar():
+                logger.info("cache_warmup.skipped reason=running in another process")
+                return None
+        try:
+            user_ids = await get_active_user_ids(days)
+            failed = await _warm_all(user_ids, concurrency)
+        finally:
+            if get_cache_backend().shared:
+                await lock_db.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _LOCK_KEY})
+
+    last_report = {
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "users": len(user_ids),
+        "failed": failed,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    logger.info(
+        "cache_warmup.done users=%d failed=%d seconds=%.3f",
+        last_report["users"], failed, last_report["seconds"]
+    )
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": WARMUP_DONE_CHANNEL, "payload": json.dumps(last_report)}
+        )
+        await db.commit()
+    return last_report
@@ -0,0 +1,201 @@
+"""
+Dashboard de cartera en una sola petición (/portfolio/dashboard).
+
+Carga una vez las posiciones del usuario con su último precio (y, si hace falta, la
+serie diaria) y deriva de ahí todas las vistas que pide PortfolioPage, con los mismos
+resultados que los endpoints individuales. Las lecturas son independientes y se lanzan
+a la vez en sesiones separadas (ParallelSessions), así que la respuesta tarda lo que
+la más lenta:
+
+- accounts     -> /portfolio/accounts
+- assets       -> /portfolio/assets/all
+- allocation   -> /portfolio/assets/{group_by}[/{account_id}]
+- performance  -> /portfolio/performance[?account_id=]
+- growth       -> /history_chart/growth[/account/{account_id}]
+"""
+
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.dependencies import ParallelSessions
+from app.services.history_chart_service import get_portfolio_growth, get_account_growth
+from app.services.performance_service import performance_from_series
+
+SECTIONS = ("accounts", "assets", "allocation", "performance", "growth")
+
+
+def parse_sections(value: str | None) -> list[str]:
+    """'accounts,growth' -> ['accounts', 'growth'] en el orden canónico. Vacío (o solo comas/espacios) = todas."""
+    requested = {s.strip().lower() for s in (value or "").split(",") if s.strip()}
+    if not requested:
+        return list(SECTIONS)
+    unknown = requested - set(SECTIONS)
+    if unknown:
+        raise ValueError(f"Secciones no soportadas: {', '.join(sorted(unknown))}. Válidas: {', '.join(SECTIONS)}")
+    return [s for s in SECTIONS if s in requested]
+
+
+async def _load_holdings(db: AsyncSession, user_id: int):
+    """Posiciones de todas las cuentas del usuario con su último precio (el resultado intermedio compartido)."""
+    result = await db.execute(text("""
+        SELECT
+            p.account_id,
+            ac.name AS account_name,
+            p.asset_id,
+            a.name,
+            a.ticker,
+            a.isin,
+            a.type,
+            COALESCE(a.theme, 'Unclassified') AS theme,
+            p.quantity,
+            p.cost_basis,
+            lp.price
+        FROM positions p
+        JOIN accounts ac ON ac.account_id = p.account_id
+        JOIN assets a ON a.asset_id = p.asset_id
+        JOIN asset_latest_price lp ON lp.asset_id = p.asset_id
+        WHERE ac.user_id = :user_id
+        ORDER BY ac.name, p.quantity * lp.price DESC
+    """), {"user_id": user_id})
+    # Mismo orden que /portfolio/assets/all (con la collation de la base de datos)
+    return result.mappings().all()
+
+
+async def _load_accounts(db: AsyncSession, user_id: int):
+    result = await db.execute(text("""
+        SELECT account_id, name, type, currency, cash_balance,
+               DENSE_RANK() OVER (ORDER BY type) AS type_rank
+        FROM accounts
+        WHERE user_id = :user_id AND is_active = TRUE
+    """), {"user_id": user_id})
+    return result.mappings().all()
+
+
+def _accounts(accounts, holdings):
+    invested = defaultdict(Decimal)
+    for h in holdings:
+        invested[h["account_id"]] += h["quantity"] * h["price"]
+    rows = []
+    for acc in accounts:
+        value = invested.get(acc["account_id"], Decimal(0))
+        rows.append({
+            "account_id": acc["account_id"],
+            "name": acc["name"],
+            "type": acc["type"],
+            "currency": acc["currency"],
+            "cash_balance": acc["cash_balance"],
+            "invested_value": value,
+            "total_value": acc["cash_balance"] + value,
+            "type_rank": acc["type_rank"],
+        })
+    # Como /portfolio/accounts (ORDER BY type, total_value DESC): el tipo se ordena en SQL con
+    # la collation de la base de datos (type_rank) y el patrimonio aquí
+    rows.sort(key=lambda r: (r["type_rank"], -r["total_value"]))
+    for row in rows:
+        del row["type_rank"]
+    return rows
+
+
+def _assets(holdings):
+    rows = []
+    for h in holdings:
+        if h["quantity"] <= 0:
+            continue
+        total_value = h["quantity"] * h["price"]
+        invested = h["cost_basis"]
+        performance = (total_value - invested) / invested * 100 if invested > 0 else Decimal(0)
+        rows.append({
+            "account_id": h["account_id"],
+            "account_name": h["account_name"],
+            "asset_id": h["asset_id"],
+            "name": h["name"],
+            "ticker": h["ticker"],
+            "isin": h["isin"],
+            "type": h["type"],
+            "theme": h["theme"],
+            "quantity": h["quantity"],
+            "current_price": h["price"],
+            "total_value": total_value,
+            "invested_value": invested,
+            "performance": performance.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP),
+        })
+    # holdings ya viene ordenado por cuenta y valor
+    return rows
+
+
+def _allocation(holdings, group_by: str, account_id: int | None):
+    # Cantidad neta por activo (en la cuenta o sumando todas); solo cuenta la que queda > 0
+    net = defaultdict(Decimal)
+    info = {}
+    for h in holdings:
+        if account_id is not None and h["account_id"] != account_id:
+            continue
+        net[h["asset_id"]] += h["quantity"]
+        info[h["asset_id"]] = h
+
+    groups = {}
+    for asset_id, quantity in net.items():
+        if quantity <= 0:
+            continue
+        h = info[asset_id]
+        key = h["theme"] if group_by == "theme" else h["type"] if group_by == "type" else h["name"]
+        group = groups.setdefault(key, {"total_value": Decimal(0), "assets": set()})
+        group["total_value"] += quantity * h["price"]
+        group["assets"].add(asset_id)
+
+    grand_total = sum(g["total_value"] for g in groups.values())
+    rows = [
+        {
+            "group_key": key,
+            "total_value": g["total_value"],
+            "allocation_pct": g["total_value"] / grand_total if grand_total else Decimal(0),
+            "asset_count": len(g["assets"]),
+        }
+        for key, g in groups.items()
+    ]
+    rows.sort(key=lambda r: -r["total_value"])
+    return rows
+
+
+async def get_dashboard(
+    parallel: ParallelSessions,
+    user_id: int,
+    sections: list[str],
+    group_by: str = "type",
+    account_id: int | None = None,
+    periods: list[str] | None = None,
+):
+    """
+    Devuelve {sección: vista} para las secciones pedidas. accounts y assets son siempre
+    de todo el usuario; allocation, performance y growth se limitan a account_id si se indica
+    (la propiedad de la cuenta la comprueba el endpoint).
+    """
+    if group_by not in ("asset", "theme", "type"):
+        group_by = "asset"
+
+    queries = {}
+    if {"accounts", "assets", "allocation"} & set(sections):
+        queries["holdings"] = lambda db: _load_holdings(db, user_id)
+    if "accounts" in sections:
+        queries["accounts"] = lambda db: _load_accounts(db, user_id)
+    if {"performance", "growth"} & set(sections):
+        # Una sola lectura de la serie diaria para ambas secciones
+        if account_id is not None:
+            queries["series"] = lambda db: get_account_growth(db, account_id)
+        else:
+            queries["series"] = lambda db: get_portfolio_growth(db, user_id)
+    loaded = dict(zip(queries, await parallel.gather(*queries.values())))
+
+    response = {}
+    if "accounts" in sections:
+        response["accounts"] = _accounts(loaded["accounts"], loaded["holdings"])
+    if "assets" in sections:
+        response["assets"] = _assets(loaded["holdings"])
+    if "allocation" in sections:
+        response["allocation"] = _allocation(loaded["holdings"], group_by, account_id)
+    if "performance" in sections:
+        response["performance"] = performance_from_series(loaded["series"], periods)
+    if "growth" in sections:
+        response["growth"] = {"history": loaded["series"]}
+    return response
@@ -2,6 +2,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_, and_
 from app.models.friendship import Friendship
 from app.models.user import User
+from app.core.cache import get_or_compute, invalidate_tags, friends_tag
+from app.core.database import AsyncSessionLocal
+
+FRIENDS_CACHE_KEY = "friend_ids"
 
 
 async def send_friend_request(db: AsyncSession, requester_id: int, addressee_email: str) -> dict:
@@ -62,6 +66,7 @@ async def accept_friend_request(db: AsyncSession, friendship_id: int, user_id: i
 
     friendship.status = "accepted"
     await db.commit()
+    await invalidate_tags([friends_tag(friendship.requester_id), friends_tag(friendship.addressee_id)])
 
     # Get requester email
     result = await db.execute(select(User.email).where(User.user_id == friendship.requester_id))
@@ -90,6 +95,7 @@ async def reject_or_remove_friend(db: AsyncSession, friendship_id: int, user_id:
 
     await db.delete(friendship)
     await db.commit()
+    await invalidate_tags([friends_tag(friendship.requester_id), friends_tag(friendship.addressee_id)])
 
 
 async def get_friends_list(db: AsyncSession, user_id: int) -> list[dict]:
@@ -119,15 +125,29 @@ async def get_friends_list(db: AsyncSession, user_id: int) -> list[dict]:
     return friends
 
 
-async def is_friend(db: AsyncSession, user_id: int, friend_id: int) -> bool:
+async def get_friend_ids(user_id: int) -> set[int]:
+    """
+    Accepted friends of a user, cached until a friendship of theirs is accepted or removed.
+
+    Goes through get_or_compute so a removal that lands while the set is being read is never
+    cached (it would keep a removed friend authorized for the whole TTL).
+    """
+    async def compute():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Friendship.requester_id, Friendship.addressee_id).where(
+                    Friendship.status == "accepted",
+                    or_(Friendship.requester_id == user_id, Friendship.addressee_id == user_id),
+                )
+            )
+            rows = result.all()
+        friend_ids = {addressee_id if requester_id == user_id else requester_id for requester_id, addressee_id in rows}
+        return sorted(friend_ids), [friends_tag(user_id)]
+
+    # Sin margen stale: un amigo eliminado no debe seguir entrando mientras se refresca
+    return set(await get_or_compute(user_id, FRIENDS_CACHE_KEY, compute, stale_ttl=0))
+
+
+async def is_friend(user_id: int, friend_id: int) -> bool:
     """Check if two users are accepted friends."""
-    result = await db.execute(
-        select(Friendship).where(
-            Friendship.status == "accepted",
-            or_(
-                and_(Friendship.requester_id == user_id, Friendship.addressee_id == friend_id),
-                and_(Friendship.requester_id == friend_id, Friendship.addressee_id == user_id),
-            ),
-        )
-    )
-    return result.scalar_one_or_none() is not None
+    return friend_id in await get_friend_ids(user_id)
@@ -1,186 +1,175 @@
+from datetime import date, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from app.schemas.history_chart import PortfolioPoint
-from typing import List
+from app.core.config import VALUATION_ENGINE
+from app.services.snapshot_service import ensure_user_snapshots, ensure_account_snapshots
+from app.services import valuation_engine
+from app.services.series_changes import get_series_changes
 
-async def get_portfolio_growth(db: AsyncSession, user_id: int):
-    query = text("""
-    WITH RECURSIVE daily_series AS (
-        SELECT MIN(date)::date AS day, NOW()::date AS last_day
-        FROM transactions t
-        JOIN accounts a ON t.account_id = a.account_id
-        WHERE a.user_id = :user_id AND t.is_active = TRUE
-        UNION ALL
-        SELECT (day + interval '1 day')::date, last_day
-        FROM daily_series
-        WHERE day < last_day
-    ),
-    raw_balances AS (
-        SELECT 
-            o.asset_id,
-            o.date::date as op_date,
-            SUM(SUM(CASE WHEN o.operation_type = 'buy' THEN o.quantity ELSE -o.quantity END)) 
-                OVER (PARTITION BY o.asset_id ORDER BY o.date::date) as qty
-        FROM operations o
-        JOIN accounts a ON o.account_id = a.account_id
-        WHERE a.user_id = :user_id
-        GROUP BY o.asset_id, o.date::date
-    ),
-    price_steps AS (
-        SELECT 
-            d.day,
-            ast.asset_id,
-            ph.price,
-            COUNT(ph.price) OVER (PARTITION BY ast.asset_id ORDER BY d.day) as price_grp
-        FROM daily_series d
-        CROSS JOIN (
-            SELECT DISTINCT asset_id FROM operations o 
-            JOIN accounts a ON o.account_id = a.account_id 
-            WHERE a.user_id = :user_id
-        ) ast
-        LEFT JOIN price_history ph ON ph.asset_id = ast.asset_id AND ph.date::date = d.day
-    ),
-    filled_prices AS (
-        SELECT 
-            day, asset_id,
-            FIRST_VALUE(price) OVER (PARTITION BY asset_id, price_grp ORDER BY day) as price_ffill
-        FROM price_steps
-    ),
-    daily_portfolio_value AS (
-        SELECT 
-            d.day,
-            SUM(COALESCE(rb.qty, 0) * COALESCE(fp.price_ffill, 0)) as total_assets_value
-        FROM daily_series d
-        LEFT JOIN LATERAL (
-            SELECT DISTINCT ON (asset_id) qty, asset_id 
-            FROM raw_balances 
-            WHERE op_date <= d.day 
-            ORDER BY asset_id, op_date DESC
-        ) rb ON TRUE
-        LEFT JOIN filled_prices fp ON fp.day = d.day AND fp.asset_id = rb.asset_id
-        GROUP BY d.day
-    ),
-    cash_evolution AS (
-    SELECT 
-        d.day,
-        -- CAPITAL INVERTIDO corregido:
-        -- No suma 'income' si es 'Inversión' (ventas)
-        -- No resta 'expense' si es 'Inversión' (compras)
-        SUM(SUM(CASE 
-            WHEN t.type = 'income' AND t.category != 'Inversión' THEN t.amount 
-            WHEN t.type = 'expense' AND t.category != 'Inversión' THEN -t.amount 
-            ELSE 0 END)) OVER (ORDER BY d.day) as capital_invertido,
-            
-        -- EFECTIVO TOTAL: Sigue igual (todo afecta a la caja)
-        SUM(SUM(CASE WHEN t.type = 'income' THEN t.amount ELSE -t.amount END)) 
-            OVER (ORDER BY d.day) as efectivo_total
-    FROM daily_series d
-    CROSS JOIN (SELECT account_id FROM accounts WHERE user_id = :user_id) a
-    LEFT JOIN transactions t ON d.day = t.date::date AND t.account_id = a.account_id AND t.is_active = TRUE
-    GROUP BY d.day
-    )
-    SELECT 
-        ce.day as date,
-        COALESCE(ce.capital_invertido, 0) as capital_invertido,
-        (COALESCE(dpv.total_assets_value, 0) + COALESCE(ce.efectivo_total, 0)) as total_value
-    FROM cash_evolution ce
-    LEFT JOIN daily_portfolio_value dpv ON ce.day = dpv.day
-    ORDER BY ce.day;
-    """)
-
-    result = await db.execute(query, {"user_id": user_id})
+def _to_points(rows):
     return [
         {
             "date": row.date,
             "capital_invertido": float(row.capital_invertido),
             "total_value": float(row.total_value)
         }
-        for row in result.all()
+        for row in rows
     ]
 
 
-async def get_account_growth(db: AsyncSession, account_id: int):
+def _close_per_period(points: list[dict], resolution: str) -> list[dict]:
+    """
+    Último punto de cada semana (ISO, de lunes a domingo) o mes de una serie diaria: lo mismo
+    que el DISTINCT ON de las consultas, para el motor NumPy. El último punto sigue siendo hoy.
+    """
+    if resolution == "day":
+        return points
+
+    def period(day):
+        return day.isocalendar()[:2] if resolution == "week" else (day.year, day.month)
+
+    closes = []
+    for point in points:
+        if closes and period(closes[-1]["date"]) == period(point["date"]):
+            closes[-1] = point
+        else:
+            closes.append(point)
+    return closes
+
+
+def _period_start(day: date, resolution: str) -> date:
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    return day
+
+
+def downsample(points: list[dict], max_points: int | None) -> list[dict]:
+    """
+    Reduce la serie a max_points con Largest-Triangle-Three-Buckets sobre total_value:
+    conserva el primer y el último punto y, de cada tramo intermedio, el que forma el
+    triángulo de mayor área con sus vecinos, así que picos y caídas sobreviven.
+    """
+    if not max_points or len(points) <= max_points:
+        return points
+    max_points = max(max_points, 3)
+
+    xs = [p["date"].toordinal() for p in points]
+    ys = [p["total_value"] for p in points]
+    bucket = (len(points) - 2) / (max_points - 2)
+
+    sampled = [points[0]]
+    a = 0
+    for i in range(max_points - 2):
+        start = int(i * bucket) + 1
+        end = int((i + 1) * bucket) + 1
+        # Vértice C: media del tramo siguiente (o el último punto)
+        next_start, next_end = end, min(int((i + 2) * bucket) + 1, len(points))
+        if next_start >= next_end:
+            next_start, next_end = len(points) - 1, len(points)
+        cx = sum(xs[next_start:next_end]) / (next_end - next_start)
+        cy = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - cx) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (cy - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+async def get_portfolio_growth(db: AsyncSession, user_id: int, resolution: str = "day", max_points: int | None = None):
+    """
+    Serie del patrimonio del usuario (suma de todas sus cuentas) con un punto por día,
+    semana o mes, leída de portfolio_daily_snapshot (o calculada con NumPy si
+    VALUATION_ENGINE=numpy). Con max_points se reduce con downsample().
+    """
+    if VALUATION_ENGINE == "numpy":
+        points = await valuation_engine.get_series(db, user_id=user_id)
+        return downsample(_close_per_period(points, resolution), max_points)
+
+    await ensure_user_snapshots(db, user_id)
+
+    query = text("""
+        WITH daily AS (
+            SELECT
+                s.day,
+                SUM(s.invested_capital) AS capital_invertido,
+                SUM(s.assets_value + s.cash_balance) AS total_value
+            FROM portfolio_daily_snapshot s
+            JOIN accounts a ON a.account_id = s.account_id
+            WHERE a.user_id = :user_id
+            GROUP BY s.day
+        )
+        SELECT DISTINCT ON (date_trunc(:resolution, day::timestamp))
+            day AS date, capital_invertido, total_value
+        FROM daily
+        ORDER BY date_trunc(:resolution, day::timestamp), day DESC;
+    """)
+
+    result = await db.execute(query, {"user_id": user_id, "resolution": resolution})
+    return downsample(_to_points(result.all()), max_points)
+
+
+async def get_account_growth(db: AsyncSession, account_id: int, resolution: str = "day", max_points: int | None = None):
+    """Serie de una cuenta por día, semana o mes, leída de portfolio_daily_snapshot (o calculada con NumPy)."""
+    if VALUATION_ENGINE == "numpy":
+        points = await valuation_engine.get_series(db, account_id=account_id)
+        return downsample(_close_per_period(points, resolution), max_points)
+
+    await ensure_account_snapshots(db, account_id)
+
     query = text("""
-    WITH RECURSIVE daily_series AS (
-        SELECT MIN(date)::date AS day, NOW()::date AS last_day
-        FROM transactions
-        WHERE account_id = :account_id AND is_active = TRUE
-        UNION ALL
-        SELECT (day + interval '1 day')::date, last_day
-        FROM daily_series
-        WHERE day < last_day
-    ),
-    raw_balances AS (
-        SELECT 
-            asset_id,
-            date::date as op_date,
-            SUM(SUM(CASE WHEN operation_type = 'buy' THEN quantity ELSE -quantity END)) 
-                OVER (PARTITION BY asset_id ORDER BY date::date) as qty
-        FROM operations
+        SELECT DISTINCT ON (date_trunc(:resolution, day::timestamp))
+            day AS date,
+            invested_capital AS capital_invertido,
+            assets_value + cash_balance AS total_value
+        FROM portfolio_daily_snapshot
         WHERE account_id = :account_id
-        GROUP BY asset_id, date::date
-    ),
-    price_steps AS (
-        SELECT 
-            d.day,
-            ast.asset_id,
-            ph.price,
-            COUNT(ph.price) OVER (PARTITION BY ast.asset_id ORDER BY d.day) as price_grp
-        FROM daily_series d
-        CROSS JOIN (
-            SELECT DISTINCT asset_id FROM operations 
-            WHERE account_id = :account_id
-        ) ast
-        LEFT JOIN price_history ph ON ph.asset_id = ast.asset_id AND ph.date::date = d.day
-    ),
-    filled_prices AS (
-        SELECT 
-            day, asset_id,
-            FIRST_VALUE(price) OVER (PARTITION BY asset_id, price_grp ORDER BY day) as price_ffill
-        FROM price_steps
-    ),
-    daily_portfolio_value AS (
-        SELECT 
-            d.day,
-            SUM(COALESCE(rb.qty, 0) * COALESCE(fp.price_ffill, 0)) as total_assets_value
-        FROM daily_series d
-        LEFT JOIN LATERAL (
-            SELECT DISTINCT ON (asset_id) qty, asset_id 
-            FROM raw_balances 
-            WHERE op_date <= d.day 
-            ORDER BY asset_id, op_date DESC
-        ) rb ON TRUE
-        LEFT JOIN filled_prices fp ON fp.day = d.day AND fp.asset_id = rb.asset_id
-        GROUP BY d.day
-    ),
-    cash_evolution AS (
-        SELECT 
-            d.day,
-            SUM(SUM(CASE 
-                WHEN t.type = 'income' AND t.category != 'Inversión' THEN t.amount 
-                WHEN t.type = 'expense' AND t.category != 'Inversión' THEN -t.amount 
-                ELSE 0 END)) OVER (ORDER BY d.day) as capital_invertido,
-            SUM(SUM(CASE WHEN t.type = 'income' THEN t.amount ELSE -t.amount END)) 
-                OVER (ORDER BY d.day) as efectivo_total
-        FROM daily_series d
-        LEFT JOIN transactions t ON d.day = t.date::date AND t.account_id = :account_id AND t.is_active = TRUE
-        GROUP BY d.day
-    )
-    SELECT 
-        ce.day as date,
-        COALESCE(ce.capital_invertido, 0) as capital_invertido,
-        (COALESCE(dpv.total_assets_value, 0) + COALESCE(ce.efectivo_total, 0)) as total_value
-    FROM cash_evolution ce
-    LEFT JOIN daily_portfolio_value dpv ON ce.day = dpv.day
-    ORDER BY ce.day;
+        ORDER BY date_trunc(:resolution, day::timestamp), day DESC;
     """)
 
-    result = await db.execute(query, {"account_id": account_id})
-    return [
-        {
-            "date": row.date,
-            "capital_invertido": float(row.capital_invertido),
-            "total_value": float(row.total_value)
-        }
-        for row in result.all()
-    ]
\ No newline at end of file
+    result = await db.execute(query, {"account_id": account_id, "resolution": resolution})
+    return downsample(_to_points(result.all()), max_points)
+
+
+async def get_growth_delta(
+    db: AsyncSession,
+    user_id: int,
+    view: dict,
+    since: date,
+    version: int | None,
+    resolution: str = "day",
+    account_id: int | None = None,
+):
+    """
+    Recorta la vista de growth (growth_view / account_growth_view) a lo que cambió para un
+    cliente que tiene la serie hasta `since` con la versión `version`.
+
+    Devuelve los puntos desde el primer día cambiado después de esa versión o, si no hay
+    cambios, los días nuevos tras `since` (from_date = desde dónde sustituir, al inicio del
+    periodo con week/month). Con reset=True la serie completa: versión desconocida, cuenta
+    borrada o registro de cambios ya purgado.
+    """
+    current = view.get("version")
+    if version is None or current is None:
+        return {**view, "reset": True}
+
+    reset, from_day = await get_series_changes(db, user_id, version, current, account_id)
+    if reset:
+        return {**view, "reset": True}
+
+    start = since + timedelta(days=1)
+    if from_day is not None:
+        start = min(start, from_day)
+    start = _period_start(start, resolution)
+    return {
+        "history": [p for p in view["history"] if p["date"] >= start],
+        "version": current,
+        "reset": False,
+        "from_date": start,
+    }
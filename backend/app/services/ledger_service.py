@@ -0,0 +1,99 @@
+"""
+Libro de efectivo por cuenta.
+
+Cada transacción activa guarda el saldo de su cuenta tras aplicarla (running_balance,
+en orden de fecha y transaction_id) y accounts.cash_balance guarda el saldo final, así
+que leer el efectivo de un usuario cuesta lo que su número de cuentas.
+
+Como la serie diaria, se mantiene marcando la cuenta con mark_ledger_dirty() desde la
+fecha del cambio y recalculando con recompute_dirty_ledgers() antes del commit: solo se
+reescriben los saldos desde esa fecha (una transacción con fecha pasada desplaza las
+posteriores; una nueva al final toca una fila).
+"""
+
+from datetime import datetime, time, timedelta, timezone
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.snapshot_service import as_day
+
+# Clave en session.info donde se acumulan las cuentas a recalcular: {account_id: from_date}
+_DIRTY_KEY = "dirty_ledgers"
+
+
+async def refresh_account_ledger(db: AsyncSession, account_id: int, from_date: datetime | None = None):
+    """
+    Recalcula running_balance desde from_date (incluida) y el saldo de la cuenta.
+    Sin from_date reconstruye el libro completo. No hace commit.
+    """
+    await db.flush()
+    # Serializa a los escritores de la misma cuenta: el segundo ve las filas del primero
+    await db.execute(
+        text("SELECT 1 FROM accounts WHERE account_id = :account_id FOR UPDATE"),
+        {"account_id": account_id}
+    )
+    params = {"account_id": account_id, "from_date": from_date or datetime.min.replace(tzinfo=timezone.utc)}
+    await db.execute(text("""
+        UPDATE transactions
+        SET running_balance = NULL
+        WHERE account_id = :account_id AND is_active = FALSE
+          AND date >= :from_date AND running_balance IS NOT NULL
+    """), params)
+    await db.execute(text("""
+        WITH opening AS (
+            SELECT COALESCE((
+                SELECT running_balance FROM transactions
+                WHERE account_id = :account_id AND is_active = TRUE AND date < :from_date
+                ORDER BY date DESC, transaction_id DESC
+                LIMIT 1
+            ), 0) AS balance
+        ),
+        ledger AS (
+            SELECT
+                transaction_id,
+                (SELECT balance FROM opening)
+                + SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END)
+                  OVER (ORDER BY date, transaction_id) AS balance
+            FROM transactions
+            WHERE account_id = :account_id AND is_active = TRUE AND date >= :from_date
+        )
+        UPDATE transactions t
+        SET running_balance = l.balance
+        FROM ledger l
+        WHERE t.transaction_id = l.transaction_id
+          AND t.running_balance IS DISTINCT FROM l.balance
+    """), params)
+    await db.execute(text("""
+        UPDATE accounts
+        SET cash_balance = COALESCE((
+            SELECT running_balance FROM transactions
+            WHERE account_id = :account_id AND is_active = TRUE
+            ORDER BY date DESC, transaction_id DESC
+            LIMIT 1
+        ), 0)
+        WHERE account_id = :account_id
+    """), {"account_id": account_id})
+
+
+def mark_ledger_dirty(db: AsyncSession, account_id: int, from_date: datetime):
+    """Apunta que el efectivo de la cuenta cambia desde from_date. Se recalcula con recompute_dirty_ledgers()."""
+    # Inicio del día UTC anterior: evita comparar fechas con y sin zona horaria
+    from_date = datetime.combine(as_day(from_date) - timedelta(days=1), time.min, tzinfo=timezone.utc)
+    dirty = db.info.setdefault(_DIRTY_KEY, {})
+    if account_id not in dirty or from_date < dirty[account_id]:
+        dirty[account_id] = from_date
+
+
+async def recompute_dirty_ledgers(db: AsyncSession):
+    """Recalcula los libros marcados con mark_ledger_dirty(). No hace commit."""
+    dirty = db.info.pop(_DIRTY_KEY, {})
+    # Orden fijo de bloqueo entre peticiones que tocan varias cuentas
+    for account_id in sorted(dirty):
+        await refresh_account_ledger(db, account_id, dirty[account_id])
+
+
+async def get_cash_balance(db: AsyncSession, account_id: int) -> float:
+    result = await db.execute(
+        text("SELECT cash_balance FROM accounts WHERE account_id = :account_id"),
+        {"account_id": account_id}
+    )
+    return float(result.scalar() or 0)
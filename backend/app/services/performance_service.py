@@ -1,136 +1,145 @@
+import calendar
+from datetime import date, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
+from app.services.history_chart_service import get_portfolio_growth, get_account_growth
 
-async def get_performance_metrics(db: AsyncSession, user_id: int, account_id: int | None = None):
-    account_filter = "AND a.account_id = :account_id" if account_id else ""
-    account_filter_2 = "AND account_id = :account_id" if account_id else ""
-    
-    query = text(f"""
-    WITH RECURSIVE daily_series AS (
-        SELECT MIN(date)::date AS day, NOW()::date AS last_day
-        FROM transactions t
-        JOIN accounts a ON t.account_id = a.account_id
-        WHERE a.user_id = :user_id {account_filter} AND t.is_active = TRUE
-        UNION ALL
-        SELECT (day + interval '1 day')::date, last_day
-        FROM daily_series
-        WHERE day < last_day
-    ),
-    raw_balances AS (
-        SELECT 
-            o.asset_id,
-            o.date::date as op_date,
-            SUM(SUM(CASE WHEN o.operation_type = 'buy' THEN o.quantity ELSE -o.quantity END)) 
-                OVER (PARTITION BY o.asset_id ORDER BY o.date::date) as qty
-        FROM operations o
-        JOIN accounts a ON o.account_id = a.account_id
-        WHERE a.user_id = :user_id {account_filter}
-        GROUP BY o.asset_id, o.date::date
-    ),
-    price_steps AS (
-        SELECT 
-            d.day, ast.asset_id, ph.price,
-            COUNT(ph.price) OVER (PARTITION BY ast.asset_id ORDER BY d.day) as price_grp
-        FROM daily_series d
-        CROSS JOIN (
-            SELECT DISTINCT asset_id FROM operations o 
-            JOIN accounts a ON o.account_id = a.account_id 
-            WHERE a.user_id = :user_id {account_filter}
-        ) ast
-        LEFT JOIN price_history ph ON ph.asset_id = ast.asset_id AND ph.date::date = d.day
-    ),
-    filled_prices AS (
-        SELECT 
-            day, asset_id,
-            FIRST_VALUE(price) OVER (PARTITION BY asset_id, price_grp ORDER BY day) as price_ffill
-        FROM price_steps
-    ),
-    daily_portfolio_value AS (
-        SELECT 
-            d.day,
-            SUM(COALESCE(rb.qty, 0) * COALESCE(fp.price_ffill, 0)) as total_assets_value
-        FROM daily_series d
-        LEFT JOIN LATERAL (
-            SELECT DISTINCT ON (asset_id) qty, asset_id 
-            FROM raw_balances 
-            WHERE op_date <= d.day 
-            ORDER BY asset_id, op_date DESC
-        ) rb ON TRUE
-        LEFT JOIN filled_prices fp ON fp.day = d.day AND fp.asset_id = rb.asset_id
-        GROUP BY d.day
-    ),
-    cash_evolution AS (
-        SELECT 
-            d.day,
-            SUM(SUM(CASE 
-                WHEN t.type = 'income' AND t.category != 'Inversión' THEN t.amount 
-                WHEN t.type = 'expense' AND t.category != 'Inversión' THEN -t.amount 
-                ELSE 0 END)) OVER (ORDER BY d.day) as capital_invertido,
-            SUM(SUM(CASE WHEN t.type = 'income' THEN t.amount ELSE -t.amount END)) 
-                OVER (ORDER BY d.day) as efectivo_total
-        FROM daily_series d
-        CROSS JOIN (SELECT account_id FROM accounts WHERE user_id = :user_id {account_filter_2}) a
-        LEFT JOIN transactions t ON d.day = t.date::date AND t.account_id = a.account_id AND t.is_active = TRUE
-        GROUP BY d.day
-    ),
-    portfolio_history AS (
-        SELECT 
-            ce.day,
-            ce.capital_invertido,
-            (COALESCE(dpv.total_assets_value, 0) + COALESCE(ce.efectivo_total, 0)) as total_value
-        FROM cash_evolution ce
-        LEFT JOIN daily_portfolio_value dpv ON ce.day = dpv.day
-    )
-    SELECT 
-        (SELECT total_value FROM portfolio_history ORDER BY day DESC LIMIT 1) as current_val,
-        (SELECT capital_invertido FROM portfolio_history ORDER BY day DESC LIMIT 1) as current_cap,
-
-        COALESCE((SELECT total_value FROM portfolio_history WHERE day <= NOW() - interval '1 month' ORDER BY day DESC LIMIT 1), 0) as val_1m,
-        COALESCE((SELECT capital_invertido FROM portfolio_history WHERE day <= NOW() - interval '1 month' ORDER BY day DESC LIMIT 1), 0) as cap_1m,
-
-        COALESCE((SELECT total_value FROM portfolio_history WHERE day <= NOW() - interval '3 month' ORDER BY day DESC LIMIT 1), 0) as val_3m,
-        COALESCE((SELECT capital_invertido FROM portfolio_history WHERE day <= NOW() - interval '3 month' ORDER BY day DESC LIMIT 1), 0) as cap_3m,
-
-        COALESCE((SELECT total_value FROM portfolio_history WHERE day <= DATE_TRUNC('year', NOW()) ORDER BY day DESC LIMIT 1), 0) as val_ytd,
-        COALESCE((SELECT capital_invertido FROM portfolio_history WHERE day <= DATE_TRUNC('year', NOW()) ORDER BY day DESC LIMIT 1), 0) as cap_ytd
-    FROM portfolio_history
-    LIMIT 1;
-    """)
-
-    params = {"user_id": user_id}
+# Ventanas fijas de la respuesta (clave -> token de periodo)
+DEFAULT_PERIODS = {
+    "month": "1M",
+    "three_months": "3M",
+    "ytd": "YTD",
+    "total": "MAX",
+}
+
+
+def _shift_months(day: date, months: int) -> date:
+    month_index = day.year * 12 + (day.month - 1) - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def parse_period(token: str, today: date) -> tuple[date | None, date | None]:
+    """
+    Convierte un token de periodo en (inicio, fin). inicio=None significa desde el principio
+    y fin=None hasta el último día de la serie.
+
+    Tokens: 1D, 1W, 2W, 1M, 3M, 6M, 1Y, 5Y, YTD, MAX y rangos 'AAAA-MM-DD..AAAA-MM-DD'
+    (el fin es opcional: 'AAAA-MM-DD..').
+    """
+    token = token.strip().upper()
+    if ".." in token:
+        start_str, end_str = token.split("..", 1)
+        try:
+            start = date.fromisoformat(start_str)
+            end = date.fromisoformat(end_str) if end_str else None
+        except ValueError:
+            raise ValueError(f"Rango de fechas inválido: {token}")
+        if end and end < start:
+            raise ValueError(f"Rango de fechas inválido: {token}")
+        return start, end
+    if token in ("MAX", "ALL", "TOTAL"):
+        return None, None
+    if token == "YTD":
+        return date(today.year, 1, 1), None
+
+    amount, unit = token[:-1], token[-1:]
+    if not amount.isdigit() or unit not in ("D", "W", "M", "Y"):
+        raise ValueError(f"Periodo no soportado: {token}")
+    n = int(amount)
+    if unit == "D":
+        return today - timedelta(days=n), None
+    if unit == "W":
+        return today - timedelta(weeks=n), None
+    if unit == "M":
+        return _shift_months(today, n), None
+    return _shift_months(today, 12 * n), None
+
+
+def calc_period(current_val, current_cap, past_val, past_cap):
+    """Calculate period return adjusted for cash flows (deposits/withdrawals)."""
+    deposits_in_period = float(current_cap) - float(past_cap)
+    gain = float(current_val) - float(past_val) - deposits_in_period
+
+    # Denominator: total capital committed = start value + new deposits
+    denom = float(past_val) + deposits_in_period
+    if denom <= 0:
+        denom = float(current_cap)
+    if denom <= 0:
+        return {"pct": 0.0, "abs": 0.0}
+    return {"pct": round((gain / denom) * 100, 2), "abs": round(gain, 2)}
+
+
+def compute_performance(series: list[dict], periods: dict[str, str]) -> dict:
+    """
+    Calcula la rentabilidad de varias ventanas recorriendo la serie diaria UNA sola vez.
+
+    series: puntos {"date", "capital_invertido", "total_value"} ordenados por fecha.
+    periods: {clave de respuesta: token de periodo}. Añadir ventanas no añade recorridos.
+    """
+    # Los tokens se validan antes de mirar la serie: un periodo inválido es 400 haya datos o no
+    today = series[-1]["date"] if series else date.today()
+    windows = {key: parse_period(token, today) for key, token in periods.items()}
+    if not series:
+        return {key: {"pct": 0.0, "abs": 0.0} for key in periods}
+
+    # Fechas ancla: para cada una buscamos el último punto con date <= ancla
+    anchors = sorted({d for bounds in windows.values() for d in bounds if d is not None})
+    at_anchor = {}
+    i = 0
+    previous = None
+    for point in series:
+        while i < len(anchors) and point["date"] > anchors[i]:
+            at_anchor[anchors[i]] = previous
+            i += 1
+        if i == len(anchors):
+            break
+        previous = point
+    for anchor in anchors[i:]:
+        at_anchor[anchor] = series[-1]
+
+    result = {}
+    for key, (start, end) in windows.items():
+        current = at_anchor[end] if end is not None else series[-1]
+        past = at_anchor[start] if start is not None else None
+        if current is None:
+            result[key] = {"pct": 0.0, "abs": 0.0}
+            continue
+        past_val = past["total_value"] if past else 0
+        past_cap = past["capital_invertido"] if past else 0
+        result[key] = calc_period(current["total_value"], current["capital_invertido"], past_val, past_cap)
+    return result
+
+
+async def get_performance_metrics(db: AsyncSession, user_id: int, account_id: int | None = None, periods: list[str] | None = None):
+    """
+    Rentabilidad 1M, 3M, YTD y total (más las ventanas extra pedidas en `periods`)
+    calculada en una sola pasada sobre la serie diaria materializada.
+    """
     if account_id:
-        params["account_id"] = account_id
-
-    result = await db.execute(query, params)
-    row = result.fetchone()
-
-    if not row or row.current_val is None or row.current_cap is None:
-        return {
-            "month": {"pct": 0.0, "abs": 0.0},
-            "three_months": {"pct": 0.0, "abs": 0.0},
-            "ytd": {"pct": 0.0, "abs": 0.0},
-            "total": {"pct": 0.0, "abs": 0.0}
-        }
-
-    def calc_period(current_val, current_cap, past_val, past_cap):
-        """Calculate period return adjusted for cash flows (deposits/withdrawals)."""
-        deposits_in_period = float(current_cap) - float(past_cap)
-        gain = float(current_val) - float(past_val) - deposits_in_period
-
-        # Denominator: total capital committed = start value + new deposits
-        denom = float(past_val) + deposits_in_period
-        if denom <= 0:
-            denom = float(current_cap)
-        if denom <= 0:
-            return {"pct": 0.0, "abs": 0.0}
-        return {"pct": round((gain / denom) * 100, 2), "abs": round(gain, 2)}
-
-    cv = row.current_val
-    cc = row.current_cap
-
-    return {
-        "month": calc_period(cv, cc, row.val_1m, row.cap_1m),
-        "three_months": calc_period(cv, cc, row.val_3m, row.cap_3m),
-        "ytd": calc_period(cv, cc, row.val_ytd, row.cap_ytd),
-        "total": calc_period(cv, cc, 0, 0),
-    }
\ No newline at end of file
+        owned = await db.execute(
+            text("SELECT 1 FROM accounts WHERE account_id = :aid AND user_id = :uid"),
+            {"aid": account_id, "uid": user_id}
+        )
+        series = await get_account_growth(db, account_id) if owned.scalar() else []
+    else:
+        series = await get_portfolio_growth(db, user_id)
+
+    return performance_from_series(series, periods)
+
+
+def performance_from_series(series: list[dict], periods: list[str] | None = None) -> dict:
+    """Respuesta de rentabilidad (ventanas fijas + extra) a partir de una serie ya cargada."""
+    requested = dict(DEFAULT_PERIODS)
+    extra_keys = []
+    for token in periods or []:
+        key = f"period:{token.strip().upper()}"
+        if key not in requested:
+            requested[key] = token
+            extra_keys.append(key)
+
+    metrics = compute_performance(series, requested)
+    response = {key: metrics[key] for key in DEFAULT_PERIODS}
+    response["periods"] = {key.split(":", 1)[1]: metrics[key] for key in extra_keys}
+    return response
@@ -0,0 +1,69 @@
+"""
+Posiciones actuales por cuenta y activo (tabla positions).
+
+Cada alta, edición o borrado de una operación aplica su efecto como un delta
+(cantidad y coste con signo) en la misma transacción, así que leer la cartera cuesta
+lo que el número de posiciones abiertas y no lo que el histórico de operaciones.
+rebuild_positions recalcula la tabla desde operations si alguna vez se desincroniza.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def operation_delta(operation_type: str, quantity, price) -> tuple:
+    """(delta de cantidad, delta de coste) de una operación: compra suma, venta resta."""
+    sign = 1 if operation_type == 'buy' else -1
+    return sign * quantity, sign * quantity * price
+
+
+async def apply_position_delta(db: AsyncSession, account_id: int, asset_id: int, quantity_delta, cost_delta):
+    """Suma los deltas a la posición (la crea si no existe). No hace commit."""
+    await db.execute(
+        text("""
+            INSERT INTO positions (account_id, asset_id, quantity, cost_basis)
+            VALUES (:account_id, :asset_id, :quantity, :cost)
+            ON CONFLICT (account_id, asset_id) DO UPDATE
+            SET quantity = positions.quantity + EXCLUDED.quantity,
+                cost_basis = positions.cost_basis + EXCLUDED.cost_basis,
+                updated_at = NOW()
+        """),
+        {"account_id": account_id, "asset_id": asset_id, "quantity": quantity_delta, "cost": cost_delta}
+    )
+    # Una posición sin cantidad ni coste no aporta nada a ninguna vista
+    await db.execute(
+        text("""
+            DELETE FROM positions
+            WHERE account_id = :account_id AND asset_id = :asset_id
+              AND quantity = 0 AND cost_basis = 0
+        """),
+        {"account_id": account_id, "asset_id": asset_id}
+    )
+
+
+async def apply_operation(db: AsyncSession, operation, reverse: bool = False):
+    """Aplica (o deshace con reverse=True) el efecto de una operación sobre su posición."""
+    quantity_delta, cost_delta = operation_delta(operation.operation_type, operation.quantity, operation.price)
+    if reverse:
+        quantity_delta, cost_delta = -quantity_delta, -cost_delta
+    await apply_position_delta(db, operation.account_id, operation.asset_id, quantity_delta, cost_delta)
+
+
+async def rebuild_positions(db: AsyncSession, account_id: int | None = None) -> int:
+    """Recalcula positions desde operations (todas las cuentas o solo una). No hace commit."""
+    scope = "WHERE account_id = :account_id" if account_id else ""
+    params = {"account_id": account_id} if account_id else {}
+    await db.execute(text(f"DELETE FROM positions {scope}"), params)
+    result = await db.execute(
+        text(f"""
+            INSERT INTO positions (account_id, asset_id, quantity, cost_basis)
+            SELECT account_id, asset_id,
+                   SUM(CASE WHEN operation_type = 'buy' THEN quantity ELSE -quantity END),
+                   SUM(CASE WHEN operation_type = 'buy' THEN quantity * price ELSE -quantity * price END)
+            FROM operations
+            {scope}
+            GROUP BY account_id, asset_id
+        """),
+        params
+    )
+    return result.rowcount
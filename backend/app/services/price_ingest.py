@@ -0,0 +1,74 @@
+"""
+Ingesta masiva de precios en price_history desde el backend (backfill bajo demanda).
+
+Misma lógica que worker/price_ingest.py (filtrado vectorizado del DataFrame y upsert
+multi-fila); el worker y el backend se despliegan por separado y no comparten código.
+Toda escritura en price_history mantiene también asset_latest_price.
+
+price_history guarda un precio por activo y día (trade_date, UTC): el upsert es sobre ese día
+y se queda la cotización más reciente.
+"""
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import PriceHistory, AssetLatestPrice
+from app.services.snapshot_service import as_day
+
+# asyncpg admite como mucho 32767 parámetros por sentencia (3 por fila)
+_CHUNK_ROWS = 5000
+
+
+def frame_to_rows(asset_id: int, data) -> list[dict]:
+    """DataFrame de yfinance (columna Close) -> filas de price_history, sin NaN/inf/<= 0 y en UTC."""
+    if data is None or data.empty:
+        return []
+    close = data["Close"].to_numpy(dtype=float)
+    mask = np.isfinite(close) & (close > 0)
+    index = data.index[mask]
+    index = index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+    return [
+        {"asset_id": asset_id, "date": date, "price": price}
+        for date, price in zip(index.to_pydatetime(), close[mask].tolist())
+    ]
+
+
+async def ingest_prices(db: AsyncSession, rows: list[dict]) -> int:
+    """Upsert multi-fila (por bloques) de precios. No hace commit. Devuelve las filas enviadas."""
+    # Un mismo (activo, día) no puede aparecer dos veces en la misma sentencia ON CONFLICT
+    latest = {}
+    for row in rows:
+        key = (row["asset_id"], as_day(row["date"]))
+        if key not in latest or row["date"] >= latest[key]["date"]:
+            latest[key] = row
+    unique = list(latest.values())
+    for start in range(0, len(unique), _CHUNK_ROWS):
+        stmt = insert(PriceHistory)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["asset_id", "trade_date"],
+            set_={"date": stmt.excluded.date, "price": stmt.excluded.price},
+            where=stmt.excluded.date >= PriceHistory.date
+        )
+        await db.execute(stmt, unique[start:start + _CHUNK_ROWS])
+    await upsert_latest_prices(db, unique)
+    return len(unique)
+
+
+async def upsert_latest_prices(db: AsyncSession, rows: list[dict]):
+    """Lleva a asset_latest_price el precio más reciente de cada activo de rows (si es más nuevo). No hace commit."""
+    latest = {}
+    for row in rows:
+        current = latest.get(row["asset_id"])
+        if current is None or row["date"] > current["date"]:
+            latest[row["asset_id"]] = row
+    if not latest:
+        return
+
+    stmt = insert(AssetLatestPrice)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["asset_id"],
+        set_={"date": stmt.excluded.date, "price": stmt.excluded.price, "updated_at": func.now()},
+        where=stmt.excluded.date >= AssetLatestPrice.date
+    )
+    await db.execute(stmt, [{"asset_id": r["asset_id"], "date": r["date"], "price": r["price"]} for r in latest.values()])
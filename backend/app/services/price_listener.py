@@ -0,0 +1,78 @@
+"""
+Escucha las notificaciones del worker:
+- NOTIFY price_updates: invalida en la caché las vistas que contienen esos activos, de todos los usuarios.
+- NOTIFY cache_warmup (al terminar la actualización diaria): precalienta las vistas de los
+  usuarios activos (services/cache_warmup.py).
+"""
+
+import asyncio
+import logging
+import asyncpg
+from app.core.config import DATABASE_URL
+from app.core.cache import invalidate_tags, asset_tag
+from app.services.cache_warmup import WARMUP_CHANNEL, warm_active_users
+
+logger = logging.getLogger("app.price_listener")
+
+PRICE_CHANNEL = "price_updates"
+RECONNECT_DELAY = 5
+
+_pending: set[asyncio.Task] = set()
+_warmup: asyncio.Task | None = None
+
+
+def parse_asset_ids(payload: str) -> list[int]:
+    """Payload del worker: ids de activo separados por comas."""
+    return [int(part) for part in payload.split(",") if part.strip().isdigit()]
+
+
+def _on_price_update(connection, pid, channel, payload):
+    asset_ids = parse_asset_ids(payload)
+    if not asset_ids:
+        return
+    task = asyncio.create_task(invalidate_tags([asset_tag(asset_id) for asset_id in asset_ids]))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def _run_warmup():
+    # Los avisos de precios llegan antes que este: primero deben estar invalidadas sus vistas
+    if _pending:
+        await asyncio.gather(*_pending, return_exceptions=True)
+    try:
+        await warm_active_users()
+    except Exception:
+        logger.exception("cache_warmup.failed")
+
+
+def _on_warmup(connection, pid, channel, payload):
+    global _warmup
+    if _warmup is not None and not _warmup.done():
+        logger.info("cache_warmup.skipped reason=already running")
+        return
+    _warmup = asyncio.create_task(_run_warmup())
+
+
+async def listen_price_updates():
+    """Tarea de fondo: mantiene una conexión LISTEN abierta y se reconecta si se cae."""
+    dsn = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(dsn)
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _conn: closed.set())
+            await conn.add_listener(PRICE_CHANNEL, _on_price_update)
+            await conn.add_listener(WARMUP_CHANNEL, _on_warmup)
+            logger.info("price_listener.listening channels=%s,%s", PRICE_CHANNEL, WARMUP_CHANNEL)
+            await closed.wait()
+            logger.warning("price_listener.disconnected")
+        except asyncio.CancelledError:
+            if _warmup is not None:
+                _warmup.cancel()
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+            raise
+        except Exception as e:
+            logger.warning("price_listener.error error=%s", e)
+        await asyncio.sleep(RECONNECT_DELAY)
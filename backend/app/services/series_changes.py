@@ -0,0 +1,82 @@
+"""
+Versión de datos por usuario y registro de cambios de la serie diaria (delta de los gráficos).
+
+Cada escritura que reescribe la serie de una o varias cuentas llama a record_series_changes()
+en su transacción: sube users.data_version de cada usuario afectado y apunta en series_changes
+desde qué día cambia cada cuenta. El UPDATE bloquea la fila del usuario hasta el commit, así
+que las versiones de un usuario se hacen visibles en orden.
+
+Un cliente que tiene la serie hasta `since` con versión `version` solo necesita los puntos
+desde el primer día cambiado después de esa versión (get_series_changes). El worker escribe
+lo mismo al guardar precios (worker/price_events.py) y borra el registro antiguo.
+"""
+
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def record_series_changes(db: AsyncSession, changes: dict[int, date | None]):
+    """
+    changes: {account_id: primer día cambiado, o None si la cuenta se borra}.
+    Llamar antes de borrar la cuenta (el usuario se busca en accounts). No hace commit.
+    """
+    if not changes:
+        return
+    account_ids = list(changes)
+    await db.execute(text("""
+        WITH d AS (
+            SELECT * FROM unnest(CAST(:account_ids AS bigint[]), CAST(:from_days AS date[])) AS d(account_id, from_day)
+        ),
+        bumped AS (
+            UPDATE users u
+            SET data_version = u.data_version + 1
+            FROM (SELECT DISTINCT ac.user_id FROM accounts ac JOIN d ON d.account_id = ac.account_id) x
+            WHERE u.user_id = x.user_id
+            RETURNING u.user_id, u.data_version
+        )
+        INSERT INTO series_changes (user_id, version, account_id, from_day)
+        SELECT b.user_id, b.data_version, d.account_id, d.from_day
+        FROM d
+        JOIN accounts ac ON ac.account_id = d.account_id
+        JOIN bumped b ON b.user_id = ac.user_id
+    """), {"account_ids": account_ids, "from_days": [changes[a] for a in account_ids]})
+
+
+async def get_data_version(db: AsyncSession, user_id: int) -> int:
+    result = await db.execute(
+        text("SELECT data_version FROM users WHERE user_id = :user_id"),
+        {"user_id": user_id}
+    )
+    return result.scalar() or 0
+
+
+async def get_series_changes(
+    db: AsyncSession,
+    user_id: int,
+    after_version: int,
+    upto_version: int,
+    account_id: int | None = None,
+) -> tuple[bool, date | None]:
+    """
+    Cambios de la serie (del usuario o de una cuenta) con versión en (after_version, upto_version].
+
+    Devuelve (reset, from_day): reset si hay que mandar la serie entera (se borró una cuenta o
+    el registro ya no cubre esas versiones); si no, from_day es el primer día cambiado (None = nada).
+    """
+    if after_version >= upto_version:
+        return False, None
+    scope = "account_id = :account_id" if account_id is not None else "TRUE"
+    result = await db.execute(text(f"""
+        SELECT
+            COUNT(DISTINCT version) AS versions,
+            BOOL_OR(from_day IS NULL) FILTER (WHERE {scope}) AS removed,
+            MIN(from_day) FILTER (WHERE {scope}) AS from_day
+        FROM series_changes
+        WHERE user_id = :user_id AND version > :after AND version <= :upto
+    """), {"user_id": user_id, "after": after_version, "upto": upto_version, "account_id": account_id})
+    row = result.one()
+    # Cada versión deja al menos una fila: si faltan, el worker ya las ha borrado
+    if row.versions < upto_version - after_version or row.removed:
+        return True, None
+    return False, row.from_day
@@ -0,0 +1,248 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from app.models import PortfolioDailySnapshot
+from app.services.series_changes import record_series_changes
+
+# Clave en session.info donde se acumulan las cuentas a recalcular: {account_id: from_day}
+_DIRTY_KEY = "dirty_snapshots"
+
+
+def as_day(value) -> date:
+    """Día (UTC) de un datetime/date, igual que date::date en la base de datos."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.date()
+    return value
+
+
+async def _load_opening_state(db: AsyncSession, account_id: int, from_day: date):
+    result = await db.execute(text("""
+        SELECT
+            CURRENT_DATE AS today,
+            (SELECT MIN(date)::date FROM transactions
+             WHERE account_id = :account_id AND is_active = TRUE) AS first_day,
+            s.day, s.cash_balance, s.invested_capital, s.positions
+        FROM (SELECT 1) x
+        LEFT JOIN LATERAL (
+            SELECT day, cash_balance, invested_capital, positions
+            FROM portfolio_daily_snapshot
+            WHERE account_id = :account_id AND day < :from_day
+            ORDER BY day DESC LIMIT 1
+        ) s ON TRUE
+    """), {"account_id": account_id, "from_day": from_day})
+    return result.one()
+
+
+async def refresh_account_snapshots(db: AsyncSession, account_id: int, from_day: date | None = None):
+    """
+    Recalcula la serie diaria de una cuenta desde from_day (incluido) hasta hoy.
+
+    Parte del último día persistido anterior a from_day (posiciones, efectivo y capital)
+    y avanza día a día aplicando solo las operaciones, transacciones y precios posteriores,
+    así que el coste es proporcional a días x activos recalculados, no a la vida de la cuenta.
+    Sin from_day reconstruye la serie completa. No hace commit.
+    """
+    await db.flush()
+    state = await _load_opening_state(db, account_id, from_day or date.min)
+    today, first_day = state.today, state.first_day
+
+    if first_day is None:
+        # Sin transacciones no hay serie
+        await db.execute(
+            text("DELETE FROM portfolio_daily_snapshot WHERE account_id = :account_id"),
+            {"account_id": account_id}
+        )
+        return
+
+    positions: dict[int, Decimal] = {}
+    if state.day is not None and state.day >= first_day:
+        start = state.day + timedelta(days=1)
+        cash = Decimal(state.cash_balance)
+        invested = Decimal(state.invested_capital)
+        stored = state.positions or {}
+        if isinstance(stored, str):
+            stored = json.loads(stored)
+        positions = {int(k): Decimal(v) for k, v in stored.items()}
+    else:
+        start = first_day
+        cash = Decimal(0)
+        invested = Decimal(0)
+        # Operaciones anteriores al primer movimiento de caja (datos antiguos)
+        result = await db.execute(text("""
+            SELECT asset_id, SUM(CASE WHEN operation_type = 'buy' THEN quantity ELSE -quantity END) AS qty
+            FROM operations
+            WHERE account_id = :account_id AND date < CAST(:start AS date)
+            GROUP BY asset_id
+        """), {"account_id": account_id, "start": start})
+        positions = {row.asset_id: Decimal(row.qty) for row in result.all() if row.qty}
+
+    await db.execute(
+        text("""
+            DELETE FROM portfolio_daily_snapshot
+            WHERE account_id = :account_id AND (day >= :start OR day < :first_day)
+        """),
+        {"account_id": account_id, "start": start, "first_day": first_day}
+    )
+    if start > today:
+        return
+
+    params = {"account_id": account_id, "start": start}
+    ops_result = await db.execute(text("""
+        SELECT date::date AS day, asset_id,
+               SUM(CASE WHEN operation_type = 'buy' THEN quantity ELSE -quantity END) AS qty
+        FROM operations
+        WHERE account_id = :account_id AND date >= CAST(:start AS date)
+        GROUP BY 1, 2
+    """), params)
+    ops_by_day: dict[date, list] = {}
+    for row in ops_result.all():
+        ops_by_day.setdefault(row.day, []).append((row.asset_id, Decimal(row.qty)))
+
+    tx_result = await db.execute(text("""
+        SELECT date::date AS day,
+               SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END) AS cash,
+               SUM(CASE
+                   WHEN type = 'income' AND category != 'Inversión' THEN amount
+                   WHEN type = 'expense' AND category != 'Inversión' THEN -amount
+                   ELSE 0 END) AS invested
+        FROM transactions
+        WHERE account_id = :account_id AND is_active = TRUE AND date >= CAST(:start AS date)
+        GROUP BY 1
+    """), params)
+    tx_by_day = {row.day: (Decimal(row.cash), Decimal(row.invested or 0)) for row in tx_result.all()}
+
+    asset_ids = set(positions) | {asset_id for ops in ops_by_day.values() for asset_id, _ in ops}
+    last_price: dict[int, Decimal] = {}
+    prices_by_day: dict[date, list] = {}
+    if asset_ids:
+        price_params = {"asset_ids": list(asset_ids), "start": start}
+        opening = await db.execute(text("""
+            SELECT DISTINCT ON (asset_id) asset_id, price
+            FROM price_history
+            WHERE asset_id = ANY(:asset_ids) AND trade_date < CAST(:start AS date)
+            ORDER BY asset_id, trade_date DESC
+        """), price_params)
+        last_price = {row.asset_id: Decimal(row.price) for row in opening.all()}
+
+        prices = await db.execute(text("""
+            SELECT asset_id, trade_date AS day, price
+            FROM price_history
+            WHERE asset_id = ANY(:asset_ids) AND trade_date >= CAST(:start AS date)
+        """), price_params)
+        for row in prices.all():
+            prices_by_day.setdefault(row.day, []).append((row.asset_id, Decimal(row.price)))
+
+    rows = []
+    day = start
+    while day <= today:
+        for asset_id, qty in ops_by_day.get(day, ()):
+            new_qty = positions.get(asset_id, Decimal(0)) + qty
+            if new_qty:
+                positions[asset_id] = new_qty
+            else:
+                positions.pop(asset_id, None)
+        for asset_id, price in prices_by_day.get(day, ()):
+            last_price[asset_id] = price
+        cash_delta, invested_delta = tx_by_day.get(day, (Decimal(0), Decimal(0)))
+        cash += cash_delta
+        invested += invested_delta
+
+        assets_value = sum(
+            (qty * last_price.get(asset_id, Decimal(0)) for asset_id, qty in positions.items()),
+            Decimal(0)
+        )
+        rows.append({
+            "account_id": account_id,
+            "day": day,
+            "assets_value": assets_value,
+            "cash_balance": cash,
+            "invested_capital": invested,
+            "positions": {str(asset_id): str(qty) for asset_id, qty in positions.items()},
+        })
+        day += timedelta(days=1)
+
+    stmt = insert(PortfolioDailySnapshot)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["account_id", "day"],
+        set_={
+            "assets_value": stmt.excluded.assets_value,
+            "cash_balance": stmt.excluded.cash_balance,
+            "invested_capital": stmt.excluded.invested_capital,
+            "positions": stmt.excluded.positions,
+            "computed_at": stmt.excluded.computed_at,
+        }
+    )
+    await db.execute(stmt, rows)
+
+
+def mark_snapshots_dirty(db: AsyncSession, account_id: int, from_day):
+    """
+    Apunta que la serie de la cuenta cambia desde from_day. Se recalcula con
+    recompute_dirty_snapshots() justo antes del commit, cuando todas las filas
+    (operación + transacción) ya están en la sesión.
+    """
+    # Un día de margen por la conversión de zona horaria de date::date
+    day = as_day(from_day) - timedelta(days=1)
+    dirty = db.info.setdefault(_DIRTY_KEY, {})
+    if account_id not in dirty or day < dirty[account_id]:
+        dirty[account_id] = day
+
+
+async def recompute_dirty_snapshots(db: AsyncSession):
+    """
+    Recalcula las series marcadas con mark_snapshots_dirty() y apunta el cambio en
+    series_changes (versión de datos del usuario). No hace commit.
+    """
+    dirty = db.info.pop(_DIRTY_KEY, {})
+    await record_series_changes(db, dirty)
+    for account_id, from_day in dirty.items():
+        await refresh_account_snapshots(db, account_id, from_day)
+
+
+async def _ensure_snapshots(db: AsyncSession, where_sql: str, params: dict):
+    # Último día materializado por cuenta (index scan hacia atrás sobre la PK)
+    result = await db.execute(text(f"""
+        SELECT a.account_id, s.day AS last_day, (s.day IS NULL OR s.day < CURRENT_DATE) AS stale
+        FROM accounts a
+        LEFT JOIN LATERAL (
+            SELECT day FROM portfolio_daily_snapshot
+            WHERE account_id = a.account_id
+            ORDER BY day DESC LIMIT 1
+        ) s ON TRUE
+        WHERE {where_sql}
+    """), params)
+    stale = [row for row in result.all() if row.stale]
+    if not stale:
+        return
+
+    for row in stale:
+        # Sin serie -> construcción completa; con serie -> solo la cola abierta (último día en adelante)
+        await refresh_account_snapshots(db, row.account_id, row.last_day)
+    await db.commit()
+
+
+async def ensure_user_snapshots(db: AsyncSession, user_id: int):
+    """Garantiza que la serie de todas las cuentas del usuario llega hasta hoy."""
+    await _ensure_snapshots(db, "a.user_id = :user_id", {"user_id": user_id})
+
+
+async def ensure_account_snapshots(db: AsyncSession, account_id: int):
+    """Garantiza que la serie de la cuenta llega hasta hoy."""
+    await _ensure_snapshots(db, "a.account_id = :account_id", {"account_id": account_id})
+
+
+async def mark_asset_snapshots_dirty(db: AsyncSession, asset_ids: list[int], from_day):
+    """Marca la serie de todas las cuentas que han operado alguno de los activos (p.ej. tras un backfill de precios)."""
+    if not asset_ids:
+        return
+    result = await db.execute(
+        text("SELECT DISTINCT account_id FROM operations WHERE asset_id = ANY(:asset_ids)"),
+        {"asset_ids": list(asset_ids)}
+    )
+    for row in result.all():
+        mark_snapshots_dirty(db, row.account_id, from_day)
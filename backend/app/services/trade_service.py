@@ -3,42 +3,92 @@ from sqlalchemy import select, text
 from app.models import Operation, Asset, Account, PriceHistory
 from app.models.transaction import Transaction
 from app.schemas.operation import OperationCreate, OperationUpdate
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from sqlalchemy.dialects.postgresql import insert
+from app.core.pagination import encode_cursor, decode_cursor
+from app.services.snapshot_service import mark_snapshots_dirty
+from app.services.price_ingest import upsert_latest_prices
+from app.services.position_service import apply_operation
+from app.services.ledger_service import mark_ledger_dirty, get_cash_balance
 
 
-async def get_trade_history(db: AsyncSession, user_id: int):
+async def get_trade_history(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 100,
+    cursor: str | None = None,
+    account_id: int | None = None,
+    asset_id: int | None = None,
+    operation_type: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+):
     """
-    Obtiene el historial completo de operaciones de un usuario
-    Incluye: ticker, isin, nombre, currency, fecha, cantidad, precio, tipo, comisiones, cuenta
+    Historial de operaciones del usuario, de la más reciente a la más antigua, por páginas.
+    Incluye: ticker, isin, nombre, currency, fecha, cantidad, precio, tipo, comisiones, cuenta.
+
+    Paginación keyset sobre (date, operation_id): cursor es el de la página anterior. Cada
+    cuenta se recorre por idx_operations_account_date empezando en el cursor y parando en
+    `limit` filas, así que una página profunda cuesta lo mismo que la primera.
+    Devuelve (filas, cursor de la siguiente página o None). ValueError si el cursor no es válido.
     """
-    
-    stmt = (
-        select(
-            Operation.operation_id,
-            Asset.ticker,
-            Asset.isin,
-            Asset.name.label("asset_name"),
-            Asset.currency,
-            Operation.date,
-            Operation.quantity,
-            Operation.price,
-            Operation.operation_type,
-            Operation.fees,
-            Account.name.label("account_name")
-        )
-        .select_from(Operation)
-        .join(Asset, Operation.asset_id == Asset.asset_id)
-        .join(Account, Operation.account_id == Account.account_id)
-        .where(Account.user_id == user_id)
-        .order_by(Operation.date.desc(), Operation.operation_id.desc())
-        .limit(100)
-    )
-    
-    result = await db.execute(stmt)
+    params = {"user_id": user_id, "limit": limit + 1}
+    account_filter = ""
+    filters = []
+    if account_id is not None:
+        account_filter = "AND ac.account_id = :account_id"
+        params["account_id"] = account_id
+    if asset_id is not None:
+        filters.append("o.asset_id = :asset_id")
+        params["asset_id"] = asset_id
+    if operation_type is not None:
+        filters.append("o.operation_type = :operation_type")
+        params["operation_type"] = operation_type
+    if date_from is not None:
+        filters.append("o.date >= :date_from")
+        params["date_from"] = date_from
+    if date_to is not None:
+        # Día completo incluido
+        filters.append("o.date < :date_to")
+        params["date_to"] = date_to + timedelta(days=1)
+    if cursor:
+        params["cursor_date"], params["cursor_id"] = decode_cursor(cursor)
+        filters.append("(o.date, o.operation_id) < (:cursor_date, :cursor_id)")
+    where = "".join(f" AND {f}" for f in filters)
+
+    result = await db.execute(text(f"""
+        SELECT
+            o.operation_id,
+            a.ticker,
+            a.isin,
+            a.name AS asset_name,
+            a.currency,
+            o.date,
+            o.quantity,
+            o.price,
+            o.operation_type,
+            o.fees,
+            ac.name AS account_name
+        FROM accounts ac
+        CROSS JOIN LATERAL (
+            SELECT o.*
+            FROM operations o
+            WHERE o.account_id = ac.account_id{where}
+            ORDER BY o.date DESC, o.operation_id DESC
+            LIMIT :limit
+        ) o
+        JOIN assets a ON a.asset_id = o.asset_id
+        WHERE ac.user_id = :user_id {account_filter}
+        ORDER BY o.date DESC, o.operation_id DESC
+        LIMIT :limit
+    """), params)
     trades = result.all()
-    
-    return trades
+
+    next_cursor = None
+    if len(trades) > limit:
+        trades = trades[:limit]
+        next_cursor = encode_cursor(trades[-1].date, trades[-1].operation_id)
+    return trades, next_cursor
 
 async def create_operation(db: AsyncSession, operation_data: OperationCreate, user_id: int) -> Operation:
     # Verificar que la cuenta pertenece al usuario
@@ -63,23 +113,28 @@ async def create_operation(db: AsyncSession, operation_data: OperationCreate, us
     # Crear operación
     db_operation = Operation(**operation_data.model_dump())
     db.add(db_operation)
+    await apply_operation(db, db_operation)
     
-    # Insert price only if no price exists for this asset+date (don't overwrite worker prices)
+    # Insert price only if the asset has no price for that day (don't overwrite worker prices)
     stmt_upsert = insert(PriceHistory).values(
         asset_id=operation_data.asset_id,
         date=operation_data.date,
         price=operation_data.price
     ).on_conflict_do_nothing(
-        index_elements=['asset_id', 'date']
-    )
+        index_elements=['asset_id', 'trade_date']
+    ).returning(PriceHistory.price_id)
 
-    await db.execute(stmt_upsert)
+    if (await db.execute(stmt_upsert)).scalar_one_or_none() is not None:
+        await upsert_latest_prices(db, [{"asset_id": operation_data.asset_id, "date": operation_data.date, "price": operation_data.price}])
 
     # Ensure user has visibility on this asset
     await db.execute(
         text("INSERT INTO user_assets (user_id, asset_id) VALUES (:uid, :aid) ON CONFLICT DO NOTHING"),
         {"uid": user_id, "aid": operation_data.asset_id}
     )
+
+    # La serie diaria de la cuenta cambia desde la fecha de la operación
+    mark_snapshots_dirty(db, operation_data.account_id, operation_data.date)
     
     return db_operation, asset
 
@@ -108,6 +163,9 @@ async def update_operation(db: AsyncSession, operation_id: int, update_data: Ope
     original_total = (original_amount + original_fees) if original_is_buy else (original_amount - original_fees)
     original_date = operation.date
 
+    # Deshacer el efecto de la versión original sobre la posición antes de modificarla
+    await apply_operation(db, operation, reverse=True)
+
     # Apply updates to the operation
     update_dict = update_data.model_dump(exclude_unset=True, exclude_none=True)
     for key, value in update_dict.items():
@@ -128,19 +186,13 @@ async def update_operation(db: AsyncSession, operation_id: int, update_data: Ope
 
     if cash_delta < 0:
         # Need to verify the account has enough cash to cover the increase
-        cash_result = await db.execute(
-            text("""
-                SELECT COALESCE(SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END), 0)
-                FROM transactions
-                WHERE account_id = :account_id AND is_active = TRUE
-            """),
-            {"account_id": operation.account_id}
-        )
-        current_cash = float(cash_result.scalar())
+        current_cash = await get_cash_balance(db, operation.account_id)
         projected_cash = current_cash + float(cash_delta)
         if projected_cash < 0:
             raise ValueError(f"Fondos insuficientes. Efectivo disponible: {current_cash:.2f}€, necesario adicional: {abs(float(cash_delta)):.2f}€")
 
+    await apply_operation(db, operation)
+
     # Find and update the associated cash transaction
     # Prefer operation_id link, fallback to amount match for legacy data
     stmt_tx = (
@@ -181,22 +233,28 @@ async def update_operation(db: AsyncSession, operation_id: int, update_data: Ope
         transaction.date = operation.date
         asset_name = asset.name if asset else "Unknown"
         transaction.description = f"{operation.operation_type.upper()} {operation.quantity} {asset_name}"
+        mark_ledger_dirty(db, operation.account_id, original_date)
+        mark_ledger_dirty(db, operation.account_id, operation.date)
 
-    # Insert price only if no price exists for this asset+date (don't overwrite worker prices)
+    # Insert price only if the asset has no price for that day (don't overwrite worker prices)
     stmt_upsert = insert(PriceHistory).values(
         asset_id=operation.asset_id,
         date=operation.date,
         price=operation.price
     ).on_conflict_do_nothing(
-        index_elements=['asset_id', 'date']
-    )
-    await db.execute(stmt_upsert)
+        index_elements=['asset_id', 'trade_date']
+    ).returning(PriceHistory.price_id)
+    if (await db.execute(stmt_upsert)).scalar_one_or_none() is not None:
+        await upsert_latest_prices(db, [{"asset_id": operation.asset_id, "date": operation.date, "price": operation.price}])
+
+    mark_snapshots_dirty(db, operation.account_id, original_date)
+    mark_snapshots_dirty(db, operation.account_id, operation.date)
 
     return operation
 
 
-async def delete_operation(db: AsyncSession, operation_id: int, user_id: int) -> None:
-    """Delete an operation and its associated cash transaction."""
+async def delete_operation(db: AsyncSession, operation_id: int, user_id: int) -> int:
+    """Delete an operation and its associated cash transaction. Returns the operation's account_id."""
     # Fetch and verify ownership
     stmt = (
         select(Operation)
@@ -244,6 +302,12 @@ async def delete_operation(db: AsyncSession, operation_id: int, user_id: int) ->
 
     if transaction:
         transaction.is_active = False
+        mark_ledger_dirty(db, transaction.account_id, transaction.date)
+
+    mark_snapshots_dirty(db, operation.account_id, operation.date)
+    await apply_operation(db, operation, reverse=True)
 
     # Delete the operation
-    await db.delete(operation)
\ No newline at end of file
+    account_id = operation.account_id
+    await db.delete(operation)
+    return account_id
\ No newline at end of file
@@ -1,10 +1,14 @@
 from app.models.transaction import Transaction
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, text
+from datetime import date, timedelta
 from app.models.account import Account
 from app.schemas.transaction import TransactionCreate
 from fastapi import HTTPException
+from app.core.database import AsyncSessionLocal
+from app.core.pagination import encode_cursor, decode_cursor
+from app.services.snapshot_service import mark_snapshots_dirty, recompute_dirty_snapshots
+from app.services.ledger_service import mark_ledger_dirty, recompute_dirty_ledgers
 
 async def create_transaction_from_operation(db: AsyncSession, operation, asset_name: str):
     # Lógica de efectivo: 
@@ -26,6 +30,7 @@ async def create_transaction_from_operation(db: AsyncSession, operation, asset_n
     )
     
     db.add(new_transaction)
+    mark_ledger_dirty(db, operation.account_id, operation.date)
     return new_transaction
 
 
@@ -53,20 +58,145 @@ async def create_transaction(db: AsyncSession, transaction_data: TransactionCrea
     new_transaction.account = account
     
     db.add(new_transaction)
+    mark_snapshots_dirty(db, transaction_data.account_id, transaction_data.date)
+    mark_ledger_dirty(db, transaction_data.account_id, transaction_data.date)
+    await recompute_dirty_ledgers(db)
+    await recompute_dirty_snapshots(db)
     await db.commit()
     await db.refresh(new_transaction)
     new_transaction.account = account
     return new_transaction
 
-async def get_user_transactions(db: AsyncSession, user_id: int):
-    # Join con accounts para asegurar que solo vemos lo del usuario
-    stmt = (
-        select(Transaction)
-        .join(Account)
-        .options(selectinload(Transaction.account))
-        .where(Account.user_id == user_id)
-        .where(Transaction.is_active == True)
-        .order_by(Transaction.date.desc())
+_TRANSACTION_COLUMNS = """
+    t.transaction_id,
+    t.account_id,
+    ac.name AS account_name,
+    t.category,
+    t.date,
+    t.amount,
+    t.type,
+    t.description,
+    t.created_at,
+    t.running_balance
+"""
+
+
+def _transaction_filters(
+    user_id: int,
+    cursor: str | None,
+    account_id: int | None,
+    category: str | None,
+    type: str | None,
+    date_from: date | None,
+    date_to: date | None,
+):
+    """(filtros sobre t, filtro sobre ac, params) comunes a la página y al stream."""
+    params = {"user_id": user_id}
+    account_filter = ""
+    filters = ["t.is_active = TRUE"]
+    if account_id is not None:
+        account_filter = "AND ac.account_id = :account_id"
+        params["account_id"] = account_id
+    if category is not None:
+        filters.append("t.category = :category")
+        params["category"] = category
+    if type is not None:
+        filters.append("t.type = :type")
+        params["type"] = type
+    if date_from is not None:
+        filters.append("t.date >= :date_from")
+        params["date_from"] = date_from
+    if date_to is not None:
+        # Día completo incluido
+        filters.append("t.date < :date_to")
+        params["date_to"] = date_to + timedelta(days=1)
+    if cursor:
+        params["cursor_date"], params["cursor_id"] = decode_cursor(cursor)
+        filters.append("(t.date, t.transaction_id) < (:cursor_date, :cursor_id)")
+    return " AND ".join(filters), account_filter, params
+
+
+async def get_user_transactions(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 100,
+    cursor: str | None = None,
+    account_id: int | None = None,
+    category: str | None = None,
+    type: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+):
+    """
+    Transacciones activas del usuario, de la más reciente a la más antigua, por páginas.
+
+    Keyset sobre (date, transaction_id) como en trade_service.get_trade_history: cada cuenta
+    se recorre hacia atrás por idx_transactions_ledger desde el cursor y para en `limit` filas.
+    Devuelve (filas, cursor de la siguiente página o None). ValueError si el cursor no es válido.
+    """
+    where, account_filter, params = _transaction_filters(
+        user_id, cursor, account_id, category, type, date_from, date_to
     )
-    result = await db.execute(stmt)
-    return result.scalars().all()
\ No newline at end of file
+    params["limit"] = limit + 1
+
+    result = await db.execute(text(f"""
+        SELECT {_TRANSACTION_COLUMNS}
+        FROM accounts ac
+        CROSS JOIN LATERAL (
+            SELECT t.*
+            FROM transactions t
+            WHERE t.account_id = ac.account_id AND {where}
+            ORDER BY t.date DESC, t.transaction_id DESC
+            LIMIT :limit
+        ) t
+        WHERE ac.user_id = :user_id {account_filter}
+        ORDER BY t.date DESC, t.transaction_id DESC
+        LIMIT :limit
+    """), params)
+    transactions = result.all()
+
+    next_cursor = None
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        next_cursor = encode_cursor(transactions[-1].date, transactions[-1].transaction_id)
+    return transactions, next_cursor
+
+
+async def stream_user_transactions(
+    user_id: int,
+    cursor: str | None = None,
+    account_id: int | None = None,
+    category: str | None = None,
+    type: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    chunk_size: int = 1000,
+):
+    """
+    Mismo listado que get_user_transactions pero completo, leído de un cursor de servidor de
+    `chunk_size` en `chunk_size` filas: en memoria solo hay un bloque a la vez.
+
+    Abre su propia sesión porque se consume desde un StreamingResponse, después de que la
+    petición haya devuelto. El cursor se valida antes de empezar (ValueError).
+    """
+    where, account_filter, params = _transaction_filters(
+        user_id, cursor, account_id, category, type, date_from, date_to
+    )
+
+    async def rows():
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(
+                text(f"""
+                    SELECT {_TRANSACTION_COLUMNS}
+                    FROM transactions t
+                    JOIN accounts ac ON ac.account_id = t.account_id
+                    WHERE ac.user_id = :user_id {account_filter} AND {where}
+                    ORDER BY t.date DESC, t.transaction_id DESC
+                """),
+                params,
+                execution_options={"yield_per": chunk_size},
+            )
+            async for chunk in result.partitions():
+                yield chunk
+
+    return rows()
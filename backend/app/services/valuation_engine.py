@@ -0,0 +1,156 @@
+"""
+Motor de valoración vectorizado (NumPy).
+
+Alternativa a la serie materializada en SQL: lee una vez las filas crudas de
+operations, transactions y price_history (lecturas indexadas, sin funciones ventana)
+y calcula la serie diaria como matrices densas día x activo:
+
+    posiciones = cumsum(cantidades)         precios = forward-fill(price_history)
+    valor      = sum(posiciones * precios)  efectivo = cumsum(movimientos de caja)
+
+Se activa con VALUATION_ENGINE=numpy.
+"""
+
+from datetime import date
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+
+def _columns(rows: list, start: date) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Filas (día, x, y) -> (fila de cada día respecto a start, x, y) como arrays."""
+    days, xs, ys = zip(*rows)
+    # Ordinales en vez de datetime64: convertir objetos date con NumPy es mucho más lento
+    offsets = np.fromiter(map(date.toordinal, days), dtype=np.int64, count=len(days)) - start.toordinal()
+    return offsets, np.fromiter(map(float, xs), dtype=float, count=len(xs)), np.fromiter(map(float, ys), dtype=float, count=len(ys))
+
+
+def compute_series(start: date, end: date, ops, txs, prices) -> list[dict]:
+    """
+    ops:    iterable de (día, asset_id, cantidad con signo)
+    txs:    iterable de (día, delta de efectivo, delta de capital invertido)
+    prices: iterable de (día, asset_id, precio) — como mucho uno por activo y día
+    Devuelve los puntos {"date", "capital_invertido", "total_value"} de start a end.
+    """
+    if start is None or end < start:
+        return []
+
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    n_days = len(days)
+
+    ops = list(ops)
+    prices = list(prices)
+    asset_ids = np.array(sorted({asset_id for _, asset_id, _ in ops}), dtype=np.int64)
+    n_assets = len(asset_ids)
+
+    assets_value = np.zeros(n_days)
+    if n_assets:
+        # Cantidades: las operaciones anteriores a start cuentan desde el primer día
+        op_rows, op_assets, op_qty = _columns(ops, start)
+        op_rows = np.clip(op_rows, 0, None)
+        op_cols = np.searchsorted(asset_ids, op_assets.astype(np.int64))
+        keep = op_rows < n_days
+        qty = np.zeros((n_days, n_assets))
+        np.add.at(qty, (op_rows[keep], op_cols[keep]), op_qty[keep])
+        positions = np.cumsum(qty, axis=0)
+
+        # Precios: el último anterior a start hace de apertura; luego forward-fill por columna
+        price_mat = np.full((n_days, n_assets), np.nan)
+        if prices:
+            p_rows, p_assets, p_values = _columns(prices, start)
+            p_assets = p_assets.astype(np.int64)
+            p_cols = np.minimum(np.searchsorted(asset_ids, p_assets), n_assets - 1)
+            known = asset_ids[p_cols] == p_assets
+
+            in_range = known & (p_rows >= 0) & (p_rows < n_days)
+            price_mat[p_rows[in_range], p_cols[in_range]] = p_values[in_range]
+
+            before = known & (p_rows < 0)
+            if before.any():
+                # Orden por (columna, día): la última fila de cada columna es su apertura
+                b_rows, b_cols, b_values = p_rows[before], p_cols[before], p_values[before]
+                order = np.lexsort((b_rows, b_cols))
+                b_cols, b_values = b_cols[order], b_values[order]
+                last = np.append(b_cols[1:] != b_cols[:-1], True)
+                open_cols, open_values = b_cols[last], b_values[last]
+                missing = np.isnan(price_mat[0, open_cols])
+                price_mat[0, open_cols[missing]] = open_values[missing]
+
+        valid = ~np.isnan(price_mat)
+        fill_idx = np.where(valid, np.arange(n_days)[:, None], 0)
+        np.maximum.accumulate(fill_idx, axis=0, out=fill_idx)
+        filled = price_mat[fill_idx, np.arange(n_assets)]
+        filled = np.where(np.isnan(filled), 0.0, filled)
+
+        assets_value = (positions * filled).sum(axis=1)
+
+    cash_delta = np.zeros(n_days)
+    invested_delta = np.zeros(n_days)
+    txs = list(txs)
+    if txs:
+        tx_rows, tx_cash, tx_invested = _columns(txs, start)
+        tx_rows = np.clip(tx_rows, 0, None)
+        keep = tx_rows < n_days
+        np.add.at(cash_delta, tx_rows[keep], tx_cash[keep])
+        np.add.at(invested_delta, tx_rows[keep], tx_invested[keep])
+    cash = np.cumsum(cash_delta)
+    invested = np.cumsum(invested_delta)
+
+    total = assets_value + cash
+    return [
+        {
+            "date": day,
+            "capital_invertido": float(invested[i]),
+            "total_value": float(total[i]),
+        }
+        for i, day in enumerate(days.astype(date).tolist())
+    ]
+
+
+async def get_series(db: AsyncSession, user_id: int | None = None, account_id: int | None = None) -> list[dict]:
+    """Serie diaria de todas las cuentas del usuario o de una sola cuenta, calculada con NumPy."""
+    if account_id is not None:
+        scope = "account_id = :account_id"
+        params = {"account_id": account_id}
+    else:
+        scope = "account_id IN (SELECT account_id FROM accounts WHERE user_id = :user_id)"
+        params = {"user_id": user_id}
+
+    tx_result = await db.execute(text(f"""
+        SELECT date::date AS day,
+               SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END) AS cash,
+               SUM(CASE
+                   WHEN type = 'income' AND category != 'Inversión' THEN amount
+                   WHEN type = 'expense' AND category != 'Inversión' THEN -amount
+                   ELSE 0 END) AS invested
+        FROM transactions
+        WHERE {scope} AND is_active = TRUE
+        GROUP BY 1
+        ORDER BY 1
+    """), params)
+    txs = [(row.day, row.cash, row.invested or 0) for row in tx_result.all()]
+    if not txs:
+        return []
+
+    ops_result = await db.execute(text(f"""
+        SELECT date::date AS day, asset_id,
+               SUM(CASE WHEN operation_type = 'buy' THEN quantity ELSE -quantity END) AS qty
+        FROM operations
+        WHERE {scope}
+        GROUP BY 1, 2
+    """), params)
+    ops = [(row.day, row.asset_id, row.qty) for row in ops_result.all()]
+
+    prices = []
+    asset_ids = list({asset_id for _, asset_id, _ in ops})
+    if asset_ids:
+        price_result = await db.execute(text("""
+            SELECT trade_date AS day, asset_id, price
+            FROM price_history
+            WHERE asset_id = ANY(:asset_ids)
+            ORDER BY asset_id, trade_date
+        """), {"asset_ids": asset_ids})
+        prices = [(row.day, row.asset_id, row.price) for row in price_result.all()]
+
+    today = (await db.execute(text("SELECT CURRENT_DATE"))).scalar()
+    return compute_series(txs[0][0], today, ops, txs, prices)
@@ -0,0 +1,142 @@
+"""
+Vistas cacheadas del dashboard de un usuario.
+
+Tanto el propio usuario (api/v1/portfolio.py, history_chart.py) como sus amigos
+(api/v1/friends.py) leen las mismas claves, así que una cartera vista por muchos
+amigos se calcula una sola vez hasta que una mutación invalida sus etiquetas.
+Estas funciones no comprueban permisos: eso es cosa del endpoint.
+
+Las vistas de api/v1/portfolio.py se guardan ya codificadas (EncodedBody, core/responses.py)
+con su esquema de respuesta: el endpoint las devuelve con encoded_response() sin validar ni
+serializar en cada hit. Las de la serie (growth) siguen siendo objetos porque el endpoint
+calcula deltas sobre ellas.
+"""
+
+from pydantic import TypeAdapter
+
+from app.core.cache import get_or_compute
+from app.core.database import AsyncSessionLocal
+from app.core.dependencies import ParallelSessions
+from app.core.responses import encode_json
+from app.schemas.allocation import AccountWithBalance, AssetAllocation, AssetTableRow
+from app.schemas.performance import PerformanceResponse
+from app.schemas.dashboard import DashboardResponse
+from app.services.cache_tags import get_view_tags
+from app.services.account_service import get_accounts_with_balance, get_selected_account_with_balance
+from app.services.assets_service import get_all_assets, get_asset_allocation, get_global_asset_allocation
+from app.services.performance_service import get_performance_metrics
+from app.services.history_chart_service import get_portfolio_growth, get_account_growth
+from app.services.series_changes import get_data_version
+from app.services.dashboard_service import get_dashboard
+
+_ACCOUNTS = TypeAdapter(list[AccountWithBalance])
+_ASSETS = TypeAdapter(list[AssetTableRow])
+_ALLOCATION = TypeAdapter(list[AssetAllocation])
+_PERFORMANCE = TypeAdapter(PerformanceResponse)
+_DASHBOARD = TypeAdapter(DashboardResponse)
+
+
+async def cached_view(user_id: int, cache_key: str, compute, account_id: int | None = None,
+                      adapter: TypeAdapter | None = None, exclude_unset: bool = False):
+    """
+    Devuelve la vista de caché o la calcula con compute(db) y la guarda etiquetada.
+
+    El cálculo abre su propia sesión: lo comparten todas las peticiones que esperan la misma
+    clave (single-flight) y puede ejecutarse en segundo plano al refrescar una vista stale.
+    Con adapter se guarda (y devuelve) el EncodedBody del valor en vez del valor.
+    """
+    async def produce():
+        async with AsyncSessionLocal() as db:
+            value = await compute(db)
+            tags = await get_view_tags(db, user_id, account_id)
+        if adapter is not None:
+            value = encode_json(value, adapter, exclude_unset)
+        return value, tags
+    return await get_or_compute(user_id, cache_key, produce)
+
+
+async def accounts_view(user_id: int):
+    return await cached_view(user_id, "accounts_all", lambda db: get_accounts_with_balance(db, user_id), adapter=_ACCOUNTS)
+
+
+async def account_view(user_id: int, account_id: int):
+    return await cached_view(
+        user_id, f"account_{account_id}",
+        lambda db: get_selected_account_with_balance(db, user_id, account_id),
+        account_id, _ACCOUNTS
+    )
+
+
+async def all_assets_view(user_id: int):
+    return await cached_view(user_id, "assets_all", lambda db: get_all_assets(db, user_id), adapter=_ASSETS)
+
+
+def _group_by(group_by: str) -> str:
+    # GROUP_BY ::= asset | theme | type; los servicios tratan cualquier otro valor como asset,
+    # así que comparten entrada de caché en vez de crear una por cadena recibida
+    return group_by if group_by in ("asset", "theme", "type") else "asset"
+
+
+async def allocation_view(user_id: int, group_by: str, account_id: int | None = None):
+    group_by = _group_by(group_by)
+    if account_id is None:
+        return await cached_view(
+            user_id, f"assets_alloc_{group_by}_global",
+            lambda db: get_global_asset_allocation(db, user_id, group_by),
+            adapter=_ALLOCATION
+        )
+    return await cached_view(
+        user_id, f"assets_alloc_{group_by}_{account_id}",
+        lambda db: get_asset_allocation(db, account_id, user_id, group_by),
+        account_id, _ALLOCATION
+    )
+
+
+async def performance_view(user_id: int, account_id: int | None = None, periods: list[str] | None = None):
+    cache_key = f"performance_{account_id or 'all'}"
+    if periods:
+        cache_key += "_" + ",".join(p.strip().upper() for p in periods)
+    return await cached_view(
+        user_id, cache_key,
+        lambda db: get_performance_metrics(db, user_id, account_id, periods),
+        account_id, _PERFORMANCE
+    )
+
+
+def _growth_key(scope: str, resolution: str, max_points: int | None) -> str:
+    # La serie diaria completa conserva la clave de siempre
+    key = f"growth_{scope}"
+    if resolution != "day" or max_points:
+        key += f"_{resolution}_{max_points or 'all'}"
+    return key
+
+
+async def growth_view(user_id: int, resolution: str = "day", max_points: int | None = None):
+    async def compute(db):
+        # Versión leída antes que la serie: si cambia entre medias, el delta siguiente lo repite
+        version = await get_data_version(db, user_id)
+        return {"history": await get_portfolio_growth(db, user_id, resolution, max_points), "version": version}
+    return await cached_view(user_id, _growth_key("all", resolution, max_points), compute)
+
+
+async def account_growth_view(user_id: int, account_id: int, resolution: str = "day", max_points: int | None = None):
+    async def compute(db):
+        version = await get_data_version(db, user_id)
+        return {"history": await get_account_growth(db, account_id, resolution, max_points), "version": version}
+    return await cached_view(
+        user_id, _growth_key(f"account_{account_id}", resolution, max_points), compute, account_id
+    )
+
+
+async def dashboard_view(parallel: ParallelSessions, user_id: int, sections: list[str], group_by: str,
+                         account_id: int | None = None, periods: list[str] | None = None):
+    group_by = _group_by(group_by)
+    cache_key = f"dashboard_{account_id or 'all'}_{group_by}_{','.join(sections)}"
+    if periods:
+        cache_key += "_" + ",".join(p.strip().upper() for p in periods)
+    # Etiquetas de todo el usuario: accounts y assets cubren todas sus cuentas aunque se pida account_id
+    return await cached_view(
+        user_id, cache_key,
+        lambda db: get_dashboard(parallel, user_id, sections, group_by, account_id, periods),
+        adapter=_DASHBOARD, exclude_unset=True
+    )
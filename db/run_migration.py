@@ -14,6 +14,134 @@ cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS auth_provider VARCHAR(20
 cur.execute('ALTER TABLE users ALTER COLUMN password_hash DROP NOT NULL')
 cur.execute('UPDATE users SET email_verified = TRUE WHERE email_verified IS NULL OR email_verified = FALSE')
 cur.execute("UPDATE users SET auth_provider = 'email' WHERE auth_provider IS NULL")
+
+# Serie diaria materializada (se rellena bajo demanda o con `python -m app.maintenance rebuild-snapshots`)
+cur.execute("""
+    CREATE TABLE IF NOT EXISTS portfolio_daily_snapshot (
+        account_id       BIGINT NOT NULL REFERENCES accounts(account_id) ON DELETE CASCADE,
+        day              DATE NOT NULL,
+        assets_value     NUMERIC(15,6) NOT NULL DEFAULT 0,
+        cash_balance     NUMERIC(15,6) NOT NULL DEFAULT 0,
+        invested_capital NUMERIC(15,6) NOT NULL DEFAULT 0,
+        computed_at      TIMESTAMPTZ DEFAULT NOW(),
+        PRIMARY KEY (account_id, day)
+    )
+""")
+cur.execute("""
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'portfolio_daily_snapshot' AND column_name = 'positions'
+""")
+if not cur.fetchone():
+    # Las filas antiguas no tienen posiciones desde las que avanzar: se reconstruyen al leer
+    cur.execute("ALTER TABLE portfolio_daily_snapshot ADD COLUMN positions JSONB NOT NULL DEFAULT '{}'")
+    cur.execute("TRUNCATE portfolio_daily_snapshot")
+
+# Último precio por activo (se sincroniza con price_history en cada ejecución)
+cur.execute("""
+    CREATE TABLE IF NOT EXISTS asset_latest_price (
+        asset_id   BIGINT PRIMARY KEY REFERENCES assets(asset_id) ON DELETE CASCADE,
+        date       TIMESTAMPTZ NOT NULL,
+        price      NUMERIC(15,6) NOT NULL,
+        updated_at TIMESTAMPTZ DEFAULT NOW()
+    )
+""")
+cur.execute("""
+    INSERT INTO asset_latest_price (asset_id, date, price)
+    SELECT DISTINCT ON (asset_id) asset_id, date, price
+    FROM price_history
+    ORDER BY asset_id, date DESC
+    ON CONFLICT (asset_id) DO UPDATE
+    SET date = EXCLUDED.date, price = EXCLUDED.price, updated_at = NOW()
+    WHERE EXCLUDED.date >= asset_latest_price.date
+""")
+
+# Posiciones actuales por cuenta/activo (se reconstruyen con `python -m app.maintenance rebuild-positions`)
+cur.execute("""
+    CREATE TABLE IF NOT EXISTS positions (
+        account_id BIGINT NOT NULL REFERENCES accounts(account_id) ON DELETE CASCADE,
+        asset_id   BIGINT NOT NULL REFERENCES assets(asset_id) ON DELETE CASCADE,
+        quantity   NUMERIC(20,6) NOT NULL DEFAULT 0,
+        cost_basis NUMERIC NOT NULL DEFAULT 0,
+        updated_at TIMESTAMPTZ DEFAULT NOW(),
+        PRIMARY KEY (account_id, asset_id)
+    )
+""")
+cur.execute("""
+    INSERT INTO positions (account_id, asset_id, quantity, cost_basis)
+    SELECT account_id, asset_id,
+           SUM(CASE WHEN operation_type = 'buy' THEN quantity ELSE -quantity END),
+           SUM(CASE WHEN operation_type = 'buy' THEN quantity * price ELSE -quantity * price END)
+    FROM operations
+    GROUP BY account_id, asset_id
+    ON CONFLICT (account_id, asset_id) DO UPDATE
+    SET quantity = EXCLUDED.quantity, cost_basis = EXCLUDED.cost_basis, updated_at = NOW()
+""")
+
+# Libro de efectivo: saldo acumulado por transacción y saldo por cuenta (`python -m app.maintenance rebuild-ledger`)
+cur.execute('ALTER TABLE accounts ADD COLUMN IF NOT EXISTS cash_balance NUMERIC(20,6) NOT NULL DEFAULT 0')
+cur.execute('ALTER TABLE transactions ADD COLUMN IF NOT EXISTS running_balance NUMERIC(20,6)')
+cur.execute('CREATE INDEX IF NOT EXISTS idx_transactions_ledger ON transactions(account_id, date, transaction_id) WHERE is_active = TRUE')
+cur.execute("""
+    UPDATE transactions t
+    SET running_balance = CASE WHEN t.is_active THEN l.balance END
+    FROM (
+        SELECT transaction_id,
+               SUM(CASE WHEN is_active THEN CASE WHEN type = 'income' THEN amount ELSE -amount END ELSE 0 END)
+                   OVER (PARTITION BY account_id ORDER BY date, transaction_id) AS balance
+        FROM transactions
+    ) l
+    WHERE l.transaction_id = t.transaction_id
+""")
+cur.execute("""
+    UPDATE accounts a
+    SET cash_balance = COALESCE((
+        SELECT SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END)
+        FROM transactions
+        WHERE account_id = a.account_id AND is_active = TRUE
+    ), 0)
+""")
+
+# Actividad de usuarios: el precalentado de caché tras la actualización de precios solo cubre a los activos
+cur.execute('ALTER TABLE users ADD COLUMN IF NOT EXISTS last_active_at TIMESTAMPTZ')
+cur.execute('CREATE INDEX IF NOT EXISTS idx_users_last_active ON users(last_active_at)')
+
+# Precios por día: trade_date (día UTC) y unicidad (asset_id, trade_date). Se queda la última cotización
+# de cada día; a partir de aquí los escritores hacen upsert sobre el día y no hace falta consolidar
+cur.execute("""
+    ALTER TABLE price_history
+    ADD COLUMN IF NOT EXISTS trade_date DATE GENERATED ALWAYS AS ((date AT TIME ZONE 'UTC')::date) STORED
+""")
+cur.execute("SELECT 1 FROM pg_constraint WHERE conname = 'uq_price_asset_day'")
+if not cur.fetchone():
+    cur.execute("""
+        DELETE FROM price_history ph
+        USING price_history later
+        WHERE later.asset_id = ph.asset_id
+          AND later.trade_date = ph.trade_date
+          AND later.date > ph.date
+    """)
+    print(f'  price_history: {cur.rowcount} duplicados intradía eliminados')
+    cur.execute('ALTER TABLE price_history ADD CONSTRAINT uq_price_asset_day UNIQUE (asset_id, trade_date)')
+cur.execute('ALTER TABLE price_history DROP CONSTRAINT IF EXISTS uq_asset_date')
+cur.execute('DROP INDEX IF EXISTS idx_price_asset_date')
+cur.execute('DROP TABLE IF EXISTS job_watermarks')
+
+# Historial de operaciones paginado (keyset por cuenta). Cubre también las búsquedas por account_id
+cur.execute('CREATE INDEX IF NOT EXISTS idx_operations_account_date ON operations(account_id, date DESC, operation_id DESC)')
+cur.execute('DROP INDEX IF EXISTS idx_operations_account')
+
+# Delta de la serie diaria: versión de datos por usuario y registro de cambios (desde qué día cambia cada cuenta)
+cur.execute('ALTER TABLE users ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT 0')
+cur.execute("""
+    CREATE TABLE IF NOT EXISTS series_changes (
+        user_id    BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+        version    BIGINT NOT NULL,
+        account_id BIGINT NOT NULL,
+        from_day   DATE,
+        changed_at TIMESTAMPTZ DEFAULT NOW(),
+        PRIMARY KEY (user_id, version, account_id)
+    )
+""")
 conn.commit()
 
 cur.execute("SELECT column_name, data_type, is_nullable FROM information_schema.columns WHERE table_name='users' ORDER BY ordinal_position")
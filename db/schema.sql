@@ -12,7 +12,11 @@ CREATE TABLE users (
     is_active BOOLEAN DEFAULT TRUE,
     email_verified BOOLEAN DEFAULT FALSE,
     google_id VARCHAR(255) UNIQUE,
-    auth_provider VARCHAR(20) DEFAULT 'email'
+    auth_provider VARCHAR(20) DEFAULT 'email',
+    -- Último login o refresco de sesión (usuarios a precalentar tras la actualización de precios)
+    last_active_at TIMESTAMPTZ,
+    -- Versión de los datos de la serie del usuario (sube con cada fila de series_changes)
+    data_version BIGINT NOT NULL DEFAULT 0
 );
 
 CREATE TABLE accounts (
@@ -23,6 +27,7 @@ CREATE TABLE accounts (
     currency CHAR(3) NOT NULL,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     is_active BOOLEAN DEFAULT TRUE,
+    cash_balance NUMERIC(20,6) NOT NULL DEFAULT 0,  -- saldo de efectivo, lo mantiene ledger_service
 
     CONSTRAINT fk_account_user
         FOREIGN KEY (user_id) REFERENCES users(user_id)
@@ -39,6 +44,7 @@ CREATE TABLE transactions (
     description TEXT,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     is_active BOOLEAN DEFAULT TRUE,
+    running_balance NUMERIC(20,6),  -- saldo de la cuenta tras esta transacción (NULL si está inactiva)
 
     CONSTRAINT fk_transaction_account
         FOREIGN KEY (account_id) REFERENCES accounts(account_id),
@@ -85,16 +91,19 @@ CREATE TABLE operations (
         CHECK (operation_type IN ('buy', 'sell'))
 );
 
+-- Un precio por activo y día (UTC): date es el instante de la última cotización del día y los
+-- escritores hacen upsert sobre (asset_id, trade_date), así que nunca hay duplicados intradía.
 CREATE TABLE price_history (
     price_id BIGSERIAL PRIMARY KEY,
     asset_id BIGINT NOT NULL,
     date TIMESTAMPTZ NOT NULL,
     price NUMERIC(15,6) NOT NULL,
+    trade_date DATE GENERATED ALWAYS AS ((date AT TIME ZONE 'UTC')::date) STORED,
 
     CONSTRAINT fk_price_asset
         FOREIGN KEY (asset_id) REFERENCES assets(asset_id),
 
-    CONSTRAINT uq_asset_date UNIQUE (asset_id, date)
+    CONSTRAINT uq_price_asset_day UNIQUE (asset_id, trade_date)
 );
 
 CREATE TABLE user_assets (
@@ -109,13 +118,15 @@ CREATE TABLE user_assets (
         FOREIGN KEY (asset_id) REFERENCES assets(asset_id) ON DELETE CASCADE
 );
 
+CREATE INDEX idx_users_last_active ON users(last_active_at);
+
 CREATE INDEX idx_transactions_account ON transactions(account_id);
 CREATE INDEX idx_transactions_date ON transactions(date);
+CREATE INDEX idx_transactions_ledger ON transactions(account_id, date, transaction_id) WHERE is_active = TRUE;
 
 CREATE INDEX idx_operations_asset ON operations(asset_id);
-CREATE INDEX idx_operations_account ON operations(account_id);
-
-CREATE INDEX idx_price_asset_date ON price_history(asset_id, date DESC);
+-- Historial paginado por cuenta (keyset sobre date, operation_id)
+CREATE INDEX idx_operations_account_date ON operations(account_id, date DESC, operation_id DESC);
 
 CREATE INDEX idx_user_assets_user ON user_assets(user_id);
 CREATE INDEX idx_user_assets_asset ON user_assets(asset_id);
@@ -141,3 +152,66 @@ CREATE TABLE friendships (
 
 CREATE INDEX idx_friendships_requester ON friendships(requester_id);
 CREATE INDEX idx_friendships_addressee ON friendships(addressee_id);
+
+-- Serie diaria materializada por cuenta (valor de activos, efectivo y capital invertido).
+-- La mantiene app/services/snapshot_service.py avanzando desde el día anterior persistido;
+-- los gráficos leen de aquí con un range scan.
+CREATE TABLE portfolio_daily_snapshot (
+    account_id       BIGINT NOT NULL,
+    day              DATE NOT NULL,
+    assets_value     NUMERIC(15,6) NOT NULL DEFAULT 0,
+    cash_balance     NUMERIC(15,6) NOT NULL DEFAULT 0,
+    invested_capital NUMERIC(15,6) NOT NULL DEFAULT 0,
+    positions        JSONB NOT NULL DEFAULT '{}',  -- {asset_id: cantidad} al cierre del día
+    computed_at      TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (account_id, day),
+
+    CONSTRAINT fk_snapshot_account
+        FOREIGN KEY (account_id) REFERENCES accounts(account_id) ON DELETE CASCADE
+);
+
+-- Último precio conocido de cada activo. Lo mantienen el worker, el backfill y el alta/edición
+-- de operaciones al escribir en price_history. Las valoraciones lo leen por clave primaria.
+CREATE TABLE asset_latest_price (
+    asset_id   BIGINT PRIMARY KEY,
+    date       TIMESTAMPTZ NOT NULL,
+    price      NUMERIC(15,6) NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    CONSTRAINT fk_latest_price_asset
+        FOREIGN KEY (asset_id) REFERENCES assets(asset_id) ON DELETE CASCADE
+);
+
+-- Posición actual de cada activo en cada cuenta (cantidad neta y coste neto = compras - ventas).
+-- La mantiene app/services/position_service.py en la misma transacción que cada alta, edición o
+-- borrado de operaciones. Las vistas de cartera leen de aquí en vez de agregar todo el histórico.
+CREATE TABLE positions (
+    account_id BIGINT NOT NULL,
+    asset_id   BIGINT NOT NULL,
+    quantity   NUMERIC(20,6) NOT NULL DEFAULT 0,
+    cost_basis NUMERIC NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (account_id, asset_id),
+
+    CONSTRAINT fk_position_account
+        FOREIGN KEY (account_id) REFERENCES accounts(account_id) ON DELETE CASCADE,
+
+    CONSTRAINT fk_position_asset
+        FOREIGN KEY (asset_id) REFERENCES assets(asset_id) ON DELETE CASCADE
+);
+
+-- Registro de cambios de la serie diaria: cada escritura que la reescribe (operaciones,
+-- transacciones, precios, borrado de cuentas) sube users.data_version y apunta desde qué día
+-- cambia cada cuenta. /history_chart/growth?since=...&version=... lo usa para devolver solo
+-- los puntos cambiados. El worker borra las filas de más de 30 días.
+CREATE TABLE series_changes (
+    user_id    BIGINT NOT NULL,
+    version    BIGINT NOT NULL,
+    account_id BIGINT NOT NULL,  -- sin FK: se conserva el cambio de una cuenta borrada
+    from_day   DATE,             -- NULL = cuenta borrada (cambia toda la serie del usuario)
+    changed_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, version, account_id),
+
+    CONSTRAINT fk_series_change_user
+        FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
@@ -1,6 +1,6 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Transaction } from '../types/transaction'
-import { getTransactions } from '../services/transactionService'
+import { getTransactionsPage, TransactionFilters } from '../services/transactionService'
 import { getUserAccounts } from '../services/accountService'
 import { Account } from '../types/account'
 import { Plus } from 'lucide-react'
@@ -9,22 +9,41 @@ import { layout, surface, table } from '../styles/theme'
 
 export default function TransactionsPage() {
   const [transactions, setTransactions] = useState<Transaction[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
   const [accounts, setAccounts] = useState<Account[]>([])
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [showForm, setShowForm] = useState(false)
+  // Solo cuenta la última carga: una respuesta de filtros anteriores se descarta
+  const requestId = useRef(0)
+  const sentinelRef = useRef<HTMLDivElement>(null)
 
-  // Filter and sort states
-  const [selectedAccount, setSelectedAccount] = useState<string>('all')
+  // Filter and sort states (cuenta y fechas las filtra el servidor)
+  const [selectedAccount, setSelectedAccount] = useState<string>('all') // account_id o 'all'
   const [startDate, setStartDate] = useState<string>('')
   const [endDate, setEndDate] = useState<string>('')
   const [sortBy, setSortBy] = useState<string>('date_desc')
   const [searchQuery, setSearchQuery] = useState<string>('')
 
   useEffect(() => {
-    fetchHistory()
     loadAccounts()
   }, [])
 
+  useEffect(() => {
+    fetchHistory()
+  }, [selectedAccount, startDate, endDate])
+
+  // Siguiente página al llegar al final de la tabla
+  useEffect(() => {
+    const sentinel = sentinelRef.current
+    if (!sentinel || !nextCursor) return
+    const observer = new IntersectionObserver(entries => {
+      if (entries[0].isIntersecting) loadMore()
+    })
+    observer.observe(sentinel)
+    return () => observer.disconnect()
+  }, [nextCursor, loadingMore, loading])
+
   const loadAccounts = async () => {
     try {
       const data = await getUserAccounts()
@@ -32,11 +51,37 @@ export default function TransactionsPage() {
     } catch { /* */ }
   }
 
+  const currentFilters = (): TransactionFilters => ({
+    accountId: selectedAccount !== 'all' ? Number(selectedAccount) : undefined,
+    dateFrom: startDate || undefined,
+    dateTo: endDate || undefined,
+  })
+
   const fetchHistory = async () => {
+    const id = ++requestId.current
     setLoading(true)
-    try { setTransactions(await getTransactions()) }
+    try {
+      const page = await getTransactionsPage(currentFilters())
+      if (id !== requestId.current) return
+      setTransactions(page.items)
+      setNextCursor(page.nextCursor)
+    }
     catch { /* */ }
-    finally { setLoading(false) }
+    finally { if (id === requestId.current) setLoading(false) }
+  }
+
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return
+    const id = requestId.current
+    setLoadingMore(true)
+    try {
+      const page = await getTransactionsPage(currentFilters(), nextCursor)
+      if (id !== requestId.current) return
+      setTransactions(prev => [...prev, ...page.items])
+      setNextCursor(page.nextCursor)
+    }
+    catch { /* */ }
+    finally { setLoadingMore(false) }
   }
 
   const handleClearFilters = () => {
@@ -47,19 +92,9 @@ export default function TransactionsPage() {
     setSearchQuery('')
   }
 
+  // Búsqueda y orden sobre las páginas ya cargadas (el servidor devuelve recientes primero)
   const filteredTransactions = transactions
     .filter(t => {
-      if (selectedAccount !== 'all' && t.account_name !== selectedAccount) {
-        return false
-      }
-      if (startDate) {
-        const txDate = new Date(t.date).toISOString().split('T')[0]
-        if (txDate < startDate) return false
-      }
-      if (endDate) {
-        const txDate = new Date(t.date).toISOString().split('T')[0]
-        if (txDate > endDate) return false
-      }
       if (searchQuery) {
         const query = searchQuery.toLowerCase()
         const matchDesc = t.description?.toLowerCase().includes(query)
@@ -87,8 +122,6 @@ export default function TransactionsPage() {
       return 0
     })
 
-  if (loading) return <div className="flex justify-center p-20 text-[var(--text-muted)]">Cargando...</div>
-
   return (
     <div className={layout.pageStack}>
       {/* Header */}
@@ -117,7 +150,7 @@ export default function TransactionsPage() {
           >
             <option value="all">Todas las cuentas</option>
             {accounts.map(acc => (
-              <option key={acc.account_id} value={acc.name}>{acc.name}</option>
+              <option key={acc.account_id} value={String(acc.account_id)}>{acc.name}</option>
             ))}
           </select>
         </div>
@@ -184,7 +217,9 @@ export default function TransactionsPage() {
 
       {/* Tabla */}
       <div className={surface.tableContainer}>
-        {filteredTransactions.length === 0 ? (
+        {loading ? (
+          <div className="flex justify-center p-20 text-[var(--text-muted)]">Cargando...</div>
+        ) : filteredTransactions.length === 0 && !nextCursor ? (
           <div className="p-12 text-center text-[var(--text-muted)]">Sin movimientos</div>
         ) : (
           <table className={table.wrapper}>
@@ -212,6 +247,17 @@ export default function TransactionsPage() {
             </tbody>
           </table>
         )}
+        {!loading && nextCursor && (
+          <div ref={sentinelRef} className="flex justify-center p-4">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="px-4 py-2 text-xs bg-[var(--btn-secondary-bg)] hover:bg-[var(--btn-secondary-hover)] rounded-lg text-[var(--text-primary)] font-medium transition cursor-pointer"
+            >
+              {loadingMore ? 'Cargando...' : 'Cargar más'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   )
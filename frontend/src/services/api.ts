@@ -21,12 +21,13 @@ async function attemptRefresh(): Promise<void> {
 /**
  * Core fetch wrapper. All requests include credentials (cookies).
  * State-changing methods include X-CSRF-Token header.
+ * Returns the raw response once it is known to be OK.
  */
-async function apiRequest<T>(
+async function apiFetch(
     endpoint: string,
     options: RequestInit = {},
     requireAuth: boolean = false
-): Promise<T> {
+): Promise<Response> {
     const method = (options.method || 'GET').toUpperCase();
     const headers: Record<string, string> = {
         ...(options.headers as Record<string, string> || {}),
@@ -84,6 +85,15 @@ async function apiRequest<T>(
         throw new Error(typeof errorMessage === 'string' ? errorMessage : JSON.stringify(errorMessage));
     }
 
+    return response;
+}
+
+async function apiRequest<T>(
+    endpoint: string,
+    options: RequestInit = {},
+    requireAuth: boolean = false
+): Promise<T> {
+    const response = await apiFetch(endpoint, options, requireAuth);
     return response.json();
 }
 
@@ -96,6 +106,24 @@ export async function apiGet<T>(
 }
 
 
+export interface Page<T> {
+    items: T[];
+    nextCursor: string | null;
+}
+
+/**
+ * GET de un endpoint paginado por cursor: devuelve la página y el cursor de la
+ * siguiente (cabecera X-Next-Cursor, null en la última).
+ */
+export async function apiGetPage<T>(
+    endpoint: string,
+    requireAuth: boolean = false
+): Promise<Page<T>> {
+    const response = await apiFetch(endpoint, { method: 'GET' }, requireAuth);
+    return { items: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') };
+}
+
+
 export async function apiPost<T>(
     endpoint: string,
     data: any,
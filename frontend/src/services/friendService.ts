@@ -3,6 +3,7 @@ import { Friendship } from '../types/friendship'
 import { AccountWithBalance } from '../types/account'
 import { PerformanceResponse } from '../types/performance'
 import { PortfolioHistoryResponse } from '../types/history_chart'
+import { CHART_MAX_POINTS } from './historyService'
 import { AssetTableRow } from '../types/asset'
 
 export async function getFriends(): Promise<Friendship[]> {
@@ -40,5 +41,5 @@ export async function getFriendPerformance(friendId: number): Promise<Performanc
 }
 
 export async function getFriendHistory(friendId: number): Promise<PortfolioHistoryResponse> {
-  return apiGet<PortfolioHistoryResponse>(`/friends/${friendId}/portfolio/history`, true)
+  return apiGet<PortfolioHistoryResponse>(`/friends/${friendId}/portfolio/history?max_points=${CHART_MAX_POINTS}`, true)
 }
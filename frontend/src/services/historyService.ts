@@ -1,13 +1,61 @@
 import { apiGet } from './api'
-import { PortfolioHistoryResponse } from '../types/history_chart'
+import { GrowthResolution, PortfolioHistoryResponse, PortfolioPoint } from '../types/history_chart'
+
+// Puntos de sobra para el ancho del gráfico. Los gráficos propios piden la serie sin
+// max_points (para poder pedir solo el delta) y pasan a semanas/meses si la diaria lo supera;
+// las carteras de amigos la piden ya reducida
+export const CHART_MAX_POINTS = 500
+
+const RESOLUTIONS: GrowthResolution[] = ['day', 'week', 'month']
+
+interface CachedSeries {
+  resolution: GrowthResolution
+  history: PortfolioPoint[]
+  version: number | null
+}
+
+// Última serie recibida por gráfico (en memoria: logout recarga la página y la vacía)
+const seriesCache = new Map<string, CachedSeries>()
+
+/**
+ * Serie completa del endpoint, pidiendo solo los puntos cambiados desde la última vez
+ * (since + version) y empalmándolos en la copia local desde from_date.
+ */
+async function getGrowthSeries(cacheKey: string, endpoint: string): Promise<PortfolioHistoryResponse> {
+  const cached = seriesCache.get(cacheKey)
+  let resolution = cached?.resolution ?? 'day'
+  let history: PortfolioPoint[] = []
+
+  for (;;) {
+    const params = new URLSearchParams({ resolution })
+    const last = cached?.resolution === resolution ? cached.history[cached.history.length - 1] : undefined
+    if (last && cached?.version != null) {
+      params.set('since', last.date)
+      params.set('version', String(cached.version))
+    }
+    const data = await apiGet<PortfolioHistoryResponse>(`${endpoint}?${params}`, true)
+
+    if (last && data.reset === false && data.from_date) {
+      const fromDate = data.from_date
+      history = [...cached!.history.filter(p => p.date < fromDate), ...data.history]
+    } else {
+      history = data.history
+    }
+    seriesCache.set(cacheKey, { resolution, history, version: data.version ?? null })
+
+    const next = RESOLUTIONS[RESOLUTIONS.indexOf(resolution) + 1]
+    if (history.length <= CHART_MAX_POINTS || !next) break
+    resolution = next
+  }
+  return { history }
+}
 
 /**
  * Obtiene los puntos de datos para el gráfico de crecimiento del patrimonio
  */
 export async function getPortfolioGrowth(): Promise<PortfolioHistoryResponse> {
   try {
-    const data = await apiGet<PortfolioHistoryResponse>('/history_chart/growth', true)
-    return data
+    return await getGrowthSeries('all', '/history_chart/growth')
   } catch (error) {
     console.error('Error fetching portfolio growth:', error)
     throw error
@@ -15,15 +63,14 @@ export async function getPortfolioGrowth(): Promise<PortfolioHistoryResponse> {
 }
 
 
-/** 
+/**
  * Obtiene los puntos de datos para el gráfico de crecimiento de una cuenta específica
  */
 export async function getAccountGrowth(accountId: number): Promise<PortfolioHistoryResponse> {
   try {
-    const data = await apiGet<PortfolioHistoryResponse>(`/history_chart/growth/account/${accountId}`, true)
-    return data
+    return await getGrowthSeries(`account_${accountId}`, `/history_chart/growth/account/${accountId}`)
   } catch (error) {
     console.error('Error fetching account growth:', error);
     throw error;
   }
-};
\ No newline at end of file
+};
@@ -1,13 +1,34 @@
-import { apiGet, apiPost } from './api';
+import { apiGetPage, apiPost, Page } from './api';
 import { Transaction, TransactionCreate } from '../types/transaction';
 
+export const PAGE_SIZE = 100;
+
+// Filtros que aplica el servidor (GET /transactions/me)
+export interface TransactionFilters {
+  accountId?: number;
+  category?: string;
+  type?: 'income' | 'expense';
+  dateFrom?: string; // AAAA-MM-DD, incluido
+  dateTo?: string;   // AAAA-MM-DD, incluido
+}
+
 /**
- * Obtiene todas las transacciones del usuario actual
+ * Obtiene una página de transacciones del usuario actual (más recientes primero).
+ * Para la siguiente se pasa el nextCursor de la anterior con los mismos filtros.
  */
-export async function getTransactions(): Promise<Transaction[]> {
+export async function getTransactionsPage(
+  filters: TransactionFilters = {},
+  cursor: string | null = null
+): Promise<Page<Transaction>> {
+  const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+  if (filters.accountId !== undefined) params.set('account_id', String(filters.accountId));
+  if (filters.category) params.set('category', filters.category);
+  if (filters.type) params.set('type', filters.type);
+  if (filters.dateFrom) params.set('date_from', filters.dateFrom);
+  if (filters.dateTo) params.set('date_to', filters.dateTo);
+  if (cursor) params.set('cursor', cursor);
   try {
-    const data = await apiGet<Transaction[]>('/transactions/me', true);
-    return data;
+    return await apiGetPage<Transaction>(`/transactions/me?${params}`, true);
   } catch (error) {
     console.error('Error fetching transactions:', error);
     throw error;
@@ -4,8 +4,15 @@ export interface PortfolioPoint {
   capital_invertido: string;
 }
 
+export type GrowthResolution = 'day' | 'week' | 'month';
+
 export interface PortfolioHistoryResponse {
   history: PortfolioPoint[];
+  // Delta (?since=&version=): versión de datos de la serie y, si reset es false, desde qué
+  // fecha sustituir la copia local por history
+  version?: number | null;
+  reset?: boolean;
+  from_date?: string | null;
 }
 
 export interface ChartDataPoint {
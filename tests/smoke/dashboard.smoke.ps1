@@ -0,0 +1,63 @@
+Set-StrictMode -Version Latest
+$ErrorActionPreference = 'Stop'
+
+$baseUri = if ($env:SPROUT_API_URL) { $env:SPROUT_API_URL } else { 'https://sprout-backend-production-3aff.up.railway.app/api/v1' }
+$registerUri = "$baseUri/auth/register"
+
+try {
+    $seed = Get-Date -Format 'yyyyMMddHHmmssfff'
+    $email = "smoke-dash-$seed@example.com"
+    $password = "SmokeTest123!$seed"
+
+    $registerBody = @{
+        email = $email
+        password = $password
+    } | ConvertTo-Json
+
+    $session = New-Object Microsoft.PowerShell.Commands.WebRequestSession
+    $r = Invoke-WebRequest -Uri $registerUri -Method POST -ContentType 'application/json' `
+        -Body $registerBody -WebSession $session -UseBasicParsing
+    $json = $r.Content | ConvertFrom-Json
+    if (-not $json.csrf_token) {
+        throw 'Register endpoint did not return csrf_token.'
+    }
+    $headers = @{ 'X-CSRF-Token' = $json.csrf_token }
+
+    # All sections by default
+    $r2 = Invoke-WebRequest -Uri "$baseUri/portfolio/dashboard?group_by=type" -Method GET -Headers $headers `
+        -WebSession $session -UseBasicParsing
+    $dashboard = $r2.Content | ConvertFrom-Json
+    foreach ($section in @('accounts', 'assets', 'allocation', 'performance', 'growth')) {
+        if (-not ($dashboard.PSObject.Properties.Name -contains $section)) {
+            throw "Dashboard is missing section '$section'."
+        }
+    }
+
+    # Only the requested sections come back
+    $r3 = Invoke-WebRequest -Uri "$baseUri/portfolio/dashboard?sections=accounts,performance" -Method GET -Headers $headers `
+        -WebSession $session -UseBasicParsing
+    $partial = $r3.Content | ConvertFrom-Json
+    $names = @($partial.PSObject.Properties.Name)
+    if ($names.Count -ne 2 -or -not ($names -contains 'accounts') -or -not ($names -contains 'performance')) {
+        throw ("Expected only accounts and performance, got: {0}" -f ($names -join ', '))
+    }
+
+    # Unknown sections are rejected
+    $status = $null
+    try {
+        Invoke-WebRequest -Uri "$baseUri/portfolio/dashboard?sections=nope" -Method GET -Headers $headers `
+            -WebSession $session -UseBasicParsing | Out-Null
+    } catch {
+        $status = $_.Exception.Response.StatusCode.value__
+    }
+    if ($status -ne 400) {
+        throw "Unknown section: expected 400, got $status"
+    }
+
+    Write-Host '[SMOKE] dashboard passed.' -ForegroundColor Green
+    exit 0
+}
+catch {
+    Write-Host ("[SMOKE] dashboard failed: {0}" -f $_.Exception.Message) -ForegroundColor Red
+    exit 1
+}
@@ -0,0 +1,63 @@
+Set-StrictMode -Version Latest
+$ErrorActionPreference = 'Stop'
+
+$baseUri = if ($env:SPROUT_API_URL) { $env:SPROUT_API_URL } else { 'https://sprout-backend-production-3aff.up.railway.app/api/v1' }
+
+try {
+    $seed = Get-Date -Format 'yyyyMMddHHmmssfff'
+    $session = New-Object Microsoft.PowerShell.Commands.WebRequestSession
+
+    $registerBody = @{ email = "smoke-etag-$seed@example.com"; password = "SmokeTest123!$seed" } | ConvertTo-Json
+    $r = Invoke-WebRequest -Uri "$baseUri/auth/register" -Method POST -ContentType 'application/json' `
+        -Body $registerBody -WebSession $session -UseBasicParsing
+    $json = $r.Content | ConvertFrom-Json
+    if (-not $json.csrf_token) {
+        throw 'Register endpoint did not return csrf_token.'
+    }
+    $headers = @{ 'X-CSRF-Token' = $json.csrf_token }
+
+    function Get-Status([string]$path, [string]$etag) {
+        try {
+            $resp = Invoke-WebRequest -Uri "$baseUri$path" -Method GET -Headers ($headers + @{ 'If-None-Match' = $etag }) `
+                -WebSession $session -UseBasicParsing
+            return [int]$resp.StatusCode
+        } catch {
+            if ($_.Exception.Response) { return [int]$_.Exception.Response.StatusCode }
+            throw
+        }
+    }
+
+    $paths = @('/portfolio/accounts', '/history_chart/growth', '/trades/history', '/assets/with-prices')
+    $etags = @{}
+    foreach ($path in $paths) {
+        $resp = Invoke-WebRequest -Uri "$baseUri$path" -Method GET -Headers $headers -WebSession $session -UseBasicParsing
+        $etags[$path] = $resp.Headers['ETag']
+        if (-not $etags[$path]) {
+            throw "$path did not return an ETag."
+        }
+    }
+
+    # Same version -> 304 without body
+    foreach ($path in $paths) {
+        $status = Get-Status $path $etags[$path]
+        if ($status -ne 304) {
+            throw "$path with If-None-Match: expected 304, got $status"
+        }
+    }
+
+    # A write bumps the user's data version -> 200 with a new ETag
+    $null = Invoke-WebRequest -Uri "$baseUri/accounts/create" -Method POST -ContentType 'application/json' `
+        -Body (@{ name = "SmokeEtag_$seed"; type = 'bank'; currency = 'EUR' } | ConvertTo-Json) `
+        -Headers $headers -WebSession $session -UseBasicParsing
+    $status = Get-Status '/portfolio/accounts' $etags['/portfolio/accounts']
+    if ($status -ne 200) {
+        throw "/portfolio/accounts after creating an account: expected 200, got $status"
+    }
+
+    Write-Host '[SMOKE] etag passed.' -ForegroundColor Green
+    exit 0
+}
+catch {
+    Write-Host ("[SMOKE] etag failed: {0}" -f $_.Exception.Message) -ForegroundColor Red
+    exit 1
+}
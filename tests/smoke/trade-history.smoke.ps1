@@ -0,0 +1,78 @@
+Set-StrictMode -Version Latest
+$ErrorActionPreference = 'Stop'
+
+$baseUri = if ($env:SPROUT_API_URL) { $env:SPROUT_API_URL } else { 'https://sprout-backend-production-3aff.up.railway.app/api/v1' }
+
+try {
+    $seed = Get-Date -Format 'yyyyMMddHHmmssfff'
+    $session = New-Object Microsoft.PowerShell.Commands.WebRequestSession
+
+    $registerBody = @{ email = "smoke-history-$seed@example.com"; password = "SmokeTest123!$seed" } | ConvertTo-Json
+    $r = Invoke-WebRequest -Uri "$baseUri/auth/register" -Method POST -ContentType 'application/json' `
+        -Body $registerBody -WebSession $session -UseBasicParsing
+    $json = $r.Content | ConvertFrom-Json
+    if (-not $json.csrf_token) {
+        throw 'Register endpoint did not return csrf_token.'
+    }
+    $headers = @{ 'X-CSRF-Token' = $json.csrf_token }
+
+    function Post-Json([string]$path, $body) {
+        $resp = Invoke-WebRequest -Uri "$baseUri$path" -Method POST -ContentType 'application/json' `
+            -Body ($body | ConvertTo-Json) -Headers $headers -WebSession $session -UseBasicParsing
+        return $resp.Content | ConvertFrom-Json
+    }
+
+    $account = Post-Json '/accounts/create' @{ name = "SmokeHist_$seed"; type = 'broker'; currency = 'EUR' }
+    $asset = Post-Json '/assets/create' @{ name = "SmokeHistAsset_$seed"; ticker = "SMHI$seed"; currency = 'EUR'; type = 'etf' }
+    $null = Post-Json '/transactions/create' @{ account_id = $account.account_id; amount = 10000; type = 'income'; category = 'Depósito'; date = '2025-01-01' }
+    foreach ($day in @('2025-02-01', '2025-03-01', '2025-04-01')) {
+        $null = Post-Json '/trades/create' @{ asset_id = $asset.asset_id; account_id = $account.account_id; date = $day; quantity = 1; price = 10; operation_type = 'buy' }
+    }
+
+    # First page: 2 newest trades and a cursor for the rest
+    $p1 = Invoke-WebRequest -Uri "$baseUri/trades/history?limit=2" -Method GET -Headers $headers -WebSession $session -UseBasicParsing
+    $page1 = @($p1.Content | ConvertFrom-Json)
+    $cursor = $p1.Headers['X-Next-Cursor']
+    if ($page1.Count -ne 2 -or -not $cursor) {
+        throw "First page: expected 2 trades and X-Next-Cursor, got $($page1.Count) trades, cursor '$cursor'"
+    }
+
+    # Second page: the oldest trade and no further cursor
+    $p2 = Invoke-WebRequest -Uri "$baseUri/trades/history?limit=2&cursor=$cursor" -Method GET -Headers $headers -WebSession $session -UseBasicParsing
+    $page2 = @($p2.Content | ConvertFrom-Json)
+    if ($page2.Count -ne 1 -or $p2.Headers['X-Next-Cursor']) {
+        throw "Second page: expected 1 trade and no cursor, got $($page2.Count)"
+    }
+    if (-not ([datetime]$page2[0].date -lt [datetime]$page1[1].date)) {
+        throw 'Pages are not ordered newest first.'
+    }
+
+    # Filters
+    $sells = @(Invoke-RestMethod -Uri "$baseUri/trades/history?operation_type=sell" -Method GET -Headers $headers -WebSession $session)
+    if ($sells.Count -ne 0) {
+        throw "operation_type=sell: expected 0 trades, got $($sells.Count)"
+    }
+    $march = @(Invoke-RestMethod -Uri "$baseUri/trades/history?date_from=2025-03-01&date_to=2025-03-31" -Method GET -Headers $headers -WebSession $session)
+    if ($march.Count -ne 1) {
+        throw "date range: expected 1 trade, got $($march.Count)"
+    }
+
+    # Invalid cursors are rejected
+    $status = $null
+    try {
+        Invoke-WebRequest -Uri "$baseUri/trades/history?cursor=not-a-cursor" -Method GET -Headers $headers `
+            -WebSession $session -UseBasicParsing | Out-Null
+    } catch {
+        $status = $_.Exception.Response.StatusCode.value__
+    }
+    if ($status -ne 400) {
+        throw "Invalid cursor: expected 400, got $status"
+    }
+
+    Write-Host '[SMOKE] trade-history passed.' -ForegroundColor Green
+    exit 0
+}
+catch {
+    Write-Host ("[SMOKE] trade-history failed: {0}" -f $_.Exception.Message) -ForegroundColor Red
+    exit 1
+}
@@ -0,0 +1,83 @@
+Set-StrictMode -Version Latest
+$ErrorActionPreference = 'Stop'
+
+$baseUri = if ($env:SPROUT_API_URL) { $env:SPROUT_API_URL } else { 'https://sprout-backend-production-3aff.up.railway.app/api/v1' }
+
+try {
+    $seed = Get-Date -Format 'yyyyMMddHHmmssfff'
+    $session = New-Object Microsoft.PowerShell.Commands.WebRequestSession
+
+    $registerBody = @{ email = "smoke-txlist-$seed@example.com"; password = "SmokeTest123!$seed" } | ConvertTo-Json
+    $r = Invoke-WebRequest -Uri "$baseUri/auth/register" -Method POST -ContentType 'application/json' `
+        -Body $registerBody -WebSession $session -UseBasicParsing
+    $json = $r.Content | ConvertFrom-Json
+    if (-not $json.csrf_token) {
+        throw 'Register endpoint did not return csrf_token.'
+    }
+    $headers = @{ 'X-CSRF-Token' = $json.csrf_token }
+
+    function Post-Json([string]$path, $body) {
+        $resp = Invoke-WebRequest -Uri "$baseUri$path" -Method POST -ContentType 'application/json' `
+            -Body ($body | ConvertTo-Json) -Headers $headers -WebSession $session -UseBasicParsing
+        return $resp.Content | ConvertFrom-Json
+    }
+
+    $account = Post-Json '/accounts/create' @{ name = "SmokeTx_$seed"; type = 'bank'; currency = 'EUR' }
+    $null = Post-Json '/transactions/create' @{ account_id = $account.account_id; amount = 1000; type = 'income'; category = 'Nómina'; date = '2025-01-01' }
+    $null = Post-Json '/transactions/create' @{ account_id = $account.account_id; amount = 50; type = 'expense'; category = 'Ocio'; date = '2025-02-01' }
+    $null = Post-Json '/transactions/create' @{ account_id = $account.account_id; amount = 20; type = 'expense'; category = 'Comida'; date = '2025-03-01' }
+
+    # First page: 2 newest transactions and a cursor for the rest
+    $p1 = Invoke-WebRequest -Uri "$baseUri/transactions/me?limit=2" -Method GET -Headers $headers -WebSession $session -UseBasicParsing
+    $page1 = @($p1.Content | ConvertFrom-Json)
+    $cursor = $p1.Headers['X-Next-Cursor']
+    if ($page1.Count -ne 2 -or -not $cursor) {
+        throw "First page: expected 2 transactions and X-Next-Cursor, got $($page1.Count), cursor '$cursor'"
+    }
+
+    # Second page: the oldest transaction and no further cursor
+    $p2 = Invoke-WebRequest -Uri "$baseUri/transactions/me?limit=2&cursor=$cursor" -Method GET -Headers $headers -WebSession $session -UseBasicParsing
+    $page2 = @($p2.Content | ConvertFrom-Json)
+    if ($page2.Count -ne 1 -or $p2.Headers['X-Next-Cursor'] -or $page2[0].category -ne 'Nómina') {
+        throw "Second page: expected the 'Nómina' income and no cursor, got $($page2.Count)"
+    }
+
+    # Filters
+    $expenses = @(Invoke-RestMethod -Uri "$baseUri/transactions/me?type=expense" -Method GET -Headers $headers -WebSession $session)
+    if ($expenses.Count -ne 2) {
+        throw "type=expense: expected 2 transactions, got $($expenses.Count)"
+    }
+    $feb = @(Invoke-RestMethod -Uri "$baseUri/transactions/me?date_from=2025-02-01&date_to=2025-02-28&category=Ocio" -Method GET -Headers $headers -WebSession $session)
+    if ($feb.Count -ne 1) {
+        throw "date range + category: expected 1 transaction, got $($feb.Count)"
+    }
+
+    # NDJSON stream: every transaction, one JSON object per line, newest first
+    $s = Invoke-WebRequest -Uri "$baseUri/transactions/me?format=ndjson" -Method GET -Headers $headers -WebSession $session -UseBasicParsing
+    $lines = @(($s.Content -split "`n") | Where-Object { $_ } | ForEach-Object { $_ | ConvertFrom-Json })
+    if ($s.Headers['Content-Type'] -notlike 'application/x-ndjson*' -or $lines.Count -ne 3) {
+        throw "NDJSON: expected 3 lines of application/x-ndjson, got $($lines.Count) ($($s.Headers['Content-Type']))"
+    }
+    if ($lines[0].transaction_id -ne $page1[0].transaction_id) {
+        throw 'NDJSON stream is not ordered like the paginated listing.'
+    }
+
+    # Invalid cursors are rejected
+    $status = $null
+    try {
+        Invoke-WebRequest -Uri "$baseUri/transactions/me?cursor=not-a-cursor" -Method GET -Headers $headers `
+            -WebSession $session -UseBasicParsing | Out-Null
+    } catch {
+        $status = $_.Exception.Response.StatusCode.value__
+    }
+    if ($status -ne 400) {
+        throw "Invalid cursor: expected 400, got $status"
+    }
+
+    Write-Host '[SMOKE] transactions-list passed.' -ForegroundColor Green
+    exit 0
+}
+catch {
+    Write-Host ("[SMOKE] transactions-list failed: {0}" -f $_.Exception.Message) -ForegroundColor Red
+    exit 1
+}
@@ -2,13 +2,14 @@ import yfinance as yf
 import psycopg2
 import os
 import sys
-import math
 import time
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import pytz
 from urllib.parse import urlparse
 import argparse
+from price_events import publish_price_updates
+from price_ingest import frame_to_rows, ingest_prices
 
 load_dotenv()
 
@@ -36,56 +37,6 @@ def connect_db():
             port=int(os.getenv("DB_PORT", "5432"))
         )
 
-def consolidate_history():
-    """
-    Elimina duplicados intraday de días anteriores, dejando solo
-    el último precio de cada día por activo.
-    """
-    print("\n🧹 Consolidando histórico...")
-    conn = None
-    try:
-        conn = connect_db()
-        cur = conn.cursor()
-
-        cur.execute("""
-            DELETE FROM price_history
-            WHERE price_id NOT IN (
-                SELECT DISTINCT ON (asset_id, date::date) price_id
-                FROM price_history
-                ORDER BY asset_id, date::date, date DESC
-            )
-            AND date::date < CURRENT_DATE;
-        """)
-
-        affected_rows = cur.rowcount
-        conn.commit()
-        print(f"  Filas eliminadas: {affected_rows}")
-
-        cur.execute("""
-            SELECT
-                a.ticker,
-                COUNT(ph.price_id) as total,
-                MIN(ph.date)::date as desde,
-                MAX(ph.date)::date as hasta
-            FROM assets a
-            LEFT JOIN price_history ph ON a.asset_id = ph.asset_id
-            WHERE a.is_active = TRUE
-            GROUP BY a.asset_id, a.ticker
-            ORDER BY a.ticker
-        """)
-
-        for ticker, total, first, last in cur.fetchall():
-            print(f"    {ticker}: {total} registros ({first} → {last})")
-
-        cur.close()
-    except Exception as e:
-        print(f"Error consolidando: {e}")
-        if conn:
-            conn.rollback()
-    finally:
-        if conn:
-            conn.close()
-
 def backfill_prices(target_asset_id=None, target_ticker=None, custom_start_date=None, default_days=365):
     print("=== Iniciando proceso de backfill ===")
     conn = None
@@ -121,6 +72,7 @@ def backfill_prices(target_asset_id=None, target_ticker=None, custom_start_date=
             return
 
         print(f"Se procesarán {len(assets)} activo(s).")
+        written = {}
         
         for asset_id, ticker, isin, min_op_date in assets:
             identifier = ticker if ticker else isin
@@ -154,29 +106,14 @@ def backfill_prices(target_asset_id=None, target_ticker=None, custom_start_date=
 
                 print(f"  -> Recibidos {len(data)} registros de precios de cierre.")
                 
-                from datetime import timezone
-                records = []
-                for date_index, row in data.iterrows():
-                    price_val = float(row['Close'])
-                    if math.isnan(price_val) or math.isinf(price_val) or price_val <= 0:
-                        continue
-                    
-                    price_date = date_index.to_pydatetime()
-                    if price_date.tzinfo is None:
-                        price_date = price_date.replace(tzinfo=timezone.utc)
-                    else:
-                        price_date = price_date.astimezone(timezone.utc)
-                    records.append((asset_id, price_date, price_val))
+                # Filtrado vectorizado (NaN, inf, <= 0) y fechas en UTC
+                records = frame_to_rows(asset_id, data)
 
                 if records:
-                    # Insertar en base de datos en lote
-                    cur.executemany("""
-                        INSERT INTO price_history (asset_id, date, price)
-                        VALUES (%s, %s, %s)
-                        ON CONFLICT (asset_id, date)
-                        DO UPDATE SET price = EXCLUDED.price
-                    """, records)
+                    # COPY a staging + un único upsert
+                    ingest_prices(conn, records)
                     conn.commit()
+                    written[asset_id] = min(r[1] for r in records)
                     print(f"  ✅ Guardados {len(records)} registros en base de datos.")
                 
             except Exception as e:
@@ -187,6 +124,9 @@ def backfill_prices(target_asset_id=None, target_ticker=None, custom_start_date=
             # Evitar saturar Yahoo Finance (antiban IP)
             time.sleep(1.5)
 
+        # Serie diaria y caché del backend de los activos actualizados
+        publish_price_updates(conn, written)
+
         cur.close()
     except Exception as e:
         print(f"Error de base de datos general: {e}")
@@ -218,5 +158,4 @@ if __name__ == "__main__":
         default_days=args.days
     )
 
-    consolidate_history()
     print("\n✅ Proceso de Backfill completado.")
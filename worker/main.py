@@ -4,10 +4,11 @@ Worker de actualización diaria de precios.
 Diseñado para ejecutarse UNA VEZ al día (tras el cierre de mercados)
 mediante un cron job externo (Supabase pg_cron, GitHub Actions, etc.).
 
-Obtiene precios de cierre de Yahoo Finance y consolida el histórico.
+Obtiene precios de cierre (Yahoo Finance, en lotes concurrentes) y pide al backend que
+precaliente la caché de los usuarios activos. price_history guarda un precio por activo y
+día (upsert sobre trade_date), así que no hay duplicados intradía que consolidar.
 """
 
-import yfinance as yf
 import psycopg2
 import os
 import sys
@@ -15,6 +16,9 @@ from datetime import datetime
 from dotenv import load_dotenv
 import pytz
 from urllib.parse import urlparse
+from price_events import publish_price_updates, request_cache_warmup
+from quotes import get_provider, fetch_quotes
+from price_ingest import ingest_prices
 load_dotenv()
 
 
@@ -44,29 +48,14 @@ def connect_db():
         )
 
 
-def try_get_data(ticker):
-    """Obtiene precio de cierre de Yahoo Finance usando el ticker tal cual.
-    El ticker ya debe incluir el sufijo de bolsa si es necesario (ej: NXT.MC, VUSA.L)."""
-    import math
-    try:
-        asset = yf.Ticker(ticker)
-        data = asset.history(period="5d")
-
-        if not data.empty:
-            last_price = float(data['Close'].iloc[-1])
-            if math.isnan(last_price) or math.isinf(last_price) or last_price <= 0:
-                return None, None, None
-            price_date = data.index[-1].to_pydatetime()
-            return last_price, price_date, ticker
-    except Exception:
-        pass
-    return None, None, None
-
-
 def fetch_closing_prices():
     """
     Obtiene los precios de cierre de todos los activos activos.
     Pensado para ejecutarse después del cierre de mercados (US cierra 22:00 Madrid).
+
+    1. Lee los activos y suelta la conexión.
+    2. Descarga las cotizaciones en lotes concurrentes (quotes.fetch_quotes).
+    3. Guarda cada lote con un upsert masivo (price_ingest) y avisa al backend de los activos actualizados.
     """
     madrid_tz = get_madrid_tz()
     now = datetime.now(madrid_tz)
@@ -76,10 +65,10 @@ def fetch_closing_prices():
     conn = None
     updated = 0
     errors = 0
+    written = {}
     try:
         conn = connect_db()
         cur = conn.cursor()
-
         cur.execute("""
             SELECT asset_id, ticker, isin, type FROM assets
             WHERE is_active = TRUE
@@ -87,35 +76,52 @@ def fetch_closing_prices():
               AND ticker NOT LIKE 'TST%%'
         """)
         assets = cur.fetchall()
-        problem_assets = []
+        cur.close()
+        conn.close()
+        conn = None
 
+        # Un mismo identificador puede corresponder a varios activos
+        by_identifier = {}
         for asset_id, ticker, isin, asset_type in assets:
             identifier = isin if isin else ticker
-            if not identifier:
-                continue
-
-            print(f"  {identifier}...", end=" ")
-            price, date, final_ticker = try_get_data(identifier)
+            if identifier:
+                by_identifier.setdefault(identifier, []).append((asset_id, ticker, isin, asset_type))
+
+        provider = get_provider()
+        print(f"Fuente: {provider.name} · {len(by_identifier)} identificadores")
+
+        batches = []
+        for batch, quotes in fetch_quotes(list(by_identifier), provider):
+            rows = [
+                (asset_id, quotes[identifier][1], quotes[identifier][0])
+                for identifier in batch if identifier in quotes
+                for asset_id, *_ in by_identifier[identifier]
+            ]
+            print(f"  Lote de {len(batch)}: {len(quotes)} cotizaciones")
+            batches.append((batch, quotes, rows))
 
-            if price:
+        problem_assets = []
+        conn = connect_db()
+        cur = conn.cursor()
+        for batch, quotes, rows in batches:
+            if rows:
                 try:
-                    cur.execute("""
-                        INSERT INTO price_history (asset_id, date, price)
-                        VALUES (%s, %s, %s)
-                        ON CONFLICT (asset_id, date)
-                        DO UPDATE SET price = EXCLUDED.price
-                    """, (asset_id, date, price))
+                    ingest_prices(conn, rows)
                     conn.commit()
-                    print(f"OK {final_ticker} -> {price:.4f}")
-                    updated += 1
+                    updated += len(rows)
+                    for asset_id, date, _ in rows:
+                        written[asset_id] = date
                 except Exception as e:
                     conn.rollback()
-                    print(f"Error DB: {e}")
-                    errors += 1
-            else:
-                print("No encontrado")
-                problem_assets.append((ticker, isin, asset_type))
-                errors += 1
+                    print(f"Error DB guardando lote: {e}")
+                    errors += len(rows)
+            for identifier in batch:
+                if identifier not in quotes:
+                    problem_assets.extend((ticker, isin, asset_type) for _, ticker, isin, asset_type in by_identifier[identifier])
+                    errors += len(by_identifier[identifier])
+
+        # Serie diaria y caché del backend de los activos actualizados
+        publish_price_updates(conn, written)
 
         if problem_assets:
             print("\n⚠️ Activos no encontrados:")
@@ -134,52 +140,15 @@ def fetch_closing_prices():
     return errors
 
 
-def consolidate_history():
-    """
-    Elimina duplicados intraday de días anteriores, dejando solo
-    el último precio de cada día por activo.
-    """
-    print("\n🧹 Consolidando histórico...")
+def warm_cache():
+    """Precalentado de las vistas de los usuarios activos con los precios nuevos (lo hace el backend)."""
+    print("\n🔥 Precalentando caché...")
     conn = None
     try:
         conn = connect_db()
-        cur = conn.cursor()
-
-        cur.execute("""
-            DELETE FROM price_history
-            WHERE price_id NOT IN (
-                SELECT DISTINCT ON (asset_id, date::date) price_id
-                FROM price_history
-                ORDER BY asset_id, date::date, date DESC
-            )
-            AND date::date < CURRENT_DATE;
-        """)
-
-        affected_rows = cur.rowcount
-        conn.commit()
-        print(f"  Filas eliminadas: {affected_rows}")
-
-        cur.execute("""
-            SELECT
-                a.ticker,
-                COUNT(ph.price_id) as total,
-                MIN(ph.date)::date as desde,
-                MAX(ph.date)::date as hasta
-            FROM assets a
-            LEFT JOIN price_history ph ON a.asset_id = ph.asset_id
-            WHERE a.is_active = TRUE
-            GROUP BY a.asset_id, a.ticker
-            ORDER BY a.ticker
-        """)
-
-        for ticker, total, first, last in cur.fetchall():
-            print(f"    {ticker}: {total} registros ({first} → {last})")
-
-        cur.close()
+        request_cache_warmup(conn)
     except Exception as e:
-        print(f"Error consolidando: {e}")
-        if conn:
-            conn.rollback()
+        print(f"Error de conexión: {e}")
     finally:
         if conn:
             conn.close()
@@ -191,7 +160,7 @@ if __name__ == "__main__":
     print("=" * 50)
 
     errors = fetch_closing_prices()
-    consolidate_history()
+    warm_cache()
 
     print("\n✅ Worker finalizado.")
     # Exit 0 always — unfound tickers are warnings, not failures.
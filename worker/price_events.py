@@ -0,0 +1,131 @@
+"""
+Aviso de precios nuevos al backend.
+
+Tras guardar precios:
+  1. Borra las filas de portfolio_daily_snapshot desde el día del precio más antiguo
+     escrito, en las cuentas que han operado el activo. El backend las recalcula
+     (solo la cola) en la siguiente lectura.
+  2. Apunta el cambio en series_changes y sube users.data_version de los dueños de esas
+     cuentas (lo mismo que app/services/series_changes.py), para que el delta de
+     /history_chart/growth incluya esos días. Purga el registro de más de SERIES_CHANGES_DAYS.
+  3. Envía NOTIFY price_updates con los ids de activo para que el backend invalide
+     en caché las vistas que contienen esos activos.
+
+Al terminar la ejecución, request_cache_warmup() pide al backend que precaliente las
+vistas de los usuarios activos (NOTIFY cache_warmup) y espera su resumen.
+"""
+
+import json
+import os
+import select
+import time
+
+PRICE_CHANNEL = "price_updates"
+WARMUP_CHANNEL = "cache_warmup"
+WARMUP_DONE_CHANNEL = "cache_warmup_done"
+# Segundos que el worker espera el resumen del precalentado (0 = no esperar)
+WARMUP_WAIT = int(os.getenv("CACHE_WARMUP_WAIT", "300"))
+# El payload de NOTIFY tiene un límite de 8000 bytes
+MAX_PAYLOAD = 7000
+# Días que se conserva series_changes (un cliente con una versión más antigua recibe la serie completa)
+SERIES_CHANGES_DAYS = 30
+
+
+def publish_price_updates(conn, updates):
+    """
+    updates: {asset_id: fecha (datetime) del precio más antiguo escrito}.
+    Hace commit en la conexión recibida.
+    """
+    if not updates:
+        return
+
+    asset_ids = list(updates)
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            DELETE FROM portfolio_daily_snapshot s
+            USING (
+                SELECT o.account_id, MIN(u.from_date::date) AS from_day
+                FROM unnest(%s::int[], %s::timestamptz[]) AS u(asset_id, from_date)
+                JOIN operations o ON o.asset_id = u.asset_id
+                GROUP BY o.account_id
+            ) d
+            WHERE s.account_id = d.account_id AND s.day >= d.from_day
+        """, (asset_ids, [updates[a] for a in asset_ids]))
+        stale_rows = cur.rowcount
+
+        cur.execute("""
+            WITH d AS (
+                SELECT o.account_id, MIN(u.from_date::date) AS from_day
+                FROM unnest(%s::int[], %s::timestamptz[]) AS u(asset_id, from_date)
+                JOIN operations o ON o.asset_id = u.asset_id
+                GROUP BY o.account_id
+            ),
+            bumped AS (
+                UPDATE users u
+                SET data_version = u.data_version + 1
+                FROM (SELECT DISTINCT ac.user_id FROM accounts ac JOIN d ON d.account_id = ac.account_id) x
+                WHERE u.user_id = x.user_id
+                RETURNING u.user_id, u.data_version
+            )
+            INSERT INTO series_changes (user_id, version, account_id, from_day)
+            SELECT b.user_id, b.data_version, d.account_id, d.from_day
+            FROM d
+            JOIN accounts ac ON ac.account_id = d.account_id
+            JOIN bumped b ON b.user_id = ac.user_id
+        """, (asset_ids, [updates[a] for a in asset_ids]))
+        changed_accounts = cur.rowcount
+        cur.execute(
+            "DELETE FROM series_changes WHERE changed_at < NOW() - make_interval(days => %s)",
+            (SERIES_CHANGES_DAYS,)
+        )
+
+        chunk = []
+        for asset_id in asset_ids:
+            chunk.append(str(asset_id))
+            if sum(len(c) + 1 for c in chunk) > MAX_PAYLOAD:
+                cur.execute("SELECT pg_notify(%s, %s)", (PRICE_CHANNEL, ",".join(chunk)))
+                chunk = []
+        if chunk:
+            cur.execute("SELECT pg_notify(%s, %s)", (PRICE_CHANNEL, ",".join(chunk)))
+
+        conn.commit()
+        print(
+            f"  Aviso de precios: {len(asset_ids)} activos, {stale_rows} filas de serie diaria a recalcular "
+            f"en {changed_accounts} cuentas"
+        )
+    except Exception as e:
+        conn.rollback()
+        print(f"  Error avisando de precios nuevos: {e}")
+    finally:
+        cur.close()
+
+
+def request_cache_warmup(conn):
+    """
+    Pide el precalentado y espera hasta WARMUP_WAIT segundos a que el backend conteste con
+    {users, failed, seconds}. Devuelve ese resumen o None (backend sin escuchar o tarda más).
+    """
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute(f"LISTEN {WARMUP_DONE_CHANNEL}")
+        cur.execute("SELECT pg_notify(%s, '')", (WARMUP_CHANNEL,))
+        print("  Precalentado de caché solicitado")
+        deadline = time.monotonic() + WARMUP_WAIT
+        while time.monotonic() < deadline:
+            if not select.select([conn], [], [], deadline - time.monotonic())[0]:
+                break
+            conn.poll()
+            if conn.notifies:
+                report = json.loads(conn.notifies.pop(0).payload)
+                print(f"  Precalentado: {report['users']} usuarios en {report['seconds']:.1f}s ({report['failed']} con error)")
+                return report
+        if WARMUP_WAIT:
+            print("  Precalentado: sin respuesta del backend")
+        return None
+    except Exception as e:
+        print(f"  Error pidiendo el precalentado: {e}")
+        return None
+    finally:
+        cur.close()
@@ -0,0 +1,79 @@
+"""
+Ingesta masiva de precios en price_history.
+
+- frame_to_rows: filtra de forma vectorizada un DataFrame de yfinance (NaN, inf, <= 0)
+  y normaliza las fechas a UTC.
+- ingest_prices: COPY a una tabla temporal de staging y un único INSERT ... SELECT
+  con ON CONFLICT para fusionar, en vez de un upsert por fila. price_history guarda un
+  precio por activo y día (trade_date, UTC): el upsert es sobre ese día y se queda la
+  cotización más reciente. Actualiza también asset_latest_price con el precio más
+  reciente de cada activo del lote.
+
+El backend tiene la misma lógica en backend/app/services/price_ingest.py (el worker y
+el backend se despliegan por separado y no comparten código).
+"""
+
+import csv
+import io
+import numpy as np
+
+
+def frame_to_rows(asset_id: int, data) -> list[tuple]:
+    """DataFrame con columna Close e índice de fechas -> [(asset_id, fecha UTC, precio), ...]."""
+    if data is None or data.empty:
+        return []
+    close = data["Close"].to_numpy(dtype=float)
+    mask = np.isfinite(close) & (close > 0)
+    index = data.index[mask]
+    index = index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+    return list(zip([asset_id] * int(mask.sum()), index.to_pydatetime(), close[mask].tolist()))
+
+
+def ingest_prices(conn, rows) -> int:
+    """
+    Upsert masivo de rows = [(asset_id, fecha, precio), ...]. No hace commit.
+    Devuelve las filas insertadas o actualizadas.
+    """
+    if not rows:
+        return 0
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for asset_id, date, price in rows:
+        writer.writerow((asset_id, date.isoformat(), repr(float(price))))
+    buffer.seek(0)
+
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS price_staging (
+                asset_id BIGINT NOT NULL,
+                date TIMESTAMPTZ NOT NULL,
+                price NUMERIC(15,6) NOT NULL
+            ) ON COMMIT DELETE ROWS
+        """)
+        cur.copy_expert("COPY price_staging (asset_id, date, price) FROM STDIN WITH (FORMAT csv)", buffer)
+        # DISTINCT ON: un mismo (activo, día) repetido en el lote no puede actualizarse dos veces
+        cur.execute("""
+            INSERT INTO price_history (asset_id, date, price)
+            SELECT DISTINCT ON (asset_id, (date AT TIME ZONE 'UTC')::date) asset_id, date, price
+            FROM price_staging
+            ORDER BY asset_id, (date AT TIME ZONE 'UTC')::date, date DESC
+            ON CONFLICT (asset_id, trade_date)
+            DO UPDATE SET date = EXCLUDED.date, price = EXCLUDED.price
+            WHERE EXCLUDED.date >= price_history.date
+        """)
+        merged = cur.rowcount
+        cur.execute("""
+            INSERT INTO asset_latest_price (asset_id, date, price)
+            SELECT DISTINCT ON (asset_id) asset_id, date, price
+            FROM price_staging
+            ORDER BY asset_id, date DESC
+            ON CONFLICT (asset_id) DO UPDATE
+            SET date = EXCLUDED.date, price = EXCLUDED.price, updated_at = NOW()
+            WHERE EXCLUDED.date >= asset_latest_price.date
+        """)
+        cur.execute("TRUNCATE price_staging")
+        return merged
+    finally:
+        cur.close()
@@ -0,0 +1,168 @@
+"""
+Etapa de obtención de cotizaciones del worker.
+
+Pide los precios de cierre en lotes (una petición multi-ticker por lote) y reparte
+los lotes en un pool de hilos acotado. Cada fuente de datos tiene su propio límite
+de peticiones por segundo, compartido por todos los hilos.
+
+Variables de entorno:
+    QUOTE_PROVIDER     yahoo (por defecto) | fake (precios deterministas, sin red)
+    QUOTE_BATCH_SIZE   identificadores por petición (por defecto 50)
+    QUOTE_CONCURRENCY  peticiones simultáneas (por defecto 4)
+    QUOTE_RATE_<FUENTE> peticiones por segundo de esa fuente, p.ej. QUOTE_RATE_YAHOO=1 (0 = sin límite)
+"""
+
+import hashlib
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+
+def is_valid_price(price) -> bool:
+    return price is not None and not math.isnan(price) and not math.isinf(price) and price > 0
+
+
+class RateLimiter:
+    """Limita las llamadas a `rate` por segundo entre todos los hilos (0 = sin límite)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class QuoteProvider:
+    """Fuente de cotizaciones: devuelve {identificador: (precio, fecha)} para un lote."""
+
+    name = "base"
+    default_rate = 0.0
+
+    def __init__(self, rate: float | None = None):
+        if rate is None:
+            rate = float(os.getenv(f"QUOTE_RATE_{self.name.upper()}", self.default_rate))
+        self.limiter = RateLimiter(rate)
+
+    def fetch(self, identifiers: list[str]) -> dict:
+        raise NotImplementedError
+
+
+class YahooQuoteProvider(QuoteProvider):
+    """Yahoo Finance vía yf.download (varios tickers/ISIN en una sola llamada)."""
+
+    name = "yahoo"
+    default_rate = 1.0
+
+    def fetch(self, identifiers: list[str]) -> dict:
+        import pandas as pd
+        import yfinance as yf
+
+        data = yf.download(
+            identifiers,
+            period="5d",
+            group_by="ticker",
+            auto_adjust=True,
+            ignore_tz=False,  # conserva el instante de cierre, igual que Ticker.history()
+            threads=False,    # la concurrencia la gestiona el pool de lotes
+            progress=False,
+        )
+        if data is None or data.empty:
+            return {}
+
+        quotes = {}
+        multi = isinstance(data.columns, pd.MultiIndex)
+        available = {str(c).upper(): c for c in data.columns.get_level_values(0)} if multi else {}
+        for identifier in identifiers:
+            if multi:
+                column = available.get(identifier.upper())
+                if column is None:
+                    continue
+                close = data[column]["Close"]
+            elif len(identifiers) == 1:
+                close = data["Close"]
+            else:
+                continue
+            close = close.dropna()
+            if close.empty:
+                continue
+            price = float(close.iloc[-1])
+            if is_valid_price(price):
+                quotes[identifier] = (price, close.index[-1].to_pydatetime())
+        return quotes
+
+
+class FakeQuoteProvider(QuoteProvider):
+    """Precios deterministas por identificador, sin red. Para probar el worker en local."""
+
+    name = "fake"
+    default_rate = 0.0
+
+    def __init__(self, rate: float | None = None, latency: float = 0.0, missing: set | None = None):
+        super().__init__(rate)
+        self.latency = latency
+        self.missing = missing or set()
+
+    def fetch(self, identifiers: list[str]) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        close = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+        quotes = {}
+        for identifier in identifiers:
+            if identifier in self.missing:
+                continue
+            seed = int(hashlib.sha1(identifier.encode()).hexdigest()[:8], 16)
+            quotes[identifier] = (round(10 + seed % 50000 / 100, 4), close)
+        return quotes
+
+
+PROVIDERS = {
+    YahooQuoteProvider.name: YahooQuoteProvider,
+    FakeQuoteProvider.name: FakeQuoteProvider,
+}
+
+
+def get_provider(name: str | None = None) -> QuoteProvider:
+    name = (name or os.getenv("QUOTE_PROVIDER", "yahoo")).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"QUOTE_PROVIDER desconocido: {name}")
+    return PROVIDERS[name]()
+
+
+def fetch_quotes(identifiers, provider: QuoteProvider | None = None, batch_size: int | None = None, concurrency: int | None = None):
+    """
+    Obtiene las cotizaciones de todos los identificadores.
+    Devuelve un iterador de (lote, {identificador: (precio, fecha)}) según terminan los lotes.
+    Un lote que falla se devuelve vacío (sus identificadores cuentan como no encontrados).
+    """
+    provider = provider or get_provider()
+    batch_size = batch_size or int(os.getenv("QUOTE_BATCH_SIZE", "50"))
+    concurrency = concurrency or int(os.getenv("QUOTE_CONCURRENCY", "4"))
+
+    identifiers = list(dict.fromkeys(identifiers))
+    batches = [identifiers[i:i + batch_size] for i in range(0, len(identifiers), batch_size)]
+
+    def run(batch):
+        provider.limiter.acquire()
+        return provider.fetch(batch)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(run, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                yield batch, future.result()
+            except Exception as e:
+                print(f"  Error obteniendo lote de {len(batch)} ({provider.name}): {e}")
+                yield batch, {}